@@ -0,0 +1,87 @@
+"""
+Micro-benchmark: relevant-number extraction on a 1M-row CSV
+
+Compares the old list-based path (``dropna().tolist()`` over every numeric
+column, reduced with Python builtins) against DataAnalyzer._extract_relevant_numbers,
+which reads only the column a question selects and keeps it in a NumPy array.
+Every ndarray row times that method (plus the final ``.sum()``).
+
+Run with: python benchmarks/bench_numeric_extraction.py [rows]
+"""
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from solver.analyzer import DataAnalyzer
+
+
+def make_csv(rows: int) -> bytes:
+    """Build an in-memory CSV with a few numeric and text columns"""
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "order_id": np.arange(rows),
+        "region": rng.choice(["North", "South", "East", "West"], size=rows),
+        "sales": rng.normal(500, 120, size=rows).round(2),
+        "quantity": rng.integers(1, 50, size=rows),
+        "discount": rng.random(rows).round(3),
+    })
+    df.loc[rng.choice(rows, size=rows // 100, replace=False), "sales"] = np.nan
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def legacy_sum(data: dict) -> float:
+    """The pre-vectorization path: every numeric column as a Python list"""
+    numbers = []
+    for df in data["dataframes"]:
+        for col in df.select_dtypes(include=[np.number]).columns:
+            numbers.extend(df[col].dropna().tolist())
+    numbers.extend(data["numeric_values"])
+    return sum(numbers) if numbers else 0
+
+
+def extracted_sum(analyzer: DataAnalyzer, data: dict, question: str) -> float:
+    """DataAnalyzer._extract_relevant_numbers for a question, reduced in NumPy"""
+    return analyzer._extract_relevant_numbers(data, question).sum().item()
+
+
+def measure(label: str, func, *args):
+    """Run func once, reporting wall time and peak traced memory"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {elapsed * 1000:>10.1f} ms {peak / 1024 / 1024:>10.1f} MiB   result={result:.2f}")
+    return elapsed, peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = pd.read_csv(io.BytesIO(make_csv(rows)))
+    data = {"dataframes": [df], "tables": [], "json_data": [], "text_data": [], "numeric_values": []}
+    analyzer = DataAnalyzer()
+
+    print(f"{rows:,} rows, {len(df.columns)} columns")
+    print(f"{'path':<32} {'time':>13} {'peak mem':>14}")
+
+    # Every numeric column, as the list path always did
+    old_t, old_m = measure("legacy list, all columns", legacy_sum, data)
+
+    # Question-driven column selection: a named column, then the default measure
+    for label, question in [("ndarray, named 'sales' column", "What is the total sales?"),
+                            ("ndarray, default measure", "What is the total?")]:
+        new_t, new_m = measure(label, extracted_sum, analyzer, data, question)
+        print(f"  -> {old_t / new_t:.1f}x faster, {old_m / max(new_m, 1):.1f}x less memory than legacy")
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,13 @@ Handles quiz submission, processing, and chaining
 """
 import os
 import time
+import reprlib
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, ValidationError
 import uvicorn
 from dotenv import load_dotenv
@@ -18,11 +19,15 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from solver.browser import BrowserManager
-from solver.parser import QuizParser
-from solver.downloader import DataDownloader
+from solver.chain import ChainPipeline
 from solver.analyzer import DataAnalyzer
 from solver.visualizer import DataVisualizer
 from solver.submitter import AnswerSubmitter
+from solver.registry import DatasetRegistry
+from solver.filters import materialize
+from solver.strategies import StrategyEngine, strategy_stats
+from solver.batch import BATCH_PARALLELISM, MAX_BATCH_PARALLELISM, SharedResources, run_batch
+from solver.formatter import canonical_json
 from solver.utils import setup_logging, TimeoutManager
 
 # Setup logging
@@ -58,6 +63,11 @@ class QuizRequest(BaseModel):
     url: str
 
 
+class BatchRequest(BaseModel):
+    requests: List[QuizRequest]
+    parallelism: Optional[int] = None
+
+
 class QuizResponse(BaseModel):
     status: str
     steps: list
@@ -109,7 +119,10 @@ async def health():
 @app.get("/history")
 async def get_history():
     """Get quiz history for dashboard"""
-    return {"history": quiz_history[-50:]}  # Last 50 entries
+    return {
+        "history": quiz_history[-50:],  # Last 50 entries
+        "strategies": strategy_stats.snapshot()
+    }
 
 
 @app.post("/quiz", response_model=QuizResponse)
@@ -128,9 +141,46 @@ async def solve_quiz(quiz_request: QuizRequest):
     8. Handle chaining (next quiz)
     9. Return results
     """
+    return await run_chain(quiz_request)
+
+
+@app.post("/quiz/batch")
+async def solve_quiz_batch(batch: BatchRequest):
+    """
+    Solve many quiz chains concurrently
+    
+    Chains share one browser, HTTP connection pool and dataset registry, at
+    most `parallelism` at a time. Results stream back as NDJSON, one line per
+    chain as it finishes, followed by a throughput and latency summary line.
+    """
+    parallelism = min(batch.parallelism or BATCH_PARALLELISM, MAX_BATCH_PARALLELISM)
+    logger.info(f"Starting batch of {len(batch.requests)} chain(s), parallelism {parallelism}")
+    
+    async def run(quiz_request: QuizRequest, resources: SharedResources) -> Dict[str, Any]:
+        result = await run_chain(quiz_request, resources)
+        return {"email": quiz_request.email, "url": quiz_request.url, **result.model_dump()}
+    
+    async def lines():
+        resources = SharedResources.open(parallelism)
+        try:
+            async for line in run_batch(batch.requests, lambda r: run(r, resources), parallelism):
+                yield canonical_json(line) + b"\n"
+        finally:
+            await resources.close()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def run_chain(quiz_request: QuizRequest, resources: Optional[SharedResources] = None) -> QuizResponse:
+    """Solve one quiz chain, on a batch's shared resources when given"""
     start_time = time.time()
     steps = []
     browser_manager = None
+    pipeline = None
+    session = resources.session if resources else None
+    # Datasets downloaded and parsed by one step stay available to the rest of the chain
+    # (and, in a batch, to every other chain) while they fit the registry's byte budget
+    registry = resources.registry if resources else DatasetRegistry()
     
     try:
         # Validate secret
@@ -145,10 +195,13 @@ async def solve_quiz(quiz_request: QuizRequest):
         timeout_mgr = TimeoutManager(MAX_QUIZ_TIME)
         
         # Initialize browser manager
-        browser_manager = BrowserManager()
+        browser_manager = resources.browser_pool.manager() if resources else BrowserManager()
         await browser_manager.start()
         steps.append({"step": "start_browser", "status": "success", "time": time.time() - start_time})
         
+        # Loads the next quiz while the current one finishes
+        pipeline = ChainPipeline(browser_manager, registry, session)
+        
         # Process quiz chain
         current_url = quiz_request.url
         final_answer = None
@@ -166,19 +219,18 @@ async def solve_quiz(quiz_request: QuizRequest):
             
             logger.info(f"Processing quiz {quiz_count}: {current_url}")
             
-            # Load quiz page
-            page_content = await browser_manager.load_page(current_url)
+            # Load, parse and download (already under way if prefetched)
+            prepared = await pipeline.prepare(current_url)
+            quiz_data = prepared.quiz_data
+            downloaded_data = prepared.downloaded_data
             steps.append({
                 "step": f"load_quiz_{quiz_count}",
                 "url": current_url,
+                "prefetched": prepared.prefetched,
                 "status": "success",
-                "time": time.time() - start_time
+                "time": prepared.finished["load"] - start_time
             })
             
-            # Parse quiz content
-            parser = QuizParser(page_content)
-            quiz_data = parser.parse()
-            
             if not quiz_data:
                 logger.error("Failed to parse quiz data")
                 steps.append({"step": f"parse_quiz_{quiz_count}", "status": "failed", "time": time.time() - start_time})
@@ -188,21 +240,17 @@ async def solve_quiz(quiz_request: QuizRequest):
                 "step": f"parse_quiz_{quiz_count}",
                 "question": quiz_data.get("question", "")[:100],
                 "status": "success",
-                "time": time.time() - start_time
+                "time": prepared.finished["parse"] - start_time
             })
-            
-            # Download required data
-            downloader = DataDownloader()
-            downloaded_data = await downloader.download_all(quiz_data)
             steps.append({
                 "step": f"download_data_{quiz_count}",
                 "files": len(downloaded_data),
                 "status": "success",
-                "time": time.time() - start_time
+                "time": prepared.finished["download"] - start_time
             })
             
             # Analyze data
-            analyzer = DataAnalyzer()
+            analyzer = DataAnalyzer(registry)
             analysis_result = analyzer.analyze(quiz_data, downloaded_data)
             steps.append({
                 "step": f"analyze_data_{quiz_count}",
@@ -224,29 +272,58 @@ async def solve_quiz(quiz_request: QuizRequest):
             
             # Compute final answer
             final_answer = analysis_result.get("answer")
-            logger.info(f"Computed answer: {str(final_answer)[:100]}")
+            pipeline.defer(_log_answer, quiz_count, final_answer)
             
             # Submit answer
-            submitter = AnswerSubmitter()
+            submitter = AnswerSubmitter(session=session)
             submit_url = quiz_data.get("submit_url")
             
             if not submit_url:
                 logger.error("No submit URL found")
                 break
+            submit_urls = quiz_data.get("submit_urls") or [submit_url]
             
-            submit_response = await submitter.submit(
-                submit_url,
-                final_answer,
-                quiz_request.email
-            )
-            
-            steps.append({
-                "step": f"submit_answer_{quiz_count}",
-                "url": submit_url,
-                "correct": submit_response.get("correct"),
-                "status": "success",
-                "time": time.time() - start_time
-            })
+            # Ranked alternatives from the loaded data, computed only after a
+            # rejection; the next one is tried while time remains
+            candidates = StrategyEngine(analyzer).candidates(quiz_data, analysis_result)
+            for attempt, candidate in enumerate(candidates, start=1):
+                final_answer = candidate.answer
+                submit_response = await submitter.submit_ranked(
+                    submit_urls,
+                    final_answer,
+                    quiz_request.email
+                )
+                # The next quiz starts loading before this step's bookkeeping
+                next_quiz_url = submit_response.get("next_url") or submit_response.get("url")
+                if next_quiz_url and submit_response.get("correct") and not timeout_mgr.is_expired():
+                    pipeline.prefetch(next_quiz_url)
+                
+                # Later candidates go straight to the URL that answered
+                submit_url = submit_response.get("submit_url", submit_url)
+                if "status_code" in submit_response:
+                    submit_urls = [submit_url]
+                
+                steps.append({
+                    "step": f"submit_answer_{quiz_count}",
+                    "url": submit_url,
+                    "correct": submit_response.get("correct"),
+                    "strategy": candidate.strategy,
+                    "attempt": attempt,
+                    "status": "success",
+                    "time": time.time() - start_time
+                })
+                
+                # Transport failures say nothing about the answer itself
+                if "correct" not in submit_response or submit_response.get("error"):
+                    break
+                strategy_stats.record(candidate.strategy, bool(submit_response["correct"]))
+                if submit_response["correct"]:
+                    if attempt > 1:
+                        logger.info(f"Quiz {quiz_count} solved by strategy {candidate.strategy} on attempt {attempt}")
+                    break
+                if timeout_mgr.is_expired():
+                    break
+                logger.info(f"Answer from {candidate.strategy} rejected, trying next candidate")
             
             final_url = submit_url
             
@@ -265,7 +342,7 @@ async def solve_quiz(quiz_request: QuizRequest):
                 })
                 chain_complete = False
             elif not submit_response.get("correct", True) and not timeout_mgr.is_expired():
-                # Answer was wrong, could retry with alternative analysis
+                # Every candidate was rejected
                 logger.warning(f"Quiz {quiz_count} answer incorrect: {submit_response.get('message', 'No details')}")
                 steps.append({
                     "step": f"answer_incorrect_{quiz_count}",
@@ -274,7 +351,6 @@ async def solve_quiz(quiz_request: QuizRequest):
                     "time": time.time() - start_time
                 })
                 chain_complete = False
-                # For now, stop on incorrect (could implement retry logic here)
                 break
             else:
                 # Chain complete - no more URLs
@@ -314,7 +390,7 @@ async def solve_quiz(quiz_request: QuizRequest):
             status="ok",
             steps=steps,
             final_url=final_url or "",
-            final_answer=final_answer,
+            final_answer=materialize(final_answer),
             time_taken=time_taken,
             quizzes_solved=quiz_count,
             chain_complete=chain_complete,
@@ -353,11 +429,21 @@ async def solve_quiz(quiz_request: QuizRequest):
         )
     
     finally:
+        if pipeline:
+            # Unused prefetches stop before the browser closes
+            await pipeline.close()
+        if resources is None:
+            registry.close()
         # Cleanup browser
         if browser_manager:
             await browser_manager.close()
 
 
+def _log_answer(quiz_count: int, answer: Any):
+    # repr keeps lazy filter results unmaterialized
+    logger.info(f"Quiz {quiz_count} computed answer: {reprlib.repr(answer)}")
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
     uvicorn.run(
@@ -2,25 +2,40 @@
 Data analyzer
 Processes PDFs, CSVs, Excel files, performs statistical analysis, and computes answers
 """
-import io
-import re
 import json
-import base64
 import logging
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, Iterator, List, Optional, Union
 import pandas as pd
 import numpy as np
 from PIL import Image
-import pdfplumber
-import PyPDF2
-import openpyxl
 
-logger = logging.getLogger(__name__)
+from solver.query import compile_question, QueryPlan
+from solver.columns import ColumnIndex, TOKEN_SCORE
+from solver.loaders import CSVLoader, LazyWorkbook, is_json_lines, iter_json_lines
+from solver.pdf_engine import PDFEngine
+from solver.tables import normalize_table
+from solver.scanner import scan_numbers
+from solver.payloads import payload_store
+from solver.registry import Dataset, DatasetRegistry
+from solver.stats import ColumnSketch, merge_sketches, sketch_frame
+from solver.streaming import ChunkedAggregator, needs_statistics, should_stream, source_sketches
+from solver.groupby import GroupSpec, group_aggregate, group_answer
+from solver.filters import FilterResult, build_mask
+from solver.formatter import answer_spec, format_answer
+from solver.jsonframes import JSON_STREAM_THRESHOLD, json_frames, stream_json_frames
 
+logger = logging.getLogger(__name__)
 
 class DataAnalyzer:
     """Analyzes downloaded data and computes answers"""
     
+    def __init__(self, registry: Optional[DatasetRegistry] = None):
+        self.csv_loader = CSVLoader()
+        self.pdf_engine = PDFEngine()
+        self.registry = registry
+        # Data loaded by the last analyze() call, for alternative answer strategies
+        self.data: Optional[Dict[str, Any]] = None
+    
     def analyze(self, quiz_data: Dict[str, Any], downloaded_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Main analysis method
@@ -46,13 +61,24 @@ class DataAnalyzer:
                     "data_summary": {"note": "No data to analyze"}
                 }
             
-            # Combine all data sources
-            all_data = self._aggregate_data(downloaded_data)
+            # Compile question into a query plan (cached by normalized text)
+            plan = compile_question(question)
+            analysis_type = plan.operation
             
-            # Determine analysis type from question
-            analysis_type = self._determine_analysis_type(question)
+            # Sources too large to load are aggregated chunk by chunk instead
+            files = downloaded_data.get("files", [])
+            large_files = [f for f in files if should_stream(f, plan)]
+            if large_files:
+                # Smaller files, tables and API responses are still loaded and folded in
+                rest = dict(downloaded_data, files=[f for f in files if not should_stream(f, plan)])
+                return self._analyze_streaming(large_files, plan, answer_format, rest)
+            
+            # Combine all data sources, reading only what the plan references
+            all_data = self._aggregate_data(downloaded_data, plan)
+            self.data = all_data
             
             logger.info(f"Analysis type: {analysis_type}, Answer format: {answer_format}")
+            logger.debug(f"Query plan: {plan}")
             
             # Perform analysis based on type
             if analysis_type == "sum":
@@ -76,7 +102,7 @@ class DataAnalyzer:
                 result = self._smart_analysis(all_data, question)
             
             # Format answer according to expected format
-            answer = self._format_answer(result, answer_format)
+            answer = self.format_answer(result, answer_format, question)
             
             return {
                 "analysis_type": analysis_type,
@@ -92,57 +118,53 @@ class DataAnalyzer:
                 "answer": None
             }
     
-    def _aggregate_data(self, downloaded_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _aggregate_data(self, downloaded_data: Dict[str, Any],
+                        plan: Optional[QueryPlan] = None) -> Dict[str, Any]:
         """Aggregate all data into usable structures"""
         aggregated = {
             "dataframes": [],
             "tables": [],
             "json_data": [],
             "text_data": [],
-            "numeric_values": []
+            "numeric_values": [],
+            # id(frame) -> column sketches, computed once per loaded frame
+            "sketches": {}
         }
         
         # Process files
+        registered = []
         for file_info in downloaded_data.get("files", []):
-            content = file_info.get("content", b"")
-            file_type = file_info.get("type", "")
-            
-            if file_type == "pdf":
-                extracted = self._extract_from_pdf(content)
-                aggregated["dataframes"].extend(extracted.get("dataframes", []))
-                aggregated["tables"].extend(extracted.get("tables", []))
-                aggregated["text_data"].append(extracted.get("text", ""))
-            
-            elif file_type == "csv":
-                df = self._extract_from_csv(content)
-                if df is not None:
-                    aggregated["dataframes"].append(df)
-            
-            elif file_type == "excel":
-                dfs = self._extract_from_excel(content)
-                aggregated["dataframes"].extend(dfs)
-            
-            elif file_type == "json":
-                data = self._extract_from_json(content)
-                if data:
-                    aggregated["json_data"].append(data)
+            parsed = self._load_file(file_info, plan)
+            if self.registry is not None and parsed.key in self.registry:
+                registered.append(parsed)
+            for df in parsed.dataframes:
+                aggregated["sketches"][id(df)] = parsed.stats_for(df)
+            aggregated["dataframes"].extend(parsed.dataframes)
+            aggregated["tables"].extend(parsed.tables)
+            if parsed.text:
+                aggregated["text_data"].append(parsed.text)
+            if parsed.json_data:
+                aggregated["json_data"].append(parsed.json_data)
         
         # Process API responses
         for api_response in downloaded_data.get("api_responses", []):
-            if api_response.get("type") == "json":
-                aggregated["json_data"].append(api_response.get("data"))
+            if api_response.get("type") == "json" and api_response.get("content") is not None:
+                frames, json_data = self._stream_json(api_response["content"])
+                self._add_json(aggregated, json_data, frames)
+            elif api_response.get("type") == "json":
+                self._add_json(aggregated, api_response.get("data"))
             else:
                 aggregated["text_data"].append(api_response.get("data", ""))
         
         # Process embedded data
         for embedded in downloaded_data.get("embedded_data", []):
             if embedded.get("type") == "json":
-                aggregated["json_data"].append(embedded.get("data"))
+                self._add_json(aggregated, embedded.get("data"))
             elif embedded.get("type") == "base64":
                 # Decode base64
                 try:
-                    decoded = base64.b64decode(embedded.get("data", ""))
-                    aggregated["text_data"].append(decoded.decode('utf-8'))
+                    decoded = payload_store.decode_base64(embedded.get("data", ""))
+                    aggregated["text_data"].append(str(decoded, 'utf-8'))
                 except:
                     pass
         
@@ -150,134 +172,248 @@ class DataAnalyzer:
         for table in downloaded_data.get("tables", []):
             if table and len(table) > 0:
                 try:
-                    df = pd.DataFrame(table[1:], columns=table[0])
+                    df = normalize_table(table)
+                except Exception as e:
+                    logger.debug(f"Could not normalize HTML table: {e}")
+                    df = None
+                if df is not None:
                     aggregated["dataframes"].append(df)
-                except:
+                    aggregated["sketches"][id(df)] = sketch_frame(df)
+                else:
                     aggregated["tables"].append(table)
         
-        # Extract numeric values from all text
-        for text in aggregated["text_data"]:
-            numbers = re.findall(r'-?\d+\.?\d*', str(text))
-            aggregated["numeric_values"].extend([float(n) for n in numbers])
+        # Extract numeric values from all text straight into one array
+        arrays = [scan_numbers(text) for text in aggregated["text_data"] if text]
+        aggregated["numeric_values"] = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.float64)
+        
+        # Index column headers once so every analysis can resolve columns cheaply;
+        # a single registered dataset brings the index built in an earlier step
+        frames = aggregated["dataframes"]
+        reused = [d.column_index for d in registered if d.dataframes and d.column_index.covers(frames)]
+        aggregated["column_index"] = reused[0] if reused else ColumnIndex(frames)
         
         return aggregated
     
-    def _extract_from_pdf(self, content: bytes) -> Dict[str, Any]:
-        """Extract data from PDF"""
-        result = {"dataframes": [], "tables": [], "text": ""}
+    def _analyze_streaming(self, files: List[Dict[str, Any]], plan: QueryPlan, answer_format: str,
+                           rest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Answer from large CSV / JSON-lines sources without materializing them
+
+        Frames from the remaining (in-memory) sources are folded into the same
+        aggregate when they have a column the question names.
+        """
+        aggregator = None
+        for file_info in files:
+            # "Above the average" needs the whole source's statistic: one extra pass
+            sketches = source_sketches(self._chunks(file_info, plan)) if needs_statistics(plan) else None
+            partial = ChunkedAggregator(plan, filter_frame=self.filter_frame,
+                                        sketches=sketches).consume(self._chunks(file_info, plan))
+            aggregator = partial if aggregator is None else aggregator.merge(partial)
         
-        try:
-            # Try pdfplumber first (better table extraction)
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                text_parts = []
-                for page in pdf.pages:
-                    # Extract text
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-                    
-                    # Extract tables
-                    tables = page.extract_tables()
-                    for table in tables:
-                        if table and len(table) > 1:
-                            try:
-                                # Convert to DataFrame
-                                df = pd.DataFrame(table[1:], columns=table[0])
-                                result["dataframes"].append(df)
-                            except:
-                                result["tables"].append(table)
-                
-                result["text"] = "\n".join(text_parts)
+        merged = 0
+        if rest:
+            for df in self._aggregate_data(rest, plan)["dataframes"]:
+                if df.empty or ColumnIndex([df]).best(plan.target_terms, frame=0, numeric=True) is None:
+                    continue
+                aggregator.merge(ChunkedAggregator(plan, filter_frame=self.filter_frame).consume([df]))
+                merged += 1
+        
+        logger.info(f"Streamed {aggregator.rows} rows in {aggregator.chunks} chunks from {len(files)} source(s), "
+                    f"plus {merged} in-memory frame(s)")
+        result = aggregator.result()
+        return {
+            "analysis_type": plan.operation,
+            "raw_result": result,
+            "answer": self.format_answer(result, answer_format, plan.question),
+            "data_summary": {"streamed_sources": len(files), "streamed_rows": aggregator.rows,
+                             "in_memory_frames": merged}
+        }
+    
+    def _chunks(self, file_info: Dict[str, Any], plan: QueryPlan) -> Iterator[pd.DataFrame]:
+        """Row chunks of a streamed CSV / JSON-lines source"""
+        content = file_info.get("content", b"")
+        if file_info.get("type") == "jsonl":
+            return iter_json_lines(content)
+        return self.csv_loader.iter_chunks(content, plan)
+    
+    def _load_file(self, file_info: Dict[str, Any], plan: Optional[QueryPlan] = None) -> Dataset:
+        """
+        Parse one downloaded file, or reuse the registry's parse of the same source
+
+        Registered sources are parsed independently of the plan (all columns,
+        every page, sheets on demand) so later chain steps can reuse them.
+        """
+        content = file_info.get("content", b"")
+        file_type = file_info.get("type", "")
+        key = file_info.get("source_key")
+        
+        dataset = self.registry.get(key) if self.registry is not None else None
+        if dataset is None:
+            dataset = Dataset(key=key or "", kind=file_type, content=content)
+        elif dataset.parsed:
+            logger.info(f"Reusing parsed {file_type} data for {key[:80]}")
+            return dataset
         
+        shared = self.registry is not None and key in self.registry
+        if file_type == "pdf":
+            extracted = self._extract_from_pdf(content, plan if not shared else None)
+            dataset.dataframes = extracted.get("dataframes", [])
+            dataset.tables = extracted.get("tables", [])
+            dataset.text = extracted.get("text", "")
+        elif file_type == "csv":
+            df = self._extract_from_csv(content, plan if not shared else None)
+            dataset.dataframes = [df] if df is not None else []
+        elif file_type == "excel":
+            if shared:
+                # The workbook stays open so each step loads only the sheets it needs
+                if dataset.workbook is None:
+                    dataset.workbook = LazyWorkbook(content)
+                return Dataset(key=key, kind=file_type, sketches=dataset.sketches,
+                               dataframes=self._sheets_for(dataset.workbook, plan))
+            dataset.dataframes = self._extract_from_excel(content, plan)
+        elif file_type == "jsonl" or (file_type == "json" and is_json_lines(content)):
+            df = self._extract_from_json_lines(content)
+            dataset.dataframes = [df] if df is not None else []
+        elif file_type == "json":
+            if len(content) >= JSON_STREAM_THRESHOLD:
+                dataset.dataframes, dataset.json_data = self._stream_json(content)
+            else:
+                dataset.json_data = self._extract_from_json(content)
+                dataset.dataframes = json_frames(dataset.json_data) if dataset.json_data is not None else []
+        
+        dataset.parsed = True
+        return dataset
+    
+    def _sheets_for(self, workbook: LazyWorkbook, plan: Optional[QueryPlan]) -> List[pd.DataFrame]:
+        try:
+            return [workbook.load(name) for name in workbook.select_sheets(plan)]
         except Exception as e:
-            logger.warning(f"pdfplumber failed: {e}, trying PyPDF2")
-            
-            # Fallback to PyPDF2
-            try:
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-                text_parts = []
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-                result["text"] = "\n".join(text_parts)
-            except Exception as e2:
-                logger.error(f"PyPDF2 also failed: {e2}")
+            logger.error(f"Error reading Excel: {e}")
+            return []
+    
+    def _extract_from_pdf(self, content: bytes, plan: Optional[QueryPlan] = None) -> Dict[str, Any]:
+        """Extract data from PDF, restricted to pages the question names"""
+        result = {"dataframes": [], "tables": [], "text": ""}
+        pages = plan.pages if plan else None
+        
+        # Pages arrive in completion order; tables are converted as they stream in
+        text_parts = {}
+        frames = []
+        for page in self.pdf_engine.iter_pages(content, pages=pages):
+            if page["text"]:
+                text_parts[page["page"]] = page["text"]
+            for position, table in enumerate(page["tables"]):
+                try:
+                    # Convert to a typed DataFrame
+                    df = normalize_table(table)
+                except Exception as e:
+                    logger.debug(f"Could not normalize PDF table: {e}")
+                    df = None
+                if df is not None:
+                    frames.append(((page["page"], position), df))
+                else:
+                    result["tables"].append(table)
         
+        result["dataframes"] = [df for _, df in sorted(frames, key=lambda item: item[0])]
+        result["text"] = "\n".join(text_parts[n] for n in sorted(text_parts))
         return result
     
-    def _extract_from_csv(self, content: bytes) -> Optional[pd.DataFrame]:
-        """Extract DataFrame from CSV"""
+    def _extract_from_csv(self, content: bytes, plan: Optional[QueryPlan] = None) -> Optional[pd.DataFrame]:
+        """Extract DataFrame from CSV (encoding/delimiter sniffed, dtypes shrunk)"""
         try:
-            df = pd.read_csv(io.BytesIO(content))
-            return df
+            return self.csv_loader.load(content, plan)
         except Exception as e:
             logger.error(f"Error reading CSV: {e}")
-            # Try with different encoding
-            try:
-                df = pd.read_csv(io.BytesIO(content), encoding='latin-1')
-                return df
-            except:
-                return None
-    
-    def _extract_from_excel(self, content: bytes) -> List[pd.DataFrame]:
-        """Extract DataFrames from Excel"""
-        dataframes = []
+            return None
+    
+    def _extract_from_excel(self, content: bytes, plan: Optional[QueryPlan] = None) -> List[pd.DataFrame]:
+        """Extract DataFrames from the Excel sheets the question references"""
         try:
-            # Read all sheets
-            excel_file = pd.ExcelFile(io.BytesIO(content))
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                dataframes.append(df)
+            workbook = LazyWorkbook(content)
         except Exception as e:
             logger.error(f"Error reading Excel: {e}")
-        
-        return dataframes
+            return []
+        try:
+            return self._sheets_for(workbook, plan)
+        finally:
+            workbook.close()
+    
+    def _extract_from_json_lines(self, content: bytes) -> Optional[pd.DataFrame]:
+        """Extract DataFrame from JSON-lines (one record per line)"""
+        try:
+            frames = list(iter_json_lines(content))
+            return pd.concat(frames, ignore_index=True) if frames else None
+        except Exception as e:
+            logger.error(f"Error reading JSON lines: {e}")
+            return None
     
     def _extract_from_json(self, content: bytes) -> Optional[Any]:
         """Extract data from JSON"""
         try:
-            return json.loads(content)
+            # json.loads takes bytes but not other buffers
+            return json.loads(content if isinstance(content, (bytes, str)) else bytes(content))
         except Exception as e:
             logger.error(f"Error parsing JSON: {e}")
             return None
     
+    def _stream_json(self, content: bytes) -> tuple:
+        """Flatten a large JSON document incrementally; falls back to a full parse"""
+        try:
+            return stream_json_frames(content)
+        except Exception as e:
+            logger.error(f"Error streaming JSON, parsing whole document: {e}")
+            json_data = self._extract_from_json(content)
+            return (json_frames(json_data) if json_data is not None else []), json_data
+    
+    def _add_json(self, aggregated: Dict[str, Any], json_data: Any,
+                  frames: Optional[List[pd.DataFrame]] = None):
+        """Keep a JSON object and add its flattened record arrays as frames"""
+        if json_data:
+            aggregated["json_data"].append(json_data)
+        if frames is None:
+            frames = json_frames(json_data) if json_data is not None else []
+        for df in frames:
+            aggregated["dataframes"].append(df)
+            aggregated["sketches"][id(df)] = sketch_frame(df)
+    
     def _determine_analysis_type(self, question: str) -> str:
         """Determine what type of analysis to perform"""
-        q = question.lower()
-        
-        if any(word in q for word in ['sum', 'total', 'add']):
-            return "sum"
-        elif any(word in q for word in ['average', 'mean', 'avg']):
-            return "average"
-        elif any(word in q for word in ['count', 'how many', 'number of']):
-            return "count"
-        elif any(word in q for word in ['maximum', 'max', 'highest', 'largest']):
-            return "max"
-        elif any(word in q for word in ['minimum', 'min', 'lowest', 'smallest']):
-            return "min"
-        elif any(word in q for word in ['filter', 'where', 'greater than', 'less than']):
-            return "filter"
-        elif any(word in q for word in ['group', 'aggregate', 'by']):
-            return "aggregate"
-        else:
-            return "extract"
+        return compile_question(question).operation
     
     def _compute_sum(self, data: Dict[str, Any], question: str) -> float:
         """Compute sum"""
+        sketch = self._column_sketch(data, question)
+        if sketch is not None:
+            return sketch.sum
         values = self._extract_relevant_numbers(data, question)
-        return sum(values) if values else 0
+        return values.sum().item() if values.size else 0
     
     def _compute_average(self, data: Dict[str, Any], question: str) -> float:
         """Compute average"""
+        sketch = self._column_sketch(data, question)
+        if sketch is not None:
+            return sketch.mean
         values = self._extract_relevant_numbers(data, question)
-        return np.mean(values) if values else 0
+        return values.mean().item() if values.size else 0
     
     def _compute_count(self, data: Dict[str, Any], question: str) -> int:
         """Count items"""
+        plan = compile_question(question)
+        
+        # "How many distinct X": unique values of the named column, any dtype
+        if plan.aggregation == "nunique":
+            distinct = self._count_distinct(data, plan)
+            if distinct is not None:
+                return distinct
+        
+        # Count rows that survive the plan's filters
+        frames = self._plan_frames(data, plan)
+        if frames:
+            return sum(len(frame) for frame, _ in frames)
+        
         values = self._extract_relevant_numbers(data, question)
-        if values:
-            return len(values)
+        if values.size:
+            return int(values.size)
         
         # Try counting rows in dataframes
         total = 0
@@ -285,58 +421,152 @@ class DataAnalyzer:
             total += len(df)
         return total
     
-    def _compute_max(self, data: Dict[str, Any], question: str) -> float:
-        """Find maximum"""
+    def _count_distinct(self, data: Dict[str, Any], plan: QueryPlan) -> Optional[int]:
+        index = self.column_index(data)
+        columns = []
+        for frame_no, df in enumerate(data.get("dataframes", [])):
+            col = index.best(plan.target_terms, frame=frame_no)
+            if col is not None:
+                frame = self.filter_frame(df, plan, col, index, frame_no)
+                columns.append(frame[col])
+        if not columns:
+            return None
+        return int(pd.concat(columns, ignore_index=True).nunique())
+    
+    def _compute_max(self, data: Dict[str, Any], question: str) -> Any:
+        """Find maximum (or the top-k largest values)"""
+        plan = compile_question(question)
+        sketch = self._column_sketch(data, question) if not plan.top_k else None
+        if sketch is not None:
+            return sketch.max
         values = self._extract_relevant_numbers(data, question)
-        return max(values) if values else 0
+        if not values.size:
+            return 0
+        if plan.top_k:
+            return (-np.sort(-values))[:plan.top_k].tolist()
+        return values.max().item()
     
-    def _compute_min(self, data: Dict[str, Any], question: str) -> float:
-        """Find minimum"""
+    def _compute_min(self, data: Dict[str, Any], question: str) -> Any:
+        """Find minimum (or the top-k smallest values)"""
+        plan = compile_question(question)
+        sketch = self._column_sketch(data, question) if not plan.top_k else None
+        if sketch is not None:
+            return sketch.min
         values = self._extract_relevant_numbers(data, question)
-        return min(values) if values else 0
+        if not values.size:
+            return 0
+        if plan.top_k:
+            return np.sort(values)[:plan.top_k].tolist()
+        return values.min().item()
     
     def _apply_filter(self, data: Dict[str, Any], question: str) -> Any:
-        """Apply filter to data"""
-        # Try to extract filter conditions from question
-        for df in data.get("dataframes", []):
-            # Simple example: filter numeric columns
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            if len(numeric_cols) > 0:
-                col = numeric_cols[0]
-                # Return filtered data
-                return df[df[col] > df[col].median()].to_dict('records')
+        """
+        Rows matching the question's conditions
         
-        return []
+        Returns:
+            FilterResult view over the matching rows of every frame a
+            condition applies to (all rows when the question names none);
+            conditions whose column resolves nowhere are dropped and the
+            question is answered as a plain lookup
+        """
+        plan = compile_question(question)
+        index = self.column_index(data)
+        frames = data.get("dataframes", [])
+        
+        parts = []
+        for frame_no, df in enumerate(frames):
+            default = index.best(plan.target_terms, frame=frame_no, numeric=True) or index.default_measure(frame_no)
+            mask = build_mask(df, plan.filters, index, frame_no, default,
+                              data.get("sketches", {}).get(id(df)))
+            if mask is not None:
+                parts.append((df, mask))
+        
+        if not parts and plan.filters:
+            logger.info("Filter conditions name no known column, dropping them")
+            return self._extract_value(data, question)
+        if not parts and frames:
+            logger.info("No filter conditions, returning the first table")
+            parts = [(frames[0], None)]
+        return FilterResult(parts)
     
     def _aggregate_analysis(self, data: Dict[str, Any], question: str) -> Any:
-        """Perform aggregation"""
-        for df in data.get("dataframes", []):
-            # Try to find grouping columns
-            non_numeric = df.select_dtypes(exclude=[np.number]).columns
-            numeric = df.select_dtypes(include=[np.number]).columns
+        """Perform aggregation (several keys and aggregations in one pass)"""
+        plan = compile_question(question)
+        index = self.column_index(data)
+        aggregations = plan.aggregations or ("sum",)
+        
+        for frame_no, df in enumerate(data.get("dataframes", [])):
+            keys = [index.best((term,), frame=frame_no) for term in plan.group_keys]
+            keys = list(dict.fromkeys(k for k in keys if k is not None))
             
-            if len(non_numeric) > 0 and len(numeric) > 0:
-                result = df.groupby(non_numeric[0])[numeric[0]].sum().to_dict()
-                return result
+            if not keys:
+                # Fall back to the first categorical column
+                non_numeric = df.select_dtypes(exclude=[np.number]).columns
+                if len(non_numeric) == 0:
+                    continue
+                keys = [non_numeric[0]]
+            
+            values = self._value_columns(index, plan, frame_no, exclude=keys)
+            if not values and any(a != "count" for a in aggregations):
+                continue
+            
+            frame = self.filter_frame(df, plan, values[0] if values else None, index, frame_no,
+                                       data.get("sketches", {}).get(id(df)))
+            spec = GroupSpec(
+                keys=tuple(keys),
+                values=tuple(values),
+                aggregations=aggregations,
+                top_k=plan.top_k,
+                ascending=plan.ascending,
+            )
+            return group_answer(group_aggregate(frame, spec))
         
         return {}
     
+    def _value_columns(self, index: ColumnIndex, plan: QueryPlan, frame_no: int,
+                       exclude: List[Any]) -> List[Any]:
+        """
+        Columns to aggregate: the best-matching numeric column plus any other
+        column a term names outright (filter-only columns are skipped)
+        """
+        # Distinct counts work on any column, everything else needs numbers
+        numeric = None if plan.aggregations == ("nunique",) else True
+        filter_terms = {c.column for c in plan.filters if c.column}
+        terms = [t for t in plan.target_terms if t not in filter_terms] or list(plan.target_terms)
+        
+        values = []
+        primary = index.best(terms, frame=frame_no, numeric=numeric)
+        if primary is not None and primary not in exclude:
+            values.append(primary)
+        for term in terms:
+            matches = index.lookup((term,), frame=frame_no, numeric=numeric)
+            if matches and matches[0].score >= TOKEN_SCORE and matches[0].column not in exclude + values:
+                values.append(matches[0].column)
+        
+        if not values:
+            default = index.default_measure(frame_no)
+            if default is not None and default not in exclude:
+                values.append(default)
+        return values
+    
     def _extract_value(self, data: Dict[str, Any], question: str) -> Any:
         """Extract specific value based on question"""
-        # Look for keywords in question to match column names
-        keywords = re.findall(r'\b\w+\b', question.lower())
+        plan = compile_question(question)
+        dataframes = data.get("dataframes", [])
         
-        for df in data.get("dataframes", []):
-            for col in df.columns:
-                if any(keyword in col.lower() for keyword in keywords):
-                    # Return first non-null value
-                    return df[col].dropna().iloc[0] if not df[col].dropna().empty else None
+        # Best-scoring column across all frames
+        matches = self.column_index(data).lookup(plan.target_terms)
+        if matches:
+            series = dataframes[matches[0].frame][matches[0].column].dropna()
+            # Return first non-null value
+            return series.iloc[0] if not series.empty else None
         
-        # Check JSON data
+        # Check JSON data (stopwords are already excluded from plan terms)
+        keywords = plan.target_terms
         for json_obj in data.get("json_data", []):
             if isinstance(json_obj, dict):
                 for key, value in json_obj.items():
-                    if any(keyword in key.lower() for keyword in keywords):
+                    if any(keyword in str(key).lower() for keyword in keywords):
                         return value
         
         return None
@@ -345,8 +575,8 @@ class DataAnalyzer:
         """Smart analysis when type is unclear"""
         # Default: return sum of all numeric values found
         values = self._extract_relevant_numbers(data, question)
-        if values:
-            return sum(values)
+        if values.size:
+            return values.sum().item()
         
         # If no numbers, return first dataframe as dict
         if data.get("dataframes"):
@@ -358,48 +588,100 @@ class DataAnalyzer:
         
         return None
     
-    def _extract_relevant_numbers(self, data: Dict[str, Any], question: str) -> List[float]:
-        """Extract numbers relevant to the question"""
-        numbers = []
+    def _column_sketch(self, data: Dict[str, Any], question: str) -> Optional[ColumnSketch]:
+        """
+        Merged load-time sketch of the columns a question targets
         
-        # From dataframes
-        for df in data.get("dataframes", []):
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            for col in numeric_cols:
-                numbers.extend(df[col].dropna().tolist())
+        Returns:
+            Sketch, or None when filters apply or a column has no sketch
+            (callers then compute exactly from the values)
+        """
+        plan = compile_question(question)
+        sketches = data.get("sketches")
+        if plan.filters or not sketches:
+            return None
         
-        # From direct numeric values
-        numbers.extend(data.get("numeric_values", []))
+        parts = []
+        for frame, columns in self._plan_frames(data, plan):
+            frame_sketches = sketches.get(id(frame), {})
+            for col in columns:
+                if col not in frame_sketches:
+                    return None
+                parts.append(frame_sketches[col])
         
-        return numbers
+        merged = merge_sketches(parts)
+        return merged if merged.count else None
     
-    def _format_answer(self, result: Any, answer_format: str) -> Any:
-        """Format answer according to expected format"""
-        if answer_format == "number":
-            if isinstance(result, (int, float)):
-                return result
-            elif isinstance(result, str):
-                try:
-                    return float(result)
-                except:
-                    return 0
-            return 0
+    def _extract_relevant_numbers(self, data: Dict[str, Any], question: str) -> np.ndarray:
+        """
+        Extract numbers relevant to the question
+        
+        Returns:
+            float64 array with NaNs removed; column blocks are concatenated once
+            so no per-value Python objects are created
+        """
+        plan = compile_question(question)
+        
+        # From the referenced (or, failing that, all numeric) columns
+        arrays = [
+            frame[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            for frame, columns in self._plan_frames(data, plan)
+            for col in columns
+        ]
         
-        elif answer_format == "boolean":
-            return bool(result)
+        if arrays:
+            numbers = np.concatenate(arrays) if len(arrays) > 1 else arrays[0]
+            numbers = numbers[~np.isnan(numbers)]
+            if numbers.size:
+                return numbers
         
-        elif answer_format == "json":
-            if isinstance(result, (dict, list)):
-                return result
-            return {"result": result}
+        # From direct numeric values, only when no table column was usable
+        return np.asarray(data.get("numeric_values", []), dtype=np.float64)
+    
+    def _plan_frames(self, data: Dict[str, Any], plan: QueryPlan) -> List[tuple]:
+        """
+        Restrict each DataFrame to the rows and column a plan references
         
-        elif answer_format == "array":
-            if isinstance(result, list):
-                return result
-            return [result]
+        Returns:
+            List of (filtered frame, value columns) pairs
+        """
+        index = self.column_index(data)
+        sketches = data.get("sketches", {})
+        named = []
+        unnamed = []
+        for frame_no, df in enumerate(data.get("dataframes", [])):
+            target = index.best(plan.target_terms, frame=frame_no, numeric=True)
+            if target is not None:
+                named.append((self.filter_frame(df, plan, target, index, frame_no, sketches.get(id(df))), [target]))
+                continue
+            
+            # Nothing named: use the frame's main measure, not every numeric column
+            default = index.default_measure(frame_no)
+            if default is not None:
+                unnamed.append((self.filter_frame(df, plan, default, index, frame_no, sketches.get(id(df))), [default]))
         
-        else:  # string
-            return str(result)
+        # Prefer frames whose target column was actually named in the question
+        return named or unnamed
+    
+    def filter_frame(self, df: pd.DataFrame, plan: QueryPlan, default_col: Any,
+                      index: ColumnIndex, frame_no: int, sketches: Optional[Dict[Any, Any]] = None) -> pd.DataFrame:
+        """Apply the plan's filters as a single vectorized boolean mask"""
+        if not plan.filters:
+            return df
+        mask = build_mask(df, plan.filters, index, frame_no, default_col, sketches)
+        return df[mask] if mask is not None else df
+    
+    def column_index(self, data: Dict[str, Any]) -> ColumnIndex:
+        """Return the dataset's column index, building it if it is missing or stale"""
+        index = data.get("column_index")
+        if index is None or not index.covers(data.get("dataframes", [])):
+            index = ColumnIndex(data.get("dataframes", []))
+            data["column_index"] = index
+        return index
+    
+    def format_answer(self, result: Any, answer_format: str, question: str = "") -> Any:
+        """Format answer according to expected format and the question's precision"""
+        return format_answer(result, answer_spec(question, answer_format))
     
     def _summarize_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Create summary of processed data"""
@@ -0,0 +1,106 @@
+"""
+Batch runner
+Runs many quiz chains concurrently under a parallelism limit on one shared browser, HTTP
+connection pool and dataset registry, yielding each result as soon as its chain finishes
+"""
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Sequence
+import aiohttp
+import numpy as np
+
+from solver.browser import BrowserPool
+from solver.registry import DatasetRegistry
+
+logger = logging.getLogger(__name__)
+
+# Chains run at once when a batch does not ask for a limit
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", "8"))
+
+# Upper bound on a batch's requested parallelism
+MAX_BATCH_PARALLELISM = 64
+
+# Open connections per host in the shared pool
+CONNECTIONS_PER_HOST = 16
+
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class SharedResources:
+    """Browser, HTTP connection pool and dataset registry shared by a batch's chains"""
+    browser_pool: BrowserPool
+    session: aiohttp.ClientSession
+    registry: DatasetRegistry
+
+    @classmethod
+    def open(cls, parallelism: int) -> "SharedResources":
+        connector = aiohttp.TCPConnector(limit=max(100, parallelism * 4), limit_per_host=CONNECTIONS_PER_HOST)
+        session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+        # The browser launches on first use, so batches that fail validation never start one
+        return cls(BrowserPool(), session, DatasetRegistry())
+
+    async def close(self):
+        self.registry.close()
+        await self.session.close()
+        await self.browser_pool.close()
+
+
+def latency_summary(latencies: Sequence[float], wall_seconds: float, failed: int) -> Dict[str, Any]:
+    """Throughput and latency percentiles of a finished batch"""
+    summary: Dict[str, Any] = {
+        "chains": len(latencies),
+        "succeeded": len(latencies) - failed,
+        "failed": failed,
+        "wall_seconds": round(wall_seconds, 3),
+        "chains_per_second": round(len(latencies) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+    }
+    if latencies:
+        values = np.percentile(np.asarray(latencies, dtype=np.float64), LATENCY_PERCENTILES)
+        summary["latency_seconds"] = {f"p{p}": round(float(v), 3) for p, v in zip(LATENCY_PERCENTILES, values)}
+        summary["latency_seconds"]["max"] = round(max(latencies), 3)
+    return summary
+
+
+async def run_batch(items: List[Any], run: Callable[[Any], Awaitable[Dict[str, Any]]],
+                    parallelism: int = BATCH_PARALLELISM) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run every item, at most `parallelism` at a time, yielding results in completion order
+
+    Each result carries its item's index and latency; a final {"summary": ...}
+    entry follows the last one. Chains still running when the consumer stops
+    (e.g. the client disconnects) are cancelled.
+    """
+    semaphore = asyncio.Semaphore(max(1, parallelism))
+    started = time.monotonic()
+
+    async def run_one(index: int, item: Any) -> Dict[str, Any]:
+        async with semaphore:
+            begin = time.monotonic()
+            try:
+                result = dict(await run(item))
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {e}")
+                result = {"status": "error", "message": getattr(e, "detail", None) or str(e)}
+            return {"index": index, "latency": time.monotonic() - begin, **result}
+
+    tasks = [asyncio.create_task(run_one(index, item)) for index, item in enumerate(items)]
+    latencies = []
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            latencies.append(result["latency"])
+            if result.get("status") != "ok":
+                failed += 1
+            yield result
+        summary = latency_summary(latencies, time.monotonic() - started, failed)
+        logger.info(f"Batch finished: {summary}")
+        yield {"summary": summary}
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
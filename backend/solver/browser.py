@@ -7,48 +7,90 @@ import logging
 from typing import Optional, Dict, Any
 from playwright.async_api import async_playwright, Browser, Page, TimeoutError as PlaywrightTimeout
 
+from solver.payloads import strip_inline_payloads
+
 logger = logging.getLogger(__name__)
 
 
+# Chromium flags for headless, low-overhead rendering
+LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-software-rasterizer',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-breakpad',
+    '--disable-component-extensions-with-background-pages',
+    '--disable-features=TranslateUI,BlinkGenPropertyTrees',
+    '--disable-ipc-flooding-protection',
+    '--disable-renderer-backgrounding',
+    '--enable-features=NetworkService,NetworkServiceInProcess',
+    '--force-color-profile=srgb',
+    '--hide-scrollbars',
+    '--metrics-recording-only',
+    '--mute-audio',
+    '--no-first-run',
+    '--single-process'
+]
+
+
+class BrowserPool:
+    """
+    One Chromium process shared by many chains
+    
+    Launched on first use; every BrowserManager from the pool gets its own
+    context and page, so concurrent chains keep separate cookies and state.
+    """
+    
+    def __init__(self):
+        self.playwright = None
+        self.browser: Optional[Browser] = None
+        self._lock = asyncio.Lock()
+    
+    def manager(self) -> "BrowserManager":
+        return BrowserManager(pool=self)
+    
+    async def acquire(self) -> Browser:
+        async with self._lock:
+            if self.browser is None:
+                self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+                logger.info("Shared browser started")
+            return self.browser
+    
+    async def close(self):
+        try:
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+        except Exception as e:
+            logger.error(f"Error closing shared browser: {e}")
+        self.browser = self.playwright = None
+
+
 class BrowserManager:
     """Manages headless browser operations using Playwright"""
     
-    def __init__(self):
+    def __init__(self, pool: Optional[BrowserPool] = None):
+        self.pool = pool
         self.playwright = None
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
         self.context = None
     
     async def start(self):
-        """Initialize browser"""
+        """Initialize browser (or a context on the pool's shared browser)"""
         try:
-            self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--disable-software-rasterizer',
-                    '--disable-extensions',
-                    '--disable-background-networking',
-                    '--disable-background-timer-throttling',
-                    '--disable-backgrounding-occluded-windows',
-                    '--disable-breakpad',
-                    '--disable-component-extensions-with-background-pages',
-                    '--disable-features=TranslateUI,BlinkGenPropertyTrees',
-                    '--disable-ipc-flooding-protection',
-                    '--disable-renderer-backgrounding',
-                    '--enable-features=NetworkService,NetworkServiceInProcess',
-                    '--force-color-profile=srgb',
-                    '--hide-scrollbars',
-                    '--metrics-recording-only',
-                    '--mute-audio',
-                    '--no-first-run',
-                    '--single-process'
-                ]
-            )
+            if self.pool is not None:
+                self.browser = await self.pool.acquire()
+            else:
+                self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
             self.context = await self.browser.new_context(
                 viewport={'width': 1920, 'height': 1080},
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -199,7 +241,7 @@ class BrowserManager:
             if data_urls:
                 logger.info(f"Found {len(data_urls)} data: URLs")
             
-            return {
+            page_content = {
                 "url": url,
                 "status": response.status if response else 200,
                 "html": html_content,
@@ -212,6 +254,8 @@ class BrowserManager:
                 "images": images,
                 "iframes": iframe_contents
             }
+            # Keep one decoded copy of large inline payloads instead of several raw ones
+            return strip_inline_payloads(page_content)
         
         except PlaywrightTimeout as e:
             logger.error(f"Timeout loading page {url}: {e}")
@@ -269,7 +313,8 @@ class BrowserManager:
                 await self.page.close()
             if self.context:
                 await self.context.close()
-            if self.browser:
+            # A pooled browser outlives its chains; the pool closes it
+            if self.browser and self.pool is None:
                 await self.browser.close()
             if self.playwright:
                 await self.playwright.stop()
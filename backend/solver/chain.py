@@ -0,0 +1,121 @@
+"""
+Chain pipeline
+Starts loading, parsing and downloading the next quiz as soon as a submit response names it,
+while the current step finishes, and runs non-critical bookkeeping off the critical path
+"""
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from solver.parser import QuizParser
+from solver.downloader import DataDownloader
+from solver.payloads import payload_store
+from solver.registry import DatasetRegistry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PreparedQuiz:
+    """A quiz page loaded, parsed and with its data downloaded"""
+    url: str
+    page_content: Dict[str, Any] = field(default_factory=dict)
+    quiz_data: Dict[str, Any] = field(default_factory=dict)
+    downloaded_data: Dict[str, Any] = field(default_factory=dict)
+    # Stage -> wall-clock time it finished
+    finished: Dict[str, float] = field(default_factory=dict)
+    prefetched: bool = False
+
+
+class ChainPipeline:
+    """
+    Prepares quiz steps ahead of the chain loop
+
+    One prefetch runs at a time: the browser has a single page, and the
+    current step is done with it once its answer has been submitted.
+    Inline payloads of every page the chain loads stay pinned in the
+    payload store until close(), so other chains cannot evict them.
+    """
+
+    def __init__(self, browser_manager: Any, registry: DatasetRegistry, session: Any = None):
+        self.browser_manager = browser_manager
+        self.registry = registry
+        self.session = session
+        self._prefetch: Optional[asyncio.Task] = None
+        self._prefetch_url: Optional[str] = None
+        self._background: Set[asyncio.Task] = set()
+        self._payload_keys: List[str] = []
+
+    def prefetch(self, url: str):
+        """Start preparing the next quiz in the background"""
+        if self._prefetch_url == url:
+            return
+        previous = self._cancel_prefetch()
+        logger.info(f"Prefetching next quiz: {url}")
+        self._prefetch_url = url
+        self._prefetch = asyncio.create_task(self._prepare(url, previous))
+
+    async def prepare(self, url: str) -> PreparedQuiz:
+        """The prepared quiz at url, reusing a prefetch when one was started for it"""
+        if self._prefetch is not None and self._prefetch_url == url:
+            task = self._prefetch
+            self._prefetch = self._prefetch_url = None
+            prepared = await task
+            prepared.prefetched = True
+            return prepared
+        return await self._prepare(url, self._cancel_prefetch())
+
+    async def _prepare(self, url: str, previous: Optional[asyncio.Task] = None) -> PreparedQuiz:
+        if previous is not None:
+            # A discarded prefetch must release the browser page first
+            await asyncio.gather(previous, return_exceptions=True)
+        prepared = PreparedQuiz(url)
+        prepared.page_content = await self.browser_manager.load_page(url)
+        self._payload_keys.extend(prepared.page_content.get("payload_keys", ()))
+        prepared.finished["load"] = time.time()
+
+        # BeautifulSoup parsing is CPU-bound; keep the event loop free for other chains
+        prepared.quiz_data = await asyncio.to_thread(_parse, prepared.page_content)
+        prepared.finished["parse"] = time.time()
+        if not prepared.quiz_data:
+            return prepared
+
+        downloader = DataDownloader(self.registry, self.session)
+        prepared.downloaded_data = await downloader.download_all(prepared.quiz_data)
+        prepared.finished["download"] = time.time()
+        return prepared
+
+    def defer(self, func: Callable[..., Any], *args: Any):
+        """Run non-critical I/O (answer logging) after the current step yields"""
+        async def run():
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error(f"Deferred task failed: {e}")
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def close(self):
+        """Cancel an unused prefetch, let deferred work finish and unpin the chain's payloads"""
+        pending = [task for task in [self._cancel_prefetch(), *self._background] if task is not None]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        payload_store.unpin(self._payload_keys)
+        self._payload_keys.clear()
+
+    def _cancel_prefetch(self) -> Optional[asyncio.Task]:
+        """Cancel the running prefetch, returning its task so callers can wait for it"""
+        task = self._prefetch
+        if task is not None and not task.done():
+            logger.info(f"Discarding prefetch of {self._prefetch_url}")
+            task.cancel()
+        self._prefetch = self._prefetch_url = None
+        return task
+
+
+def _parse(page_content: Dict[str, Any]) -> Dict[str, Any]:
+    return QuizParser(page_content).parse()
@@ -0,0 +1,199 @@
+"""
+Chart renderer
+Draws charts on reusable object-oriented matplotlib figures (Agg canvas, no pyplot state) and
+encodes PNGs straight from the canvas buffer within a size budget; matplotlib loads on first use
+"""
+import io
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from solver.filters import FilterResult
+from solver.formatter import canonical_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIGSIZE = (10, 6)
+
+# Resolutions tried in order until the encoded image fits the budget
+DPI_STEPS = (100, 80, 60)
+
+# Largest data URI (in characters) a chart may produce
+MAX_IMAGE_CHARS = 1_000_000
+
+PNG_PREFIX = "data:image/png;base64,"
+
+# Charts use few colors, so a 256-color palette is usually lossless
+PALETTE_COLORS = 256
+
+# Memory bound of the render cache, in data URI characters
+MAX_CACHE_CHARS = 64 * 1024 * 1024
+
+
+class ChartRenderer:
+    """
+    Renders charts onto cached figure templates
+
+    One Figure + FigureCanvasAgg pair is kept per figure size and cleared
+    between charts, so figure and canvas setup is paid once per process.
+    Rendering is serialized because matplotlib artists are not thread-safe.
+    """
+
+    def __init__(self):
+        self._figures: Dict[Tuple[float, float], Any] = {}
+        self._lock = threading.Lock()
+
+    def render(self, draw: Callable[[Any], None], figsize: Sequence[float] = DEFAULT_FIGSIZE,
+               dpi_steps: Sequence[int] = DPI_STEPS, max_chars: int = MAX_IMAGE_CHARS) -> str:
+        """
+        Draw a chart and return it as a PNG data URI
+
+        Args:
+            draw: Called with a cleared Figure to add axes and artists
+            figsize: Figure size in inches
+            dpi_steps: Resolutions to try, highest first
+            max_chars: Size budget for the data URI
+
+        Returns:
+            data:image/png;base64 URI (the smallest encoding if none fits)
+        """
+        with self._lock:
+            fig = self._figure(tuple(figsize))
+            try:
+                draw(fig)
+                best = None
+                for dpi in dpi_steps:
+                    # One Agg render per resolution; both encodings read its buffer
+                    fig.set_dpi(dpi)
+                    fig.canvas.draw()
+                    for quantize in (False, True):
+                        uri = self._encode(fig, quantize)
+                        if best is None or len(uri) < len(best):
+                            best = uri
+                        if len(uri) <= max_chars:
+                            return uri
+                logger.warning(f"Chart is {len(best)} chars, over the {max_chars} budget")
+                return best
+            finally:
+                fig.clear()
+
+    def _figure(self, figsize: Tuple[float, float]) -> Any:
+        fig = self._figures.get(figsize)
+        if fig is None:
+            # Deferred so quizzes without charts never import matplotlib
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+            fig = Figure(figsize=figsize, layout="tight")
+            FigureCanvasAgg(fig)
+            self._figures[figsize] = fig
+        return fig
+
+    def _encode(self, fig: Any, quantize: bool) -> str:
+        """PNG-encode the canvas's RGBA buffer (no second render, no bbox pass)"""
+        from PIL import Image
+
+        canvas = fig.canvas
+        width, height = canvas.get_width_height(physical=True)
+        image = Image.frombuffer("RGBA", (width, height), canvas.buffer_rgba(), "raw", "RGBA", 0, 1).convert("RGB")
+        if quantize:
+            image = image.quantize(colors=PALETTE_COLORS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=quantize, compress_level=6)
+        # Encode from the buffer's memory, without an intermediate bytes copy
+        return PNG_PREFIX + base64.b64encode(buffer.getbuffer()).decode("ascii")
+
+
+chart_renderer = ChartRenderer()
+
+
+def data_digest(data: Any) -> bytes:
+    """
+    Stable content hash of chart data
+
+    Frames, Series, arrays and filter results are hashed column-wise in
+    vectorized form; plain containers through their canonical JSON.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(data, FilterResult):
+        for frame in data.frames():
+            _hash_frame(digest, frame)
+    elif isinstance(data, (pd.DataFrame, pd.Series)):
+        _hash_frame(digest, data)
+    elif isinstance(data, np.ndarray):
+        digest.update(str(data.dtype).encode())
+        digest.update(np.ascontiguousarray(data).tobytes() if data.dtype != object else canonical_json(data))
+    else:
+        digest.update(type(data).__name__.encode())
+        try:
+            digest.update(canonical_json(data))
+        except (TypeError, ValueError):
+            digest.update(repr(data).encode())
+    return digest.digest()
+
+
+def _hash_frame(digest: Any, frame: Any):
+    digest.update(repr(list(frame.columns) if isinstance(frame, pd.DataFrame) else frame.name).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+
+
+class RenderCache:
+    """
+    LRU of rendered data URIs keyed by chart type, data and style
+
+    Bounded by the total length of the cached URIs; the least recently used
+    charts are evicted first.
+    """
+
+    def __init__(self, max_chars: int = MAX_CACHE_CHARS):
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[bytes, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key_for(chart_type: str, data: Any, style: Tuple = ()) -> bytes:
+        """Cache key: chart type, data content hash and styling parameters"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(chart_type.encode())
+        digest.update(repr(style).encode())
+        digest.update(data_digest(data))
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        with self._lock:
+            uri = self._entries.get(key)
+            if uri is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return uri
+
+    def put(self, key: bytes, uri: str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = uri
+            self._size += len(uri)
+            while self._size > self.max_chars and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# Process-wide cache, so chain steps and answer retries reuse rendered charts
+render_cache = RenderCache()
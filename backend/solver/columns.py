@@ -0,0 +1,199 @@
+"""
+Column relevance index
+Maps question terms to DataFrame columns via normalized names, synonyms and fuzzy scoring
+"""
+import re
+import difflib
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import pandas as pd
+
+from solver.query import STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+
+# Groups of interchangeable header words; every word maps to the others
+SYNONYM_GROUPS = [
+    ("revenue", "sales", "turnover", "income"),
+    ("price", "cost", "amount"),
+    ("quantity", "qty", "units", "stock", "inventory"),
+    ("salary", "pay", "wage", "wages", "compensation"),
+    ("temperature", "temp"),
+    ("score", "points", "mark", "marks"),
+    ("employee", "staff", "worker"),
+    ("date", "day", "time"),
+    ("category", "type", "class", "kind"),
+    ("product", "item"),
+    ("customer", "client", "buyer"),
+    ("region", "area", "zone", "territory"),
+    ("city", "town"),
+    ("department", "dept", "division"),
+    ("percentage", "percent", "pct", "rate"),
+]
+
+SYNONYMS: Dict[str, Set[str]] = defaultdict(set)
+for _group in SYNONYM_GROUPS:
+    for _word in _group:
+        SYNONYMS[_word].update(w for w in _group if w != _word)
+
+# Header words that mark identifier columns rather than measures
+IDENTIFIER_TOKENS = frozenset(["id", "idx", "index", "no", "num", "code", "zip", "key", "uuid"])
+
+EXACT_SCORE = 1.0
+TOKEN_SCORE = 0.8
+SYNONYM_SCORE = 0.65
+FUZZY_WEIGHT = 0.6
+FUZZY_CUTOFF = 0.8
+
+
+def normalize_name(name: Any) -> str:
+    """Split camelCase, lowercase and collapse punctuation to single spaces"""
+    text = re.sub(r'(?<=[a-z0-9])(?=[A-Z])', ' ', str(name))
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+def singular(word: str) -> str:
+    """Cheap plural stripping for header matching"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+@dataclass(frozen=True)
+class ColumnMatch:
+    """A scored column candidate"""
+    frame: int
+    column: Any
+    score: float
+
+
+class ColumnIndex:
+    """Inverted index from header tokens to columns, built once per dataset"""
+
+    def __init__(self, dataframes: Iterable[pd.DataFrame] = ()):
+        # entry id -> (frame, column, normalized name, is_numeric)
+        self._entries: List[Tuple[int, Any, str, bool]] = []
+        self._names: Dict[str, List[int]] = defaultdict(list)
+        self._tokens: Dict[str, Set[int]] = defaultdict(set)
+        self._fuzzy_cache: Dict[str, List[Tuple[str, float]]] = {}
+        self._frame_ids: List[int] = []
+
+        for df in dataframes:
+            self.add(df)
+
+    def add(self, df: pd.DataFrame) -> int:
+        """Index a DataFrame's columns, returning its frame number"""
+        frame = len(self._frame_ids)
+        self._frame_ids.append(id(df))
+
+        for col in df.columns:
+            dtype = df[col].dtype
+            is_numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+            name = normalize_name(col)
+            entry = len(self._entries)
+            self._entries.append((frame, col, name, is_numeric))
+
+            self._names[name].append(entry)
+            for token in name.split():
+                self._tokens[token].add(entry)
+                self._tokens[singular(token)].add(entry)
+
+        self._fuzzy_cache.clear()
+        return frame
+
+    def covers(self, dataframes: List[pd.DataFrame]) -> bool:
+        """Whether this index was built from exactly these DataFrames"""
+        return self._frame_ids == [id(df) for df in dataframes]
+
+    def lookup(self, terms: Iterable[Optional[str]], frame: Optional[int] = None,
+               numeric: Optional[bool] = None) -> List[ColumnMatch]:
+        """
+        Rank columns against question terms
+
+        Args:
+            terms: Candidate terms, most important first
+            frame: Restrict to one DataFrame
+            numeric: Restrict to numeric (True) or any (None) columns
+
+        Returns:
+            Matches sorted by descending score
+        """
+        scores: Dict[int, float] = {}
+
+        for position, term in enumerate(t for t in terms if t):
+            weight = 1.0 / (1.0 + 0.1 * position)
+            for entry, strength in self._match_term(term).items():
+                scores[entry] = max(scores.get(entry, 0.0), strength * weight)
+
+        matches = []
+        for entry, score in scores.items():
+            entry_frame, column, _, is_numeric = self._entries[entry]
+            if frame is not None and entry_frame != frame:
+                continue
+            if numeric and not is_numeric:
+                continue
+            matches.append(ColumnMatch(entry_frame, column, score))
+
+        matches.sort(key=lambda m: m.score, reverse=True)
+        return matches
+
+    def best(self, terms: Iterable[Optional[str]], frame: Optional[int] = None,
+             numeric: Optional[bool] = None) -> Optional[Any]:
+        """Return the highest-scoring column, or None"""
+        matches = self.lookup(terms, frame=frame, numeric=numeric)
+        return matches[0].column if matches else None
+
+    def default_measure(self, frame: int) -> Optional[Any]:
+        """First numeric column of a frame that does not look like an identifier"""
+        numeric = [(col, name) for f, col, name, is_num in self._entries if f == frame and is_num]
+        for col, name in numeric:
+            if not IDENTIFIER_TOKENS.intersection(name.split()):
+                return col
+        return numeric[0][0] if numeric else None
+
+    def _match_term(self, term: str) -> Dict[int, float]:
+        """Score every entry a single term can refer to"""
+        name = normalize_name(term)
+        if not name:
+            return {}
+
+        strengths: Dict[int, float] = {}
+
+        def credit(entries: Iterable[int], strength: float):
+            for entry in entries:
+                if strength > strengths.get(entry, 0.0):
+                    strengths[entry] = strength
+
+        # Whole-name matches (covers quoted multi-word headers)
+        credit(self._names.get(name, ()), EXACT_SCORE)
+        credit(self._names.get(singular(name), ()), EXACT_SCORE)
+
+        words = [w for w in name.split() if w not in STOPWORDS]
+        for word in words:
+            base = singular(word)
+            credit(self._tokens.get(word, ()), TOKEN_SCORE)
+            credit(self._tokens.get(base, ()), TOKEN_SCORE)
+
+            for synonym in SYNONYMS.get(word, set()) | SYNONYMS.get(base, set()):
+                credit(self._tokens.get(synonym, ()), SYNONYM_SCORE)
+
+            for token, ratio in self._fuzzy(base):
+                credit(self._tokens[token], FUZZY_WEIGHT * ratio)
+
+        return strengths
+
+    def _fuzzy(self, word: str) -> List[Tuple[str, float]]:
+        """Close header tokens for a (possibly misspelled) word"""
+        if word not in self._fuzzy_cache:
+            vocabulary = list(self._tokens)
+            close = difflib.get_close_matches(word, vocabulary, n=3, cutoff=FUZZY_CUTOFF)
+            self._fuzzy_cache[word] = [
+                (token, difflib.SequenceMatcher(None, word, token).ratio())
+                for token in close if token != word
+            ]
+        return self._fuzzy_cache[word]
@@ -3,20 +3,33 @@ Data downloader for various file types
 Handles PDF, CSV, Excel, JSON, images, API calls
 """
 import io
+import mmap
 import logging
-import base64
+import tempfile
 from typing import Dict, Any, List, Optional
 import aiohttp
 import asyncio
 
+from solver.payloads import payload_store
+from solver.registry import DatasetRegistry, source_key
+from solver.streaming import STREAM_THRESHOLD
+from solver.jsonframes import JSON_STREAM_THRESHOLD
+from solver.utils import client_session
+
 logger = logging.getLogger(__name__)
 
+SPOOL_BLOCK_SIZE = 1024 * 1024
+
 
 class DataDownloader:
     """Downloads and loads data from various sources"""
     
-    def __init__(self):
+    def __init__(self, registry: Optional[DatasetRegistry] = None,
+                 session: Optional[aiohttp.ClientSession] = None):
         self.timeout = aiohttp.ClientTimeout(total=30)
+        self.registry = registry
+        # Shared connection pool, when the caller runs many chains
+        self.session = session
     
     async def download_all(self, quiz_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -93,10 +106,32 @@ class DataDownloader:
         return downloaded
     
     async def _download_source(self, source: Dict[str, str]) -> Optional[Dict[str, Any]]:
-        """Download a single data source"""
+        """Download a single data source, reusing content an earlier chain step fetched"""
         url = source.get("url", "")
         data_type = source.get("type", "unknown")
+        key = source_key(url)
+        
+        if self.registry is not None:
+            dataset = self.registry.get(key)
+            if dataset is not None and dataset.content is not None:
+                logger.info(f"Reusing {data_type} from an earlier step: {url[:80]}")
+                return {
+                    "type": dataset.kind,
+                    "url": url[:50] + "..." if url.startswith("data:") else url,
+                    "content": dataset.content,
+                    "size": len(dataset.content),
+                    "source_key": key
+                }
         
+        result = await self._fetch_source(url, data_type)
+        if result is not None:
+            result["source_key"] = key
+            if self.registry is not None:
+                self.registry.add_content(key, data_type, result["content"])
+        return result
+    
+    async def _fetch_source(self, url: str, data_type: str) -> Optional[Dict[str, Any]]:
+        """Fetch a data: URL or HTTP(S) source"""
         try:
             logger.info(f"Downloading {data_type} from {url}")
             
@@ -104,33 +139,26 @@ class DataDownloader:
             if url.startswith("data:"):
                 logger.info("Processing inline data URL")
                 try:
-                    # Parse data URL format: data:mime/type;encoding,data
-                    if "," in url:
-                        header, data = url.split(",", 1)
-                        # Decode based on encoding
-                        if "base64" in header:
-                            import base64
-                            content = base64.b64decode(data)
-                        else:
-                            # URL-encoded data
-                            from urllib.parse import unquote
-                            content = unquote(data).encode('utf-8')
-                        
-                        return {
-                            "type": data_type,
-                            "url": url[:50] + "...",  # Truncate for logging
-                            "content": content,
-                            "size": len(content)
-                        }
+                    # Decoded once into the shared store; content is a view onto it
+                    _, content = payload_store.decode_data_url(url)
+                    if content is None:
+                        logger.error("Inline payload no longer in the store")
+                        return None
+                    return {
+                        "type": data_type,
+                        "url": url[:50] + "...",  # Truncate for logging
+                        "content": content,
+                        "size": len(content)
+                    }
                 except Exception as e:
                     logger.error(f"Failed to parse data URL: {e}")
                     return None
             
             # Handle regular HTTP/HTTPS URLs
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with client_session(self.session, self.timeout) as session:
                 async with session.get(url) as response:
                     if response.status == 200:
-                        content = await response.read()
+                        content = await self._read_body(response)
                         
                         return {
                             "type": data_type,
@@ -146,14 +174,40 @@ class DataDownloader:
             logger.error(f"Error downloading {url}: {e}")
             return None
     
+    async def _read_body(self, response) -> Any:
+        """
+        Response body as bytes, or for large declared sizes a read-only memoryview
+        over a memory-mapped temp file so the OS pages it instead of the heap holding it
+        """
+        length = response.content_length
+        if not isinstance(length, int) or length < STREAM_THRESHOLD:
+            return await response.read()
+        
+        logger.info(f"Spooling {length / 1e6:.1f} MB response to disk")
+        with tempfile.TemporaryFile() as spool:
+            async for block in response.content.iter_chunked(SPOOL_BLOCK_SIZE):
+                spool.write(block)
+            spool.flush()
+            # The mapping keeps its own handle after the file is closed
+            return memoryview(mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ))
+    
     async def _call_api(self, endpoint: str) -> Optional[Dict[str, Any]]:
         """Call API endpoint"""
         try:
             logger.info(f"Calling API: {endpoint}")
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with client_session(self.session, self.timeout) as session:
                 async with session.get(endpoint) as response:
                     if response.status == 200:
+                        length = response.content_length
+                        if response.content_type == "application/json" and isinstance(length, int) \
+                                and length >= JSON_STREAM_THRESHOLD:
+                            # Large bodies stay raw and are flattened incrementally by the analyzer
+                            return {
+                                "endpoint": endpoint,
+                                "type": "json",
+                                "content": await self._read_body(response)
+                            }
                         # Try to parse as JSON
                         try:
                             data = await response.json()
@@ -181,7 +235,7 @@ class DataDownloader:
     async def _download_image(self, url: str) -> Optional[bytes]:
         """Download image"""
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with client_session(self.session, self.timeout) as session:
                 async with session.get(url) as response:
                     if response.status == 200:
                         return await response.read()
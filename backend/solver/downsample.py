@@ -0,0 +1,160 @@
+"""
+Chart downsampling
+Vectorized conversion of results to NumPy series, LTTB / min-max reduction of long series to
+the plot's pixel width, and top-N bar grouping with an "Other" bucket
+"""
+import logging
+from typing import Any, Tuple
+import numpy as np
+import pandas as pd
+
+from solver.filters import FilterResult
+
+logger = logging.getLogger(__name__)
+
+# Points kept on a line chart: one per horizontal pixel of a 10in, 100dpi figure
+LINE_POINTS = 1000
+
+# Series longer than this many times the target are min-max reduced before LTTB
+MINMAX_RATIO = 4
+
+# Bars shown before the rest are summed into one bucket
+MAX_BARS = 20
+
+OTHER_LABEL = "Other"
+
+
+def to_series(data: Any) -> np.ndarray:
+    """
+    float64 values of a line-chart result, non-numeric entries dropped
+
+    Records use each row's first numeric field; lists of scalars, Series,
+    frames and filter results convert column-wise without per-item loops.
+    """
+    if isinstance(data, FilterResult):
+        data = data.to_frame()
+    if isinstance(data, pd.Series):
+        values = pd.to_numeric(data, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    elif isinstance(data, pd.DataFrame):
+        values = _first_numeric(data)
+    elif isinstance(data, (list, tuple)) and data and isinstance(data[0], dict):
+        values = _first_numeric(pd.DataFrame.from_records(data))
+    else:
+        values = pd.to_numeric(pd.Series(list(data), dtype=object), errors="coerce").to_numpy(
+            dtype=np.float64, na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+def _first_numeric(frame: pd.DataFrame) -> np.ndarray:
+    """First numeric value of each row, in column order"""
+    if frame.empty:
+        return np.empty(0, dtype=np.float64)
+    typed = frame.select_dtypes(include=[np.number])
+    if typed.shape[1]:
+        # Typed columns are used as-is; text is only parsed when nothing else is numeric
+        numeric = typed.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        numeric = frame.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(numeric)
+    first = present.argmax(axis=1)
+    values = numeric[np.arange(len(numeric)), first]
+    values[~present.any(axis=1)] = np.nan
+    return values
+
+
+def min_max(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Indices of each bucket's minimum and maximum, in order (fully vectorized)"""
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    # Pad the tail bucket with NaN so every bucket is one row of a matrix
+    grid = np.concatenate([y, np.full(size * buckets - n, np.nan)]).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    extremes = np.concatenate([np.nanargmin(grid, axis=1) + offsets, np.nanargmax(grid, axis=1) + offsets, [0, n - 1]])
+    return np.unique(extremes)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets point selection
+
+    Returns indices of the kept points (first and last always kept). Each
+    bucket's triangle areas are computed as one vector operation.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - avg_x) * (y[start:end] - py) - (px - x[start:end]) * (avg_y - py))
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_line(y: np.ndarray, points: int = LINE_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (x, y) of a series reduced to about `points` points
+
+    Very long series are first cut to their per-bucket extremes (min-max),
+    then LTTB picks the visually significant points; x keeps original positions.
+    """
+    x = np.arange(len(y), dtype=np.float64)
+    if len(y) <= points:
+        return x, y
+    keep = np.arange(len(y))
+    if len(y) > MINMAX_RATIO * points:
+        keep = min_max(y, MINMAX_RATIO * points // 2)
+    chosen = keep[lttb(x[keep], y[keep], points)]
+    logger.info(f"Downsampled line chart from {len(y)} to {len(chosen)} points")
+    return x[chosen], y[chosen]
+
+
+def top_bars(labels: Any, values: Any, limit: int = MAX_BARS) -> Tuple[list, np.ndarray]:
+    """
+    Largest `limit - 1` bars in their original order, plus one summed "Other" bar
+
+    Non-numeric values count as 0, as before.
+    """
+    labels = list(labels)
+    values = list(values)
+    try:
+        numbers = np.nan_to_num(np.fromiter(values, dtype=np.float64, count=len(values)))
+    except (TypeError, ValueError):
+        numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    if len(numbers) <= limit:
+        return [str(label) for label in labels], numbers
+
+    top = np.sort(np.argpartition(-numbers, limit - 2)[:limit - 1])
+    rest = np.ones(len(numbers), dtype=bool)
+    rest[top] = False
+    logger.info(f"Grouped {int(rest.sum())} of {len(numbers)} bars into '{OTHER_LABEL}'")
+    return [str(labels[i]) for i in top] + [OTHER_LABEL], np.append(numbers[top], numbers[rest].sum())
+
+
+def top_rows(frame: pd.DataFrame, limit: int = MAX_BARS) -> pd.DataFrame:
+    """Frame rows with the largest first-column values, the rest summed into an "Other" row"""
+    if len(frame) <= limit:
+        return frame
+    order = frame.iloc[:, 0].to_numpy(dtype=np.float64, na_value=-np.inf)
+    top = np.sort(np.argpartition(-order, limit - 2)[:limit - 1])
+    rest = np.ones(len(frame), dtype=bool)
+    rest[top] = False
+    other = frame.iloc[rest].sum(numeric_only=True).to_frame(OTHER_LABEL).T
+    kept = frame.iloc[top]
+    kept.index = kept.index.astype(str)
+    return pd.concat([kept, other])
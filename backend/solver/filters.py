@@ -0,0 +1,192 @@
+"""
+Filter engine
+Turns plan conditions (numeric, text, date and statistic comparisons) into one vectorized
+boolean mask per DataFrame and hands matches back as a lazy view; rows only become
+Python objects when the answer is serialized
+"""
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from solver.columns import ColumnIndex
+from solver.query import Condition
+
+logger = logging.getLogger(__name__)
+
+# Vectorized comparison operators for plan conditions
+COMPARISONS = {
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    "==": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+}
+
+
+def build_mask(df: pd.DataFrame, conditions: Sequence[Condition], index: ColumnIndex, frame_no: int,
+               default_col: Any = None, sketches: Optional[Dict[Any, Any]] = None) -> Optional[np.ndarray]:
+    """
+    AND together every condition that applies to a frame
+
+    Args:
+        df: Frame to filter
+        conditions: Plan conditions
+        index: Column index the frame was registered in
+        frame_no: Frame number within the index
+        default_col: Column for numeric conditions that name none
+        sketches: Column sketches of this frame, used for "above the average"
+
+    Returns:
+        Boolean array, or None when no condition could be applied
+    """
+    mask = None
+    for condition in conditions:
+        try:
+            part = _condition_mask(df, condition, index, frame_no, default_col, sketches or {})
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Skipping condition {condition}: {e}")
+            part = None
+        if part is not None:
+            mask = part if mask is None else mask & part
+    return mask
+
+
+def _condition_mask(df: pd.DataFrame, condition: Condition, index: ColumnIndex, frame_no: int,
+                    default_col: Any, sketches: Dict[Any, Any]) -> Optional[np.ndarray]:
+    compare = COMPARISONS.get(condition.op)
+    if compare is None:
+        return None
+
+    if condition.kind == "text":
+        col = _text_column(df, condition, index, frame_no)
+        if col is None:
+            return None
+        return compare(_casefolded(df[col]), condition.value.casefold()).fillna(False).to_numpy(dtype=bool)
+
+    if condition.kind == "date":
+        col = _date_column(df, condition, index, frame_no)
+        if col is None:
+            return None
+        dates = df[col] if pd.api.types.is_datetime64_any_dtype(df[col].dtype) else \
+            pd.to_datetime(df[col], errors="coerce", format="mixed")
+        value = pd.Timestamp(condition.value)
+        if getattr(dates.dt, "tz", None) is not None:
+            value = value.tz_localize(dates.dt.tz)
+        if condition.op == "==":
+            dates = dates.dt.normalize()
+        return compare(dates, value).fillna(False).to_numpy(dtype=bool)
+
+    col = index.best((condition.column,), frame=frame_no, numeric=True) if condition.column else None
+    col = col if col is not None else default_col
+    if col is None or col not in df.columns:
+        return None
+    series = df[col] if pd.api.types.is_numeric_dtype(df[col].dtype) else pd.to_numeric(df[col], errors="coerce")
+
+    value = condition.value
+    if condition.kind == "stat":
+        value = _statistic(series, condition.value, sketches.get(col))
+    return compare(series, value).fillna(False).to_numpy(dtype=bool)
+
+
+def _statistic(series: pd.Series, name: str, sketch: Any) -> float:
+    """Average/median threshold, from the load-time sketch when there is one"""
+    if name == "median":
+        return sketch.quantile(0.5) if sketch is not None else series.median()
+    return sketch.mean if sketch is not None else series.mean()
+
+
+def _casefolded(series: pd.Series) -> pd.Series:
+    """Case-insensitive text view; categoricals only fold their categories"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories.astype("string").str.strip().str.casefold()
+        return series.cat.rename_categories(categories) if categories.is_unique else \
+            series.astype("string").str.strip().str.casefold()
+    return series.astype("string").str.strip().str.casefold()
+
+
+def _text_column(df: pd.DataFrame, condition: Condition, index: ColumnIndex, frame_no: int) -> Optional[Any]:
+    """Named column, else the first text column containing the value"""
+    if condition.column:
+        col = index.best((condition.column,), frame=frame_no)
+        if col is not None:
+            return col
+    target = condition.value.casefold()
+    for col in df.select_dtypes(exclude=[np.number, "datetime", "datetimetz"]).columns:
+        if (_casefolded(df[col]) == target).any():
+            return col
+    return None
+
+
+def _date_column(df: pd.DataFrame, condition: Condition, index: ColumnIndex, frame_no: int) -> Optional[Any]:
+    """Named column if it holds dates, else the first datetime column"""
+    if condition.column:
+        col = index.best((condition.column,), frame=frame_no)
+        if col is not None and not pd.api.types.is_numeric_dtype(df[col].dtype):
+            return col
+    dates = df.select_dtypes(include=["datetime", "datetimetz"]).columns
+    return dates[0] if len(dates) else None
+
+
+class FilterResult:
+    """
+    Rows matching a filter across one or more frames
+
+    Holds (frame, mask) pairs; columns come back as NumPy arrays and rows are
+    only converted to Python records (via the C JSON writer) when requested.
+    """
+
+    def __init__(self, parts: List[Tuple[pd.DataFrame, Optional[np.ndarray]]]):
+        self.parts = parts
+        self._count: Optional[int] = None
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = sum(len(df) if mask is None else int(mask.sum()) for df, mask in self.parts)
+        return self._count
+
+    def __repr__(self) -> str:
+        return f"FilterResult({len(self)} rows)"
+
+    def __str__(self) -> str:
+        return str(self.to_records())
+
+    def frames(self) -> Iterator[pd.DataFrame]:
+        for df, mask in self.parts:
+            yield df if mask is None else df[mask]
+
+    def column(self, name: Any) -> np.ndarray:
+        """One column's matching values as a single array"""
+        arrays = [
+            (df[name].to_numpy() if mask is None else df[name].to_numpy()[mask])
+            for df, mask in self.parts if name in df.columns
+        ]
+        if not arrays:
+            return np.empty(0)
+        return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+    def columns(self) -> Dict[Any, np.ndarray]:
+        names = dict.fromkeys(col for df, _ in self.parts for col in df.columns)
+        return {name: self.column(name) for name in names}
+
+    def to_frame(self) -> pd.DataFrame:
+        frames = list(self.frames())
+        if not frames:
+            return pd.DataFrame()
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """JSON-ready row dicts (dates as ISO strings, NaN as None)"""
+        frame = self.to_frame()
+        if frame.empty:
+            return []
+        return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+
+def materialize(value: Any) -> Any:
+    """Turn lazy filter results into plain records; anything else passes through"""
+    if isinstance(value, FilterResult):
+        return value.to_records()
+    return value
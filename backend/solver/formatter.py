@@ -0,0 +1,305 @@
+"""
+Answer formatter
+Negotiates the answer type, applies the precision and units the question asks for, and turns
+NumPy/pandas results into native Python values and canonical JSON for submission
+"""
+import re
+import json
+import math
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+import numpy as np
+import pandas as pd
+
+from solver.filters import FilterResult
+from solver.scanner import scan_numbers
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Answer-format cues in page text, most specific first
+FORMAT_PATTERNS = [
+    ("json", re.compile(r"\bjson\b|\b(?:an?|the)\s+object\b")),
+    ("base64", re.compile(r"\bbase64\b|\bdata uri\b|\b(?:image|chart|plot|graph)\b")),
+    ("boolean", re.compile(r"\b(?:true|false|boolean|yes or no)\b")),
+    ("number", re.compile(r"\b(?:number|numeric|integer|count|how many)\b")),
+    ("array", re.compile(r"\b(?:array|list)\b")),
+]
+
+NUMBER_WORDS = {"zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+
+DECIMALS_PATTERN = re.compile(
+    r"\b(?P<n>\d|zero|one|two|three|four|five|six)\s+(?:decimal(?:\s+places?|s)?|d\.?p\.?|digits? after the decimal)"
+)
+SIGNIFICANT_PATTERN = re.compile(r"\b(?P<n>\d|one|two|three|four|five|six)\s+significant\s+(?:figures?|digits?)\b")
+INTEGER_PATTERN = re.compile(
+    r"\b(?:nearest\s+(?:integer|whole\s+number|unit)|as\s+an?\s+(?:integer|whole\s+number)|"
+    r"round(?:ed)?\s+(?:it\s+)?(?:down|up)?\s*to\s+(?:a\s+|the\s+)?whole|no\s+decimals?)\b"
+)
+NEAREST_PATTERN = re.compile(r"\bnearest\s+(?P<unit>ten|hundred|thousand|million)\b")
+SCALE_PATTERN = re.compile(r"\bin\s+(?P<unit>thousands|millions|billions)\b")
+
+UNIT_SCALES = {"ten": 10, "hundred": 100, "thousand": 1_000, "thousands": 1_000,
+               "million": 1_000_000, "millions": 1_000_000, "billions": 1_000_000_000}
+
+TRUE_WORDS = frozenset(["true", "yes", "y", "1"])
+
+# Significant digits kept when the question asks for no precision: a double's
+# reliable range, which drops binary noise such as 0.30000000000000004
+DEFAULT_SIGNIFICANT = 15
+
+
+@dataclass(frozen=True)
+class AnswerSpec:
+    """Output type plus the precision and scaling a question asks for"""
+    format: str = "string"
+    decimals: Optional[int] = None
+    significant: Optional[int] = None
+    nearest: Optional[int] = None
+    scale: int = 1
+
+
+def detect_answer_format(text: str) -> str:
+    """Expected answer type from page text (word matches, most specific type first)"""
+    text = text.lower()
+    for answer_format, pattern in FORMAT_PATTERNS:
+        if pattern.search(text):
+            return answer_format
+    return "string"
+
+
+@lru_cache(maxsize=256)
+def answer_spec(question: str, answer_format: str = "string") -> AnswerSpec:
+    """Read rounding, significant figures and scale requirements from a question"""
+    text = question.lower()
+
+    decimals = significant = nearest = None
+    match = DECIMALS_PATTERN.search(text)
+    if match:
+        decimals = _number_word(match.group("n"))
+    elif INTEGER_PATTERN.search(text):
+        decimals = 0
+    match = SIGNIFICANT_PATTERN.search(text)
+    if match:
+        significant = _number_word(match.group("n"))
+    match = NEAREST_PATTERN.search(text)
+    if match:
+        nearest = UNIT_SCALES[match.group("unit")]
+    match = SCALE_PATTERN.search(text)
+    scale = UNIT_SCALES[match.group("unit")] if match else 1
+
+    return AnswerSpec(format=answer_format, decimals=decimals, significant=significant,
+                      nearest=nearest, scale=scale)
+
+
+def _number_word(word: str) -> int:
+    return int(word) if word.isdigit() else NUMBER_WORDS[word]
+
+
+def format_answer(result: Any, spec: AnswerSpec) -> Any:
+    """Coerce a result to the spec's type and precision, as native Python values"""
+    answer_format = spec.format
+
+    if answer_format == "number":
+        value = _as_number(result)
+        return _round(value, spec) if value is not None else 0
+
+    if answer_format == "boolean":
+        if isinstance(result, str):
+            return result.strip().lower() in TRUE_WORDS
+        return bool(to_native(result))
+
+    if answer_format == "json":
+        if isinstance(result, FilterResult):
+            # Stays lazy until the submitter serializes it
+            return result
+        value = _round(to_native(result), spec)
+        return value if isinstance(value, (dict, list)) else {"result": value}
+
+    if answer_format == "array":
+        if isinstance(result, FilterResult):
+            return result
+        value = to_native(_round(result, spec))
+        return value if isinstance(value, list) else [value]
+
+    # string
+    if isinstance(result, FilterResult):
+        return str(result)
+    value = _round(result, spec)
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and spec.decimals:
+        # "12.50" when two decimals are asked for
+        return f"{value:.{spec.decimals}f}"
+    return str(to_native(value))
+
+
+def _as_number(result: Any) -> Optional[Any]:
+    """Scalar number from a result: single-element containers and numeric text included"""
+    value = to_native(result)
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    if isinstance(value, dict) and len(value) == 1:
+        value = next(iter(value.values()))
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        numbers = scan_numbers(value)
+        if numbers.size == 1:
+            return numbers[0].item()
+    return None
+
+
+def _round(value: Any, spec: AnswerSpec) -> Any:
+    """
+    Apply scale and precision to a scalar, array, list or dict (vectorized for all but scalars)
+
+    Integers only change when scaled or rounded to a coarser unit: float64
+    would cut values beyond 2**53 to 15 significant digits.
+    """
+    if isinstance(value, (pd.Series, pd.Index)):
+        value = value.to_numpy()
+    if isinstance(value, (list, tuple)):
+        return _round_many(list(value), spec)
+    if isinstance(value, dict):
+        return dict(zip(value, _round_many(list(value.values()), spec)))
+    if isinstance(value, np.ndarray):
+        if not np.issubdtype(value.dtype, np.number) or value.dtype == np.bool_:
+            return value
+        if value.dtype.kind in "iu" and not _coarsens(spec):
+            return value
+        return _round_array(value.astype(np.float64), spec)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    if isinstance(value, int) and not _coarsens(spec):
+        return value
+
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    rounded = _round_array(np.asarray([value], dtype=np.float64), spec)
+    return rounded[0] if isinstance(rounded, list) else rounded
+
+
+def _round_many(items: list, spec: AnswerSpec) -> list:
+    """Round a list's numbers in one array pass; other elements (records, text) one by one"""
+    numeric = all(isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_)) for v in items)
+    if items and numeric:
+        values = np.asarray(items)
+        if values.dtype != object:
+            rounded = _round(values, spec)
+            return rounded.tolist() if isinstance(rounded, np.ndarray) else rounded
+    return [_round(v, spec) for v in items]
+
+
+def _coarsens(spec: AnswerSpec) -> bool:
+    """Whether a spec changes whole numbers (scale, nearest unit or significant figures)"""
+    return spec.scale != 1 or bool(spec.nearest) or bool(spec.significant)
+
+
+def _round_array(values: np.ndarray, spec: AnswerSpec) -> Any:
+    if spec.scale != 1:
+        values = values / spec.scale
+    if spec.nearest:
+        values = np.round(values / spec.nearest) * spec.nearest
+    if spec.significant:
+        values = _round_significant(values, spec.significant)
+    if spec.decimals is not None:
+        values = np.round(values, spec.decimals)
+    elif not spec.significant:
+        values = _round_significant(values, DEFAULT_SIGNIFICANT)
+
+    finite = np.isfinite(values)
+    # Whole numbers go out as ints (60, not 60.0), everything else as floats
+    whole = finite & (values == np.trunc(values)) & (np.abs(values) < 2 ** 53)
+    if whole.all():
+        return values.astype(np.int64).tolist()
+    native = values.astype(object)
+    native[whole] = values[whole].astype(np.int64).tolist()
+    native[~finite] = None
+    return native.tolist()
+
+
+def _round_significant(values: np.ndarray, digits: int) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        magnitude = np.where(values == 0, 0, np.floor(np.log10(np.abs(values))))
+    factor = np.power(10.0, digits - 1 - np.nan_to_num(magnitude))
+    return np.round(values * factor) / factor
+
+
+def to_native(value: Any) -> Any:
+    """
+    JSON-compatible Python value for NumPy/pandas results
+
+    Arrays, Series and frames convert in C (tolist / to_json); only plain
+    containers are walked in Python. NaN and infinities become None.
+    """
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, FilterResult):
+        return value.to_records()
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f" and not np.isfinite(value).all():
+            native = value.astype(object)
+            native[~np.isfinite(value)] = None
+            return native.tolist()
+        if value.dtype.kind in "Mm":
+            return to_native(pd.Series(value.ravel()))
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return to_native(value.item())
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.to_json(orient="records", date_format="iso"))
+    if isinstance(value, (pd.Series, pd.Index)):
+        return json.loads(pd.Series(value).to_json(orient="values", date_format="iso"))
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return value.isoformat()
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, dict):
+        return {str(to_native(k)) if not isinstance(k, str) else k: to_native(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        if items and all(isinstance(item, np.generic) for item in items):
+            return to_native(np.asarray(items))
+        return [to_native(item) for item in items]
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def canonical_json(value: Any, use_orjson: bool = HAS_ORJSON) -> bytes:
+    """
+    Compact UTF-8 JSON of a value (no NaN, no NumPy types)
+
+    orjson, when installed, serializes NumPy arrays and scalars itself and
+    only calls back into to_native for pandas and filter results.
+    """
+    if use_orjson:
+        return orjson.dumps(value, default=_orjson_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(to_native(value), separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode("utf-8")
+
+
+def _orjson_default(value: Any) -> Any:
+    native = to_native(value)
+    if native is value:
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+    return native
+
+
+def decode_json(body: Any) -> Any:
+    """Parse a JSON body (bytes or text) with the fastest available decoder"""
+    if HAS_ORJSON:
+        return orjson.loads(body)
+    return json.loads(body)
@@ -0,0 +1,252 @@
+"""
+JSON normalizer
+Finds record arrays anywhere in a JSON document and flattens them into typed DataFrames with
+path-based column names; large documents are parsed incrementally, one chunk of records at a time
+"""
+import json
+import codecs
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Tuple
+import pandas as pd
+
+from solver.loaders import CHUNK_ROWS, optimize_dtypes
+from solver.payloads import as_stream
+from solver.tables import coerce_columns
+
+logger = logging.getLogger(__name__)
+
+# Separator between nested keys in column names and frame paths ("customer.address.city")
+PATH_SEP = "."
+
+# Arrays with fewer elements are treated as values, not records
+MIN_RECORDS = 2
+
+# How deep to look for record arrays
+MAX_DEPTH = 8
+
+# Documents at least this large are parsed incrementally
+JSON_STREAM_THRESHOLD = 16 * 1024 * 1024
+
+# Bytes decoded per read by the incremental parser
+READ_BLOCK = 1024 * 1024
+
+_WHITESPACE = " \t\r\n"
+
+
+def _join(path: str, key: Any) -> str:
+    return f"{path}{PATH_SEP}{key}" if path else str(key)
+
+
+def _is_record_array(value: Any) -> bool:
+    """A list of objects, or of plain scalars, long enough to tabulate"""
+    if not isinstance(value, list) or len(value) < MIN_RECORDS:
+        return False
+    if all(isinstance(item, dict) for item in value):
+        return True
+    return all(item is None or isinstance(item, (int, float, str, bool)) for item in value)
+
+
+def find_record_arrays(obj: Any, path: str = "", depth: int = 0) -> Iterator[Tuple[str, list]]:
+    """
+    Yield (path, array) for every record array in a document
+
+    Record arrays are not searched further; their nested objects become
+    flattened columns instead.
+    """
+    if depth > MAX_DEPTH:
+        return
+    if _is_record_array(obj):
+        yield path, obj
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from find_record_arrays(value, _join(path, key), depth + 1)
+    elif isinstance(obj, list):
+        for position, value in enumerate(obj):
+            yield from find_record_arrays(value, _join(path, position), depth + 1)
+
+
+def records_frame(records: list, path: str = "") -> pd.DataFrame:
+    """Flatten one array of records (or scalars) into an untyped DataFrame"""
+    if records and not isinstance(records[0], dict):
+        name = path.rsplit(PATH_SEP, 1)[-1] if path else "value"
+        return pd.DataFrame({name: records})
+    return pd.json_normalize(records, sep=PATH_SEP)
+
+
+def finish_frame(df: pd.DataFrame, path: str = "") -> pd.DataFrame:
+    """Type a flattened frame and tag it with the document path it came from"""
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_object_dtype(series.dtype) and series.map(lambda v: isinstance(v, (list, dict))).any():
+            # Nested arrays stay addressable as JSON text
+            df[col] = series.map(lambda v: json.dumps(v) if isinstance(v, (list, dict)) else v)
+    df = optimize_dtypes(coerce_columns(df))
+    df.attrs["json_path"] = path
+    return df
+
+
+def json_frames(obj: Any) -> List[pd.DataFrame]:
+    """
+    Typed DataFrames for a parsed JSON document
+
+    Every record array becomes a frame; a document without any becomes one
+    row whose columns are the paths to its scalar leaves.
+    """
+    frames = []
+    for path, records in find_record_arrays(obj):
+        try:
+            frames.append(finish_frame(records_frame(records, path), path))
+        except Exception as e:
+            logger.debug(f"Could not flatten JSON records at '{path}': {e}")
+
+    if not frames and isinstance(obj, dict) and obj:
+        try:
+            frames.append(finish_frame(pd.json_normalize(obj, sep=PATH_SEP)))
+        except Exception as e:
+            logger.debug(f"Could not flatten JSON document: {e}")
+    return frames
+
+
+class _JSONStream:
+    """
+    Incremental reader over JSON text
+
+    Keeps a sliding window of decoded text; values are decoded one at a
+    time with raw_decode, reading more whenever a value runs past the window.
+    """
+
+    def __init__(self, content: Any):
+        self._stream = as_stream(content)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int = READ_BLOCK) -> bool:
+        if self._eof:
+            return False
+        block = self._stream.read(size)
+        self._eof = not block
+        text = self._decoder.decode(block or b"", final=self._eof)
+        # Drop consumed text so the window stays around one block
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return bool(text) or not self._eof
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of input)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON, found {char!r}")
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next complete value"""
+        self.peek()
+        size = READ_BLOCK
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+                # A number at the window's edge may continue in the next block
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # Values larger than the window are read in growing blocks, not re-parsed per block
+            self._fill(size)
+            size *= 2
+
+
+def iter_json_records(content: Any, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[str, Any]]:
+    """
+    Walk a JSON document incrementally
+
+    Yields (path, list of records) chunks for a top-level array or the arrays
+    directly under a top-level object, and (path, value) with a non-list value
+    for every other top-level member, which is decoded whole.
+    """
+    stream = _JSONStream(content)
+    start = stream.peek()
+    if start == "[":
+        yield from _iter_array(stream, "", chunk_rows)
+        return
+    if start != "{":
+        yield "", stream.value()
+        return
+
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if stream.peek() == "[":
+            yield from _iter_array(stream, str(key), chunk_rows)
+        else:
+            yield str(key), stream.value()
+        if stream.expect(",}") == "}":
+            return
+
+
+def _iter_array(stream: _JSONStream, path: str, chunk_rows: int) -> Iterator[Tuple[str, list]]:
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return
+    chunk = []
+    while True:
+        chunk.append(stream.value())
+        if len(chunk) >= chunk_rows:
+            yield path, chunk
+            chunk = []
+        if stream.expect(",]") == "]":
+            break
+    if chunk:
+        yield path, chunk
+
+
+def stream_json_frames(content: Any, chunk_rows: int = CHUNK_ROWS) -> Tuple[List[pd.DataFrame], Dict[str, Any]]:
+    """
+    Flatten a large JSON document without building its whole object tree
+
+    Record arrays are flattened one chunk at a time; only the resulting
+    columns are kept. Returns the frames and the document's other
+    top-level members (metadata, summaries) as a dict.
+    """
+    parts: Dict[str, List[pd.DataFrame]] = defaultdict(list)
+    scalars: Dict[str, Any] = {}
+
+    for path, value in iter_json_records(content, chunk_rows):
+        if isinstance(value, list):
+            if parts[path] or _is_record_array(value):
+                parts[path].append(records_frame(value, path))
+            else:
+                scalars[path] = value
+        else:
+            scalars[path] = value
+            for nested_path, records in find_record_arrays(value, path):
+                parts[nested_path].append(records_frame(records, nested_path))
+
+    frames = []
+    for path, chunks in parts.items():
+        if chunks:
+            df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+            frames.append(finish_frame(df, path))
+    logger.info(f"Streamed JSON into {len(frames)} frame(s): {sum(len(df) for df in frames)} rows")
+
+    document = scalars.get("") if list(scalars) == [""] else scalars
+    return frames, document
@@ -0,0 +1,347 @@
+"""
+Fast tabular loaders
+CSV: sniffs encoding and delimiter, uses the pyarrow engine when available and shrinks dtypes
+CSV / JSON-lines chunk readers for sources too large to load at once
+Excel: lazy workbook that streams only the sheets a query references
+"""
+import io
+import csv
+import json
+import codecs
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import openpyxl
+
+from solver.columns import ColumnIndex
+from solver.payloads import as_stream
+from solver.query import QueryPlan
+from solver.tables import coerce_columns
+from solver.utils import detect_encoding
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import python_calamine  # noqa: F401
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+SNIFF_BYTES = 64 * 1024
+SNIFF_DELIMITERS = ",;\t|"
+
+# Strings become categoricals when at most this share of values is distinct
+CATEGORY_RATIO = 0.5
+CATEGORY_MIN_ROWS = 32
+
+# Rows per chunk when streaming sources too large to load at once
+CHUNK_ROWS = 250_000
+
+# Minimum column-index score for a sheet to count as referenced
+SHEET_MATCH_SCORE = 0.5
+
+
+def sniff_encoding(sample: bytes) -> str:
+    """Guess the encoding of a byte prefix, preferring UTF-8"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # Incremental decode tolerates a multi-byte char cut at the sample edge
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return detect_encoding(sample)
+
+
+def sniff_delimiter(text: str) -> str:
+    """Guess the field delimiter from the first lines of a CSV sample"""
+    lines = text.splitlines()[:50]
+    if len(lines) > 1:
+        # Drop a possibly truncated last line
+        lines = lines[:-1] if not text.endswith(("\n", "\r")) else lines
+    try:
+        return csv.Sniffer().sniff("\n".join(lines), delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrink column dtypes in place-safe fashion
+
+    Integers are downcast, floats only when float32 is lossless (so sums and
+    means keep their exact values), and low-cardinality strings become
+    categoricals.
+    """
+    for col in df.columns:
+        series = df[col]
+        dtype = series.dtype
+
+        if pd.api.types.is_bool_dtype(dtype):
+            continue
+        if pd.api.types.is_integer_dtype(dtype):
+            df[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(dtype):
+            values = series.to_numpy()
+            narrowed = values.astype(np.float32)
+            if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+                df[col] = narrowed
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            if len(series) >= CATEGORY_MIN_ROWS and series.nunique(dropna=True) <= CATEGORY_RATIO * len(series):
+                df[col] = series.astype("category")
+
+    return df
+
+
+def select_columns(header: List[Any], plan: Optional[QueryPlan]) -> Optional[List[Any]]:
+    """
+    Pick the header columns a query plan references
+
+    Returns:
+        Column subset, or None when the plan does not pin down a target column
+        (in which case everything must be read)
+    """
+    if plan is None or plan.operation in ("extract", "filter"):
+        return None
+
+    index = ColumnIndex([pd.DataFrame(columns=header)])
+    # The header has no dtypes yet, so every column any term names is kept:
+    # "which name has the highest score" needs both the label and the measure
+    wanted = [match.column for match in index.lookup(plan.target_terms)]
+    if not wanted:
+        return None
+
+    for term in [plan.group_by, *plan.group_keys] + [c.column for c in plan.filters]:
+        if term:
+            col = index.best((term,))
+            if col is None:
+                return None
+            wanted.append(col)
+
+    return [col for col in header if col in wanted]
+
+
+class CSVLoader:
+    """Loads CSV bytes into compact DataFrames"""
+
+    def __init__(self, use_pyarrow: bool = HAS_PYARROW):
+        self.use_pyarrow = use_pyarrow
+
+    def load(self, content: bytes, plan: Optional[QueryPlan] = None) -> Optional[pd.DataFrame]:
+        """
+        Parse CSV content
+
+        Args:
+            content: Raw CSV bytes
+            plan: Optional query plan used to read only referenced columns
+
+        Returns:
+            DataFrame, or None if the content could not be parsed
+        """
+        encoding, delimiter, usecols = self.sniff(content, plan)
+
+        df = self._read(content, encoding, delimiter, usecols)
+        if df is None and encoding.lower() not in ("latin-1", "iso-8859-1"):
+            logger.warning("Retrying CSV parse as latin-1")
+            df = self._read(content, "latin-1", delimiter, usecols)
+        if df is None:
+            return None
+
+        if usecols:
+            logger.info(f"Read {len(usecols)} referenced column(s): {usecols}")
+        # Formatted numbers ("$1,200", "15%") arrive as strings
+        return optimize_dtypes(coerce_columns(df))
+
+    def sniff(self, content: bytes, plan: Optional[QueryPlan] = None) -> Tuple[str, str, Optional[List[Any]]]:
+        """
+        Encoding, delimiter and the plan's referenced columns (None for all)
+        from the first SNIFF_BYTES of content
+        """
+        sample = bytes(content[:SNIFF_BYTES])
+        encoding = sniff_encoding(sample)
+        text_sample = sample.decode(encoding, errors="ignore")
+        delimiter = sniff_delimiter(text_sample)
+
+        usecols = None
+        try:
+            header = next(csv.reader(io.StringIO(text_sample), delimiter=delimiter))
+            usecols = select_columns([h.strip() for h in header], plan)
+            if usecols is not None and len(usecols) == len(header):
+                usecols = None
+            if usecols:
+                # Match the raw header spelling, including any padding
+                usecols = [h for h in header if h.strip() in usecols]
+        except (StopIteration, csv.Error):
+            pass
+        return encoding, delimiter, usecols
+
+    def iter_chunks(self, content: bytes, plan: Optional[QueryPlan] = None,
+                    chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        Parse CSV content in row chunks
+
+        Uses the C engine's chunked reader: pyarrow's block reader fixes column
+        types from the first block and fails when a later block disagrees.
+        """
+        encoding, delimiter, usecols = self.sniff(content, plan)
+        reader = pd.read_csv(as_stream(content), sep=delimiter, encoding=encoding,
+                             usecols=usecols, chunksize=chunk_rows, encoding_errors="replace")
+        with reader:
+            for chunk in reader:
+                yield coerce_columns(chunk)
+
+    def _read(self, content: bytes, encoding: str, delimiter: str,
+              usecols: Optional[List[Any]]) -> Optional[pd.DataFrame]:
+        """Read with the pyarrow engine when possible, else the C engine"""
+        engines = ["pyarrow", "c"] if self.use_pyarrow else ["c"]
+        for engine in engines:
+            try:
+                return pd.read_csv(
+                    as_stream(content),
+                    sep=delimiter,
+                    encoding=encoding,
+                    usecols=usecols,
+                    engine=engine,
+                )
+            except Exception as e:
+                logger.debug(f"CSV read with {engine} engine failed: {e}")
+        logger.error(f"Error reading CSV as {encoding}")
+        return None
+
+
+def is_json_lines(content: bytes) -> bool:
+    """
+    Whether content looks like JSON-lines (one object per line) rather than one document
+
+    The first two non-empty lines must both be complete objects; a single
+    document followed by a trailing newline is not JSON-lines.
+    """
+    objects = 0
+    for line in bytes(content[:SNIFF_BYTES]).split(b"\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if not (line.startswith(b"{") and line.endswith(b"}")):
+            return False
+        try:
+            if not isinstance(json.loads(line), dict):
+                return False
+        except ValueError:
+            return False
+        objects += 1
+        if objects == 2:
+            return True
+    return False
+
+
+def iter_json_lines(content: bytes, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Parse JSON-lines content in row chunks"""
+    reader = pd.read_json(as_stream(content), lines=True, chunksize=chunk_rows)
+    with reader:
+        for chunk in reader:
+            yield coerce_columns(chunk)
+
+
+class LazyWorkbook:
+    """
+    Excel workbook whose sheets are parsed on demand
+
+    Sheet names and header rows come from openpyxl's read-only streaming
+    mode; full sheets are read with calamine when installed, otherwise by
+    streaming openpyxl row values (no cell objects).
+    """
+
+    def __init__(self, content: bytes, use_calamine: bool = HAS_CALAMINE):
+        self.content = content
+        self.use_calamine = use_calamine
+        self._sheets: Dict[str, pd.DataFrame] = {}
+        self._headers: Dict[str, List[Any]] = {}
+        self._workbook = None
+        self._excel_file = None
+
+        try:
+            self._workbook = openpyxl.load_workbook(as_stream(content), read_only=True, data_only=True)
+            self.sheet_names = list(self._workbook.sheetnames)
+        except Exception as e:
+            # Legacy .xls and other formats openpyxl cannot stream
+            logger.debug(f"openpyxl could not open workbook ({e}), using pandas")
+            self._excel_file = pd.ExcelFile(as_stream(content))
+            self.sheet_names = list(self._excel_file.sheet_names)
+
+    def headers(self, sheet: str) -> List[Any]:
+        """Header row of a sheet, read without loading the sheet"""
+        if sheet not in self._headers:
+            if sheet in self._sheets:
+                self._headers[sheet] = list(self._sheets[sheet].columns)
+            elif self._workbook is not None:
+                rows = self._workbook[sheet].iter_rows(max_row=1, values_only=True)
+                first = next(rows, ())
+                self._headers[sheet] = _header_names(first)
+            else:
+                self._headers[sheet] = list(pd.read_excel(self._excel_file, sheet_name=sheet, nrows=0).columns)
+        return self._headers[sheet]
+
+    def load(self, sheet: str) -> pd.DataFrame:
+        """Parse one sheet (cached)"""
+        if sheet not in self._sheets:
+            self._sheets[sheet] = optimize_dtypes(coerce_columns(self._read_sheet(sheet)))
+            logger.info(f"Loaded sheet '{sheet}' ({len(self._sheets[sheet])} rows)")
+        return self._sheets[sheet]
+
+    def select_sheets(self, plan: Optional[QueryPlan]) -> List[str]:
+        """
+        Sheets a query plan references, by header or sheet name
+
+        Falls back to every sheet when nothing matches.
+        """
+        if plan is None or len(self.sheet_names) <= 1:
+            return list(self.sheet_names)
+
+        terms = [t for t in plan.target_terms + (plan.group_by,) if t]
+        index = ColumnIndex([pd.DataFrame(columns=self.headers(name)) for name in self.sheet_names])
+        sheet_index = ColumnIndex([pd.DataFrame(columns=self.sheet_names)])
+
+        selected = {self.sheet_names[m.frame] for m in index.lookup(terms) if m.score >= SHEET_MATCH_SCORE}
+        selected.update(m.column for m in sheet_index.lookup(terms) if m.score >= SHEET_MATCH_SCORE)
+        if not selected:
+            return list(self.sheet_names)
+        return [name for name in self.sheet_names if name in selected]
+
+    def close(self):
+        """Release the underlying workbook handle"""
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+    def _read_sheet(self, sheet: str) -> pd.DataFrame:
+        if self.use_calamine:
+            try:
+                return pd.read_excel(as_stream(self.content), sheet_name=sheet, engine="calamine")
+            except Exception as e:
+                logger.debug(f"calamine failed on '{sheet}': {e}")
+
+        if self._workbook is None:
+            return pd.read_excel(self._excel_file, sheet_name=sheet)
+
+        rows = self._workbook[sheet].iter_rows(values_only=True)
+        header = _header_names(next(rows, ()))
+        records = [row[:len(header)] for row in rows]
+        # Trailing blank rows are common in hand-edited sheets
+        while records and all(v is None for v in records[-1]):
+            records.pop()
+        return pd.DataFrame.from_records(records, columns=header).infer_objects()
+
+
+def _header_names(row: tuple) -> List[Any]:
+    """Header cells with pandas-style names for blanks, trailing blanks dropped"""
+    cells = list(row)
+    while cells and cells[-1] is None:
+        cells.pop()
+    return [cell if cell is not None else f"Unnamed: {i}" for i, cell in enumerate(cells)]
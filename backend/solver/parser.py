@@ -8,6 +8,9 @@ import logging
 from typing import Dict, Any, List, Optional
 from bs4 import BeautifulSoup
 
+from solver.formatter import detect_answer_format
+from solver.resolver import MAX_SUBMIT_URLS, rank_submit_urls
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,6 +31,7 @@ class QuizParser:
             - instructions: Any special instructions
             - data_sources: List of data files/URLs to download
             - submit_url: URL to submit answer
+            - submit_urls: Ranked submit URL candidates
             - answer_format: Expected answer format
             - requires_visualization: Whether visualization is needed
         """
@@ -37,6 +41,7 @@ class QuizParser:
                 "instructions": self._extract_instructions(),
                 "data_sources": self._extract_data_sources(),
                 "submit_url": self._extract_submit_url(),
+                "submit_urls": self._extract_submit_urls(),
                 "answer_format": self._extract_answer_format(),
                 "requires_visualization": self._check_visualization_required(),
                 "embedded_data": self._extract_embedded_data(),
@@ -150,111 +155,20 @@ class QuizParser:
         return unique_sources
     
     def _extract_submit_url(self) -> Optional[str]:
-        """Extract submit URL dynamically"""
-        base_url = self.page_content.get("url", "")
-        logger.info(f"[SUBMIT_URL_DEBUG] Extracting submit URL from base: {base_url}")
-        
-        # Helper to make absolute URL
-        def make_absolute(url):
-            if not url:
-                return None
-            if url.startswith('http'):
-                return url
-            if url.startswith('/'):
-                # Absolute path - use base URL origin
-                from urllib.parse import urlparse
-                parsed = urlparse(base_url)
-                return f"{parsed.scheme}://{parsed.netloc}{url}"
-            # Relative path
-            from urllib.parse import urljoin
-            return urljoin(base_url, url)
-        
-        # Check forms
-        forms = self.page_content.get("forms", [])
-        logger.info(f"[SUBMIT_URL_DEBUG] Found {len(forms)} forms")
-        for i, form in enumerate(forms):
-            action = form.get("action", "")
-            logger.info(f"[SUBMIT_URL_DEBUG] Form {i}: action='{action}', method='{form.get('method', '')}'")
-            if action and ('submit' in action.lower() or 'answer' in action.lower()):
-                abs_url = make_absolute(action)
-                logger.info(f"[SUBMIT_URL_DEBUG] Found submit URL in form: {abs_url}")
-                return abs_url
-            if action and action.startswith('http'):
-                logger.info(f"[SUBMIT_URL_DEBUG] Found http URL in form: {action}")
-                return action
-        
-        # Check data attributes
-        for data_attr in self.page_content.get("data_attrs", []):
-            submit_url = data_attr.get("submit", "")
-            if submit_url:
-                return make_absolute(submit_url)
-        
-        # Check links with submit keyword
-        for link in self.page_content.get("links", []):
-            href = link.get("href", "")
-            text = link.get("text", "").lower()
-            if 'submit' in text or 'answer' in text or 'submit' in href.lower():
-                return make_absolute(href)
-        
-        # Check scripts for submit URLs
-        for script in self.page_content.get("scripts", []):
-            # Look for fetch/axios/ajax calls
-            submit_patterns = [
-                r'fetch\([\'"]([^\'"]+)[\'"]',
-                r'axios\.post\([\'"]([^\'"]+)[\'"]',
-                r'\.ajax\([\'"]([^\'"]+)[\'"]',
-                r'submitUrl[\'"]?\s*[:=]\s*[\'"]([^\'"]+)[\'"]',
-                r'SUBMIT_URL\s*=\s*[\'"]([^\'"]+)[\'"]'
-            ]
-            for pattern in submit_patterns:
-                matches = re.findall(pattern, script)
-                for match in matches:
-                    if 'submit' in match.lower() or match.startswith('http'):
-                        return make_absolute(match)
-        
-        # Look for text mentioning "/submit" or similar
-        text_content = self.page_content.get("text", "")
-        if '/submit' in text_content:
-            abs_url = make_absolute('/submit')
-            logger.info(f"[SUBMIT_URL_DEBUG] Found /submit in text content: {abs_url}")
-            return abs_url
-        
-        # If still not found, look for any POST endpoint
-        for form in forms:
-            if form.get("method", "").upper() == "POST":
-                abs_url = make_absolute(form.get("action", ""))
-                logger.info(f"[SUBMIT_URL_DEBUG] Using POST form action: {abs_url}")
-                return abs_url
-        
-        # Last resort: construct submit URL from base URL
-        # Most quiz systems follow a pattern like /submit or /answer
-        if base_url:
-            from urllib.parse import urlparse
-            parsed = urlparse(base_url)
-            # Try common submit endpoints - return /submit
-            potential_url = f"{parsed.scheme}://{parsed.netloc}/submit"
-            logger.info(f"[SUBMIT_URL_DEBUG] Using fallback: {potential_url}")
-            return potential_url
-        
-        logger.warning("[SUBMIT_URL_DEBUG] No submit URL found and no base_url!")
-        return None
+        """Extract submit URL dynamically (best-ranked candidate)"""
+        urls = self._extract_submit_urls()
+        if not urls:
+            logger.warning("No submit URL found and no base_url!")
+            return None
+        return urls[0]
+    
+    def _extract_submit_urls(self) -> List[str]:
+        """Submit URL candidates, best first, for the submitter to fall back through"""
+        return [c.url for c in rank_submit_urls(self.page_content)[:MAX_SUBMIT_URLS]]
     
     def _extract_answer_format(self) -> str:
         """Determine expected answer format"""
-        text = self.page_content.get("text", "").lower()
-        
-        if "json" in text or "object" in text:
-            return "json"
-        elif "base64" in text or "image" in text or "chart" in text:
-            return "base64"
-        elif "true" in text or "false" in text or "boolean" in text:
-            return "boolean"
-        elif "number" in text or "integer" in text or "count" in text:
-            return "number"
-        elif "array" in text or "list" in text:
-            return "array"
-        else:
-            return "string"
+        return detect_answer_format(self.page_content.get("text", ""))
     
     def _check_visualization_required(self) -> bool:
         """Check if visualization is required"""
@@ -290,7 +204,7 @@ class QuizParser:
                 logger.debug(f"Error extracting JSON from script: {e}")
             
             # Look for base64 encoded data
-            base64_pattern = r'atob\([\'"]([A-Za-z0-9+/=]+)[\'"]\)'
+            base64_pattern = r'atob\([\'"]((?:ref:)?[A-Za-z0-9+/=]+)[\'"]\)'
             base64_matches = re.findall(base64_pattern, script)
             for b64_data in base64_matches:
                 embedded.append({"type": "base64", "data": b64_data})
@@ -334,7 +248,7 @@ class QuizParser:
     
     def _is_data_url(self, url: str) -> bool:
         """Check if URL points to data file"""
-        data_extensions = ['.pdf', '.csv', '.xlsx', '.xls', '.json', '.xml', '.txt']
+        data_extensions = ['.pdf', '.csv', '.xlsx', '.xls', '.json', '.ndjson', '.xml', '.txt']
         url_lower = url.lower()
         # Also check for data: URLs (inline data)
         if url_lower.startswith('data:'):
@@ -349,6 +263,8 @@ class QuizParser:
             return 'csv'
         elif url_lower.startswith('data:application/pdf'):
             return 'pdf'
+        elif url_lower.startswith(('data:application/x-ndjson', 'data:application/jsonl')):
+            return 'jsonl'
         elif url_lower.startswith('data:application/json'):
             return 'json'
         elif url_lower.startswith('data:'):
@@ -359,6 +275,8 @@ class QuizParser:
             return 'csv'
         elif '.xlsx' in url_lower or '.xls' in url_lower:
             return 'excel'
+        elif '.jsonl' in url_lower or '.ndjson' in url_lower:
+            return 'jsonl'
         elif '.json' in url_lower:
             return 'json'
         elif '/api/' in url_lower:
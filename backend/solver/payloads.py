@@ -0,0 +1,240 @@
+"""
+Inline payload store
+Decodes base64 / data: URL payloads once per unique content, hands out memoryviews and
+replaces raw copies in page content with short references
+"""
+import io
+import re
+import logging
+import binascii
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+from urllib.parse import unquote_to_bytes
+
+logger = logging.getLogger(__name__)
+
+REF_PREFIX = "ref:"
+
+# Inline payloads smaller than this are left in place
+MIN_STRIP_SIZE = 1024
+
+DATA_URL_PATTERN = re.compile(r"data:([^,\"'\s<>]*?);base64,([A-Za-z0-9+/=]+)")
+ATOB_PATTERN = re.compile(r"atob\(([\'\"])([A-Za-z0-9+/=]+)\1\)")
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+
+class MemoryviewReader(io.RawIOBase):
+    """Seekable read-only file over a memoryview, copying only what is read"""
+
+    def __init__(self, view: memoryview):
+        self._view = view.cast("B") if view.format != "B" else view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self._view[self._pos:self._pos + len(buffer)]
+        size = len(chunk)
+        buffer[:size] = chunk
+        self._pos += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def as_stream(content: BufferLike) -> io.BufferedIOBase:
+    """
+    Binary file object over content without copying it
+
+    BytesIO shares an immutable bytes object until written to, but copies
+    any other buffer, so memoryviews get a reader that slices on demand.
+    """
+    if isinstance(content, bytes):
+        return io.BytesIO(content)
+    return io.BufferedReader(MemoryviewReader(memoryview(content)))
+
+
+class PayloadStore:
+    """
+    One decoded buffer per unique inline payload
+
+    Raw base64 text is registered cheaply (keyed by length and string hash)
+    and decoded on first access; the decoded bytes then replace the text.
+    Entries are evicted least-recently-used once max_bytes is exceeded,
+    except those pinned by a chain that still needs them.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Union[str, bytes]]" = OrderedDict()
+        self._size = 0
+        # key -> number of chains holding it
+        self._pins: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key_for(payload: str) -> str:
+        """Stable in-process key for an encoded payload"""
+        return f"{len(payload):x}{hash(payload) & 0xFFFFFFFFFFFFFFFF:016x}"
+
+    def register(self, payload: str, pin: bool = False) -> str:
+        """Record base64 text for lazy decoding, returning its key (pinned if asked)"""
+        key = self.key_for(payload)
+        if pin:
+            # Pinned before storing, so making room never evicts the new entry
+            self._pins[key] = self._pins.get(key, 0) + 1
+        if key not in self._entries:
+            self._store(key, payload)
+        else:
+            self._entries.move_to_end(key)
+        return key
+
+    def unpin(self, keys: Iterable[str]):
+        """Release one pin on each key, evicting what no longer fits"""
+        for key in keys:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+        self._evict()
+
+    def get(self, key: str) -> Optional[memoryview]:
+        """Decoded bytes for a key, decoding on first access"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if isinstance(entry, str):
+            decoded = binascii.a2b_base64(entry)
+            self._size -= len(entry)
+            self._entries[key] = decoded
+            self._size += len(decoded)
+            entry = decoded
+        self._entries.move_to_end(key)
+        return memoryview(entry)
+
+    def decode_base64(self, text: str) -> Optional[memoryview]:
+        """Decode base64 text or resolve a "ref:" reference"""
+        if text.startswith(REF_PREFIX):
+            view = self.get(text[len(REF_PREFIX):])
+            if view is None:
+                logger.warning(f"Payload {text} was evicted")
+            return view
+        return self.get(self.register(text))
+
+    def decode_data_url(self, url: str) -> Tuple[str, Optional[memoryview]]:
+        """
+        Decode a data: URL (inline, base64 or stored reference)
+
+        Returns:
+            (header, decoded buffer) - buffer is None if a reference is unknown
+        """
+        header, _, data = url.partition(",")
+        if ";ref=" in header:
+            header, _, key = header.partition(";ref=")
+            return header, self.get(key)
+        if header.endswith(";base64"):
+            return header[:-len(";base64")], self.decode_base64(data)
+        return header, memoryview(unquote_to_bytes(data))
+
+    def reference(self, header: str, payload: str) -> str:
+        """Register a data: URL payload and return its short replacement URL"""
+        return f"{header};ref={self.register(payload)},"
+
+    def discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry)
+
+    def clear(self):
+        self._entries.clear()
+        self._pins.clear()
+        self._size = 0
+
+    def _store(self, key: str, entry: Union[str, bytes]):
+        self._entries[key] = entry
+        self._size += len(entry)
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used unpinned entries until under max_bytes"""
+        if self._size <= self.max_bytes:
+            return
+        for key in list(self._entries):
+            if self._size <= self.max_bytes or len(self._entries) <= 1:
+                break
+            if key not in self._pins:
+                self._size -= len(self._entries.pop(key))
+
+
+# Process-wide store shared by the browser, downloader and analyzer
+payload_store = PayloadStore()
+
+
+def strip_inline_payloads(page_content: Dict[str, Any], store: PayloadStore = payload_store,
+                          min_size: int = MIN_STRIP_SIZE) -> Dict[str, Any]:
+    """
+    Replace large inline base64 payloads in page content with store references
+
+    Links, images, the HTML dump and atob() calls in scripts all carry the
+    same payload text; after this only the store holds it. Every reference
+    is pinned once and listed under "payload_keys"; the chain that loaded
+    the page unpins them when it finishes.
+    """
+    keys = page_content.setdefault("payload_keys", [])
+
+    def register(payload: str) -> str:
+        key = store.key_for(payload)
+        if key in keys:
+            return store.register(payload)
+        keys.append(key)
+        return store.register(payload, pin=True)
+
+    def replace_url(match: re.Match) -> str:
+        if len(match.group(2)) < min_size:
+            return match.group(0)
+        return f"data:{match.group(1)};ref={register(match.group(2))},"
+
+    def replace_atob(match: re.Match) -> str:
+        if len(match.group(2)) < min_size:
+            return match.group(0)
+        quote = match.group(1)
+        return f"atob({quote}{REF_PREFIX}{register(match.group(2))}{quote})"
+
+    stripped = 0
+    for link in page_content.get("links", []):
+        href = link.get("href", "")
+        if href.startswith("data:") and len(href) >= min_size:
+            link["href"] = DATA_URL_PATTERN.sub(replace_url, href)
+            stripped += 1
+    for image in page_content.get("images", []):
+        src = image.get("src", "")
+        if src.startswith("data:") and len(src) >= min_size:
+            image["src"] = DATA_URL_PATTERN.sub(replace_url, src)
+            stripped += 1
+
+    if "html" in page_content:
+        page_content["html"] = DATA_URL_PATTERN.sub(replace_url, page_content["html"])
+    if "scripts" in page_content:
+        page_content["scripts"] = [ATOB_PATTERN.sub(replace_atob, s) for s in page_content["scripts"]]
+        page_content["scripts"] = [DATA_URL_PATTERN.sub(replace_url, s) for s in page_content["scripts"]]
+
+    if stripped:
+        logger.info(f"Moved {stripped} inline payload(s) into the payload store")
+    return page_content
@@ -0,0 +1,159 @@
+"""
+PDF extraction engine
+Splits pages across a process pool, skips table detection on pages without ruling lines
+and streams per-page results as they complete
+"""
+import logging
+import tempfile
+from concurrent.futures import as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import pdfplumber
+import PyPDF2
+
+from solver.payloads import as_stream
+from solver.workers import DEFAULT_WORKERS, get_process_pool
+
+logger = logging.getLogger(__name__)
+
+# Documents this short are cheaper to parse in-process than to ship to workers
+SERIAL_PAGE_LIMIT = 4
+
+
+def has_ruling(page) -> bool:
+    """Whether a page has the line/rect edges pdfplumber's table finder needs"""
+    return bool(page.lines or page.rects)
+
+
+def _extract_page(page, number: int, text_only: bool) -> Dict[str, Any]:
+    """Extract text and (ruled) tables from one pdfplumber page"""
+    result = {"page": number, "text": "", "tables": []}
+    try:
+        result["text"] = page.extract_text() or ""
+        if not text_only and has_ruling(page):
+            result["tables"] = [t for t in page.extract_tables() if t and len(t) > 1]
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        # Drop parsed layout objects before moving to the next page
+        page.close()
+    return result
+
+
+def _extract_pages(source: Any, numbers: Sequence[int], text_only: bool) -> List[Dict[str, Any]]:
+    """Worker entry point: extract a batch of pages from a path or bytes"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = as_stream(source)
+    try:
+        with pdfplumber.open(source) as pdf:
+            return [_extract_page(pdf.pages[n], n, text_only) for n in numbers]
+    except Exception as e:
+        return [{"page": n, "text": "", "tables": [], "error": str(e)} for n in numbers]
+
+
+def _pypdf2_pages(content: bytes, numbers: Sequence[int]) -> Dict[int, str]:
+    """Text for specific pages via PyPDF2, used only for pages pdfplumber failed on"""
+    texts = {}
+    try:
+        reader = PyPDF2.PdfReader(as_stream(content))
+        for n in numbers:
+            if n < len(reader.pages):
+                texts[n] = reader.pages[n].extract_text() or ""
+    except Exception as e:
+        logger.error(f"PyPDF2 also failed: {e}")
+    return texts
+
+
+class PDFEngine:
+    """Extracts PDF text and tables page by page, in parallel for long documents"""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, text_only: bool = False):
+        self.max_workers = max_workers
+        self.text_only = text_only
+
+    def page_count(self, content: bytes) -> int:
+        """Number of pages, or 0 if the document cannot be opened"""
+        try:
+            with pdfplumber.open(as_stream(content)) as pdf:
+                return len(pdf.pages)
+        except Exception as e:
+            logger.warning(f"pdfplumber could not open PDF: {e}")
+            try:
+                return len(PyPDF2.PdfReader(as_stream(content)).pages)
+            except Exception:
+                return 0
+
+    def iter_pages(self, content: bytes, pages: Optional[Sequence[int]] = None,
+                   text_only: Optional[bool] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream per-page results as they become available
+
+        Args:
+            content: PDF bytes
+            pages: Zero-based page numbers to read (default: all)
+            text_only: Skip table extraction entirely
+
+        Yields:
+            {"page", "text", "tables"} dicts, in completion order
+        """
+        text_only = self.text_only if text_only is None else text_only
+        total = self.page_count(content)
+        numbers = [n for n in (pages if pages is not None else range(total)) if 0 <= n < total]
+        if pages is not None and not numbers:
+            logger.warning(f"Requested pages {list(pages)} not in document ({total} pages), reading all")
+            numbers = list(range(total))
+
+        failed = []
+        for result in self._run(content, numbers, text_only):
+            if "error" in result:
+                failed.append(result["page"])
+                continue
+            yield result
+
+        if failed:
+            logger.warning(f"pdfplumber failed on {len(failed)} page(s), trying PyPDF2")
+            for number, text in _pypdf2_pages(content, failed).items():
+                yield {"page": number, "text": text, "tables": []}
+
+    def extract(self, content: bytes, pages: Optional[Sequence[int]] = None,
+                text_only: Optional[bool] = None) -> Dict[str, Any]:
+        """Collect all page results into document order"""
+        results = sorted(self.iter_pages(content, pages, text_only), key=lambda r: r["page"])
+        return {
+            "text": "\n".join(r["text"] for r in results if r["text"]),
+            "tables": [table for r in results for table in r["tables"]],
+        }
+
+    def _run(self, content: bytes, numbers: List[int], text_only: bool) -> Iterator[Dict[str, Any]]:
+        """Dispatch page batches serially or across the process pool"""
+        if len(numbers) <= SERIAL_PAGE_LIMIT or self.max_workers <= 1:
+            try:
+                pdf = pdfplumber.open(as_stream(content))
+            except Exception as e:
+                for n in numbers:
+                    yield {"page": n, "text": "", "tables": [], "error": str(e)}
+                return
+            with pdf:
+                for n in numbers:
+                    yield _extract_page(pdf.pages[n], n, text_only)
+            return
+
+        # Workers read the document from a temp file instead of each
+        # receiving a pickled copy of the bytes
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as handle:
+            handle.write(content)
+            handle.flush()
+
+            batch_count = min(len(numbers), self.max_workers * 2)
+            size = -(-len(numbers) // batch_count)
+            batches = [numbers[i:i + size] for i in range(0, len(numbers), size)]
+            logger.info(f"Extracting {len(numbers)} PDF pages in {len(batches)} batches")
+
+            pool = get_process_pool(self.max_workers)
+            futures = [pool.submit(_extract_pages, handle.name, batch, text_only) for batch in batches]
+            for future in as_completed(futures):
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    logger.error(f"PDF worker failed: {e}")
+                    batch = batches[futures.index(future)]
+                    yield from _extract_pages(content, batch, text_only)
@@ -0,0 +1,401 @@
+"""
+Question-to-query compiler
+Turns free-form question text into a typed query plan for the analyzer
+"""
+import re
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+# Reduction keywords, matched on word boundaries so "add" never hits "address";
+# "at least N" is a threshold, not a minimum
+REDUCTION_PATTERNS = {
+    "sum": re.compile(r"\b(?:sum|summed|total|totals|add|added|adding|combined)\b"),
+    "average": re.compile(r"\b(?:average|mean|avg)\b"),
+    "count": re.compile(r"\b(?:count|how many|number of)\b"),
+    "max": re.compile(r"\b(?:maximum|max|highest|largest|biggest|greatest)\b"),
+    "min": re.compile(r"\b(?:minimum|min|lowest|smallest|(?<!\bat\s)least)\b"),
+}
+
+# "distinct"/"unique" turns a count into a distinct count
+DISTINCT_PATTERN = re.compile(r"\b(?:distinct|unique)\b")
+
+FILTER_PATTERN = re.compile(r"\b(?:filter|filtered|where|whose)\b")
+
+# "by <column>" only counts as a group-by when it is not part of an
+# ordering or arithmetic phrase ("sorted by", "divided by")
+GROUP_BY_PATTERN = re.compile(
+    r"\b(?:(?P<verb>sorted|ordered|divided|multiplied|rounded|ranked)\s+)?"
+    r"(?:grouped\s+by|group\s+by|broken\s+down\s+by|for\s+each|per|by)\s+"
+    r"(?:the\s+|each\s+)?(?P<term>[a-z_][\w]*)"
+)
+
+# Further keys after the first: "by region, category and year"
+GROUP_KEY_CONTINUATION = re.compile(r"\s*(?:,\s*(?:and\s+)?|\s+and\s+|\s*&\s*)(?:the\s+|each\s+)?(?P<term>[a-z_][\w]*)")
+
+TOP_K_PATTERNS = [
+    re.compile(r"\b(?P<dir>top|bottom|first|last)\s+(?P<k>\d+)\b"),
+    re.compile(r"\b(?P<k>\d+)\s+(?P<dir>highest|largest|biggest|lowest|smallest)\b"),
+]
+
+COMPARISON_WORDS = {
+    "greater than or equal to": ">=",
+    "less than or equal to": "<=",
+    "greater than": ">",
+    "more than": ">",
+    "higher than": ">",
+    "larger than": ">",
+    "above": ">",
+    "over": ">",
+    "exceeds": ">",
+    "exceeding": ">",
+    "less than": "<",
+    "lower than": "<",
+    "smaller than": "<",
+    "fewer than": "<",
+    "below": "<",
+    "under": "<",
+    "at least": ">=",
+    "at most": "<=",
+    "no more than": "<=",
+    "no less than": ">=",
+    "equal to": "==",
+    "equals": "==",
+    "not equal to": "!=",
+}
+
+NUMBER = r"-?\d[\d,]*(?:\.\d+)?"
+
+WORD_COMPARISON_PATTERN = re.compile(
+    r"(?:\b(?P<column>[a-z_][\w]*)\s+(?:is\s+|are\s+|was\s+|were\s+|of\s+)?)?"
+    r"\b(?P<op>" + "|".join(sorted((re.escape(w) for w in COMPARISON_WORDS), key=len, reverse=True)) + r")"
+    r"\s+(?P<value>" + NUMBER + r")"
+)
+
+SYMBOL_COMPARISON_PATTERN = re.compile(
+    r"\b(?P<column>[a-z_][\w]*)\s*(?P<op>>=|<=|!=|==|>|<|=)\s*(?P<value>" + NUMBER + r")"
+)
+
+DATE = r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}/\d{4}"
+
+# Optional leading column name shared by the text/date/range patterns
+COLUMN_PREFIX = r"(?:\b(?P<column>[a-z_][\w]*)\s+(?:is\s+|are\s+|was\s+|were\s+)?)?"
+
+RANGE_PATTERN = re.compile(
+    COLUMN_PREFIX + r"\b(?:between|from)\s+(?P<low>" + DATE + "|" + NUMBER + r")"
+    r"\s+(?:and|to|through)\s+(?P<high>" + DATE + "|" + NUMBER + r")"
+)
+
+DATE_WORDS = {"after": ">", "since": ">=", "from": ">=", "before": "<", "until": "<=", "on": "=="}
+
+DATE_COMPARISON_PATTERN = re.compile(
+    COLUMN_PREFIX + r"\b(?P<op>" + "|".join(DATE_WORDS) + r")\s+(?P<value>" + DATE + r")"
+)
+
+# "price above the average": thresholds resolved from the data itself
+STAT_COMPARISON_PATTERN = re.compile(
+    COLUMN_PREFIX + r"\b(?P<op>" + "|".join(sorted((re.escape(w) for w in COMPARISON_WORDS), key=len, reverse=True)) + r")"
+    r"\s+(?:the\s+)?(?P<stat>average|mean|median)\b"
+)
+
+# "where category is electronics", "with status != 'shipped'"; without a cue
+# ("which product is cheapest") the phrase describes the answer, not a filter.
+# "and" only continues an earlier condition.
+TEXT_CONDITION_PATTERN = re.compile(
+    r"\b(?P<cue>where|with|for|whose|and)\s+(?:the\s+)?"
+    r"(?P<column>[a-z_][\w]*)\s+(?P<op>is not|isn't|is|equals|==|!=|=)\s+"
+    r"(?:\"(?P<quoted>[^\"]+)\"|'(?P<single>[^']+)'|(?P<word>[a-z][\w-]*))"
+)
+
+# Superlatives and comparatives ("cheapest", "more", "cheaper than") rank or
+# compare rows, so they are never a text condition's value
+RANKING_WORD_PATTERN = re.compile(
+    r"(?:most|least|more|less|best|worst|better|worse|\w{2,}(?<!w)est|\w+er(?=\s+than))\b"
+)
+
+# "pages 2-4" is a range; "pages 2 and 4", "pages 1, 3 and 5" list single pages
+PAGE_SPAN = r"\d+(?:\s*(?:-|–|to|through)\s*\d+)?"
+PAGE_LIST_PATTERN = re.compile(r"\bpages?\s+(?P<spans>" + PAGE_SPAN + r"(?:\s*(?:,\s*(?:and\s+)?|\s+and\s+)" + PAGE_SPAN + r")*)\b")
+PAGE_SPAN_PATTERN = re.compile(r"(?P<start>\d+)(?:\s*(?:-|–|to|through)\s*(?P<stop>\d+))?")
+
+# Straight single quotes only count at a word start, so "what's" is not a quote
+QUOTED_PATTERN = re.compile(r"[\"“”‘]([^\"“”‘’]{1,64})[\"“”’]|(?:^|(?<=\s))'([^']{1,64})'")
+
+STOPWORDS = frozenset("""
+    a an the of in on at to for from and or is are was were be been it its this that these those
+    what which who whom whose how many much all each every any some value values data dataset file
+    csv table column columns row rows find calculate compute determine give return submit answer
+    please get list show tell me us our your their there here as than then with without into
+    round rounded decimal places place number numbers do does did can could should would will
+    question instructions download using use used only where filter filtered greater less more
+    above below over under least most equal equals sum total add added adding combined average
+    mean avg count maximum max highest largest biggest greatest minimum min lowest smallest
+    group grouped by per top bottom first last sorted ordered not no have has had page pages
+    distinct unique
+""".split())
+
+
+@dataclass(frozen=True)
+class Condition:
+    """
+    A single comparison extracted from the question
+
+    kind is "number", "text" (case-insensitive equality), "date" (ISO or
+    m/d/Y string) or "stat" (value names a column statistic: average/median)
+    """
+    column: Optional[str]
+    op: str
+    value: Union[float, str]
+    kind: str = "number"
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """Typed query plan compiled from a question"""
+    operation: str
+    aggregation: str = "sum"
+    target_terms: Tuple[str, ...] = ()
+    filters: Tuple[Condition, ...] = ()
+    group_by: Optional[str] = None
+    group_keys: Tuple[str, ...] = ()
+    aggregations: Tuple[str, ...] = ()
+    top_k: Optional[int] = None
+    ascending: bool = False
+    pages: Optional[Tuple[int, ...]] = None
+    question: str = ""
+
+
+def normalize_question(question: str) -> str:
+    """Normalize question text for caching and matching"""
+    text = question.lower().strip()
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip("?.!: ")
+
+
+def compile_question(question: str) -> QueryPlan:
+    """
+    Compile question text into a query plan
+
+    Args:
+        question: Raw question text
+
+    Returns:
+        QueryPlan, cached by normalized question text
+    """
+    return _compile_normalized(normalize_question(question or ""))
+
+
+@lru_cache(maxsize=512)
+def _compile_normalized(text: str) -> QueryPlan:
+    """Compile an already-normalized question (cached)"""
+    reduction = _find_reduction(text)
+    filters = _find_filters(text)
+    group_keys = _find_group_keys(text, reduction)
+    group_by = group_keys[0] if group_keys else None
+    top_k, ascending = _find_top_k(text)
+
+    if reduction == "min" and top_k is None:
+        ascending = True
+
+    if group_by:
+        operation = "aggregate"
+    elif reduction:
+        operation = reduction
+    elif top_k is not None:
+        operation = "min" if ascending else "max"
+    elif filters or FILTER_PATTERN.search(text):
+        operation = "filter"
+    else:
+        operation = "extract"
+
+    aggregations = _find_aggregations(text)
+    aggregation = aggregations[0] if aggregations else "sum"
+
+    plan = QueryPlan(
+        operation=operation,
+        aggregation=aggregation,
+        target_terms=_find_target_terms(text, group_keys + _text_values(filters)),
+        filters=tuple(filters),
+        group_by=group_by,
+        group_keys=group_keys,
+        aggregations=aggregations,
+        top_k=top_k,
+        ascending=ascending,
+        pages=_find_pages(text),
+        question=text,
+    )
+    logger.debug(f"Compiled query plan: {plan}")
+    return plan
+
+
+def _find_reduction(text: str) -> Optional[str]:
+    """Pick the reduction whose keyword appears first in the question"""
+    best = None
+    best_pos = len(text) + 1
+    for name, pattern in REDUCTION_PATTERNS.items():
+        match = pattern.search(text)
+        if match and match.start() < best_pos:
+            best, best_pos = name, match.start()
+    return best
+
+
+def _find_aggregations(text: str) -> Tuple[str, ...]:
+    """Every reduction named in the question, in order ("sum and average of ...")"""
+    found = []
+    for name, pattern in REDUCTION_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            found.append((match.start(), name))
+    names = [name for _, name in sorted(found)]
+    if "count" in names and DISTINCT_PATTERN.search(text):
+        names[names.index("count")] = "nunique"
+    return tuple(names)
+
+
+def _parse_number(raw: str) -> float:
+    return float(raw.replace(",", ""))
+
+
+def _find_filters(text: str) -> list:
+    """Extract numeric, text, date and statistic comparison conditions"""
+    conditions = []
+    seen_spans = []
+
+    def column_of(match: re.Match) -> Optional[str]:
+        column = match.group("column")
+        if column in STOPWORDS or column in COMPARISON_WORDS or column in DATE_WORDS:
+            return None
+        return column
+
+    def claimed(match: re.Match) -> bool:
+        return any(start <= match.start() < end or match.start() <= start < match.end()
+                   for start, end in seen_spans)
+
+    for match in RANGE_PATTERN.finditer(text):
+        low, high = match.group("low"), match.group("high")
+        is_date = bool(re.fullmatch(DATE, low))
+        kind = "date" if is_date else "number"
+        convert = (lambda v: v) if is_date else _parse_number
+        conditions.append(Condition(column_of(match), ">=", convert(low), kind))
+        conditions.append(Condition(column_of(match), "<=", convert(high), kind))
+        seen_spans.append(match.span())
+
+    for match in DATE_COMPARISON_PATTERN.finditer(text):
+        if claimed(match):
+            continue
+        conditions.append(Condition(column_of(match), DATE_WORDS[match.group("op")], match.group("value"), "date"))
+        seen_spans.append(match.span())
+
+    for match in STAT_COMPARISON_PATTERN.finditer(text):
+        if claimed(match):
+            continue
+        op = COMPARISON_WORDS[match.group("op")]
+        conditions.append(Condition(column_of(match), op, match.group("stat"), "stat"))
+        seen_spans.append(match.span())
+
+    for match in WORD_COMPARISON_PATTERN.finditer(text):
+        if claimed(match):
+            continue
+        op = COMPARISON_WORDS[match.group("op")]
+        conditions.append(Condition(column_of(match), op, _parse_number(match.group("value"))))
+        seen_spans.append(match.span())
+
+    for match in SYMBOL_COMPARISON_PATTERN.finditer(text):
+        if claimed(match):
+            continue
+        op = match.group("op")
+        conditions.append(Condition(
+            match.group("column") if match.group("column") not in STOPWORDS else None,
+            "==" if op == "=" else op,
+            _parse_number(match.group("value")),
+        ))
+        seen_spans.append(match.span())
+
+    for match in TEXT_CONDITION_PATTERN.finditer(text):
+        value = match.group("quoted") or match.group("single") or match.group("word")
+        column = match.group("column")
+        if claimed(match) or column in STOPWORDS or (match.group("cue") == "and" and not conditions):
+            continue
+        # Unquoted words must not be question vocabulary ("is greater", "is the")
+        # or rank rows ("is cheapest")
+        if match.group("word") and (value in STOPWORDS or any(w.startswith(value + " ") or w == value
+                                                              for w in COMPARISON_WORDS)
+                                    or RANKING_WORD_PATTERN.match(text, match.start("word"))):
+            continue
+        op = "!=" if match.group("op") in ("is not", "isn't", "!=") else "=="
+        conditions.append(Condition(column, op, value.strip(), "text"))
+        seen_spans.append(match.span())
+
+    return conditions
+
+
+def _find_group_keys(text: str, reduction: Optional[str]) -> Tuple[str, ...]:
+    """Extract the grouping terms, ignoring ordering/arithmetic uses of "by" """
+    for match in GROUP_BY_PATTERN.finditer(text):
+        if match.group("verb"):
+            continue
+        term = match.group("term")
+        if term in STOPWORDS or term.isdigit():
+            continue
+        keyword = match.group(0)
+        explicit = keyword.startswith(("group", "grouped", "broken", "for each", "per"))
+        # A bare "by" only groups when something is being reduced
+        if not (explicit or reduction in ("sum", "average", "count", "max", "min")):
+            continue
+        keys = [term]
+        position = match.end()
+        while True:
+            more = GROUP_KEY_CONTINUATION.match(text, position)
+            if not more or more.group("term") in STOPWORDS or more.group("term").isdigit():
+                break
+            keys.append(more.group("term"))
+            position = more.end()
+        return tuple(dict.fromkeys(keys))
+    return ()
+
+
+def _find_top_k(text: str) -> Tuple[Optional[int], bool]:
+    for pattern in TOP_K_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            direction = match.group("dir")
+            return int(match.group("k")), direction in ("bottom", "last", "lowest", "smallest")
+    return None, False
+
+
+def _find_pages(text: str) -> Optional[Tuple[int, ...]]:
+    """Zero-based page numbers named in the question ("page 3", "pages 2-4", "pages 2 and 4")"""
+    pages = []
+    for listed in PAGE_LIST_PATTERN.finditer(text):
+        for match in PAGE_SPAN_PATTERN.finditer(listed.group("spans")):
+            start = int(match.group("start"))
+            stop = int(match.group("stop") or start)
+            if start < 1 or stop < start:
+                continue
+            pages.extend(range(start - 1, stop))
+    return tuple(sorted(set(pages))) or None
+
+
+def _text_values(filters: list) -> Tuple[str, ...]:
+    """Words of text-condition values, which name cell contents rather than columns"""
+    return tuple(word for c in filters if c.kind == "text" for word in [c.value, *c.value.split()])
+
+
+def _find_target_terms(text: str, excluded: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Collect candidate column terms, quoted names first"""
+    terms = []
+    for groups in QUOTED_PATTERN.findall(text):
+        quoted = (groups[0] or groups[1]).strip()
+        if quoted and quoted not in terms and quoted not in excluded:
+            terms.append(quoted)
+
+    for token in re.findall(r"[a-z_][\w]+", text):
+        if token in STOPWORDS or token in excluded or token in terms:
+            continue
+        terms.append(token)
+
+    return tuple(terms)
@@ -0,0 +1,149 @@
+"""
+Dataset registry
+Keeps downloaded content and parsed DataFrames, column indexes and statistics sketches for the
+lifetime of one quiz chain so later steps reuse them instead of downloading and parsing again
+"""
+import os
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import pandas as pd
+
+from solver.columns import ColumnIndex
+from solver.payloads import PayloadStore, REF_PREFIX
+from solver.stats import ColumnSketch, sketch_frame
+
+logger = logging.getLogger(__name__)
+
+# Bytes of content and parsed frames a registry holds before evicting the
+# least recently used datasets (a batch shares one registry across chains)
+REGISTRY_MAX_BYTES = int(os.getenv("REGISTRY_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def source_key(url: str) -> str:
+    """
+    Identity of a data source
+
+    Plain URLs are their own key (fragment dropped); inline data: URLs are
+    keyed by their payload so the same data embedded on two pages matches.
+    """
+    if url.startswith("data:"):
+        header, _, data = url.partition(",")
+        if ";ref=" in header:
+            return f"data:{REF_PREFIX}{header.partition(';ref=')[2]}"
+        return f"data:{REF_PREFIX}{PayloadStore.key_for(data)}"
+    return url.split("#", 1)[0]
+
+
+@dataclass
+class Dataset:
+    """One data source: raw content plus whatever has been parsed from it"""
+    key: str
+    kind: str
+    content: Any = None
+    parsed: bool = False
+    dataframes: List[pd.DataFrame] = field(default_factory=list)
+    tables: List[Any] = field(default_factory=list)
+    text: str = ""
+    json_data: Any = None
+    workbook: Any = None
+    # id(frame) -> column sketches; shared with per-step views of lazily loaded sheets
+    sketches: Dict[int, Dict[Any, ColumnSketch]] = field(default_factory=dict, repr=False)
+    _index: Optional[ColumnIndex] = field(default=None, repr=False)
+
+    @property
+    def column_index(self) -> ColumnIndex:
+        if self._index is None or not self._index.covers(self.dataframes):
+            self._index = ColumnIndex(self.dataframes)
+        return self._index
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held: raw content, parsed frames and extracted text"""
+        size = len(self.content) if self.content is not None else 0
+        size += sum(int(df.memory_usage(index=True).sum()) for df in self.dataframes)
+        return size + len(self.text)
+
+    def close(self):
+        if self.workbook is not None:
+            try:
+                self.workbook.close()
+            except Exception as e:
+                logger.debug(f"Error closing workbook for {self.key}: {e}")
+            self.workbook = None
+
+    @property
+    def stats(self) -> List[Dict[Any, ColumnSketch]]:
+        """Column sketches of every frame, in frame order"""
+        return [self.stats_for(df) for df in self.dataframes]
+
+    def stats_for(self, df: pd.DataFrame) -> Dict[Any, ColumnSketch]:
+        """Column sketches of one frame, computed once"""
+        if id(df) not in self.sketches:
+            self.sketches[id(df)] = sketch_frame(df)
+        return self.sketches[id(df)]
+
+
+class DatasetRegistry:
+    """
+    Store of datasets keyed by source identity
+
+    Bounded by max_bytes: once content and parsed frames exceed it, the least
+    recently used datasets are released (a later step downloads them again).
+    """
+
+    def __init__(self, max_bytes: int = REGISTRY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._datasets: "OrderedDict[str, Dataset]" = OrderedDict()
+        self.hits = 0
+        self.evictions = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._datasets
+
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(dataset.nbytes for dataset in self._datasets.values())
+
+    def get(self, key: Optional[str]) -> Optional[Dataset]:
+        if not key:
+            return None
+        dataset = self._datasets.get(key)
+        if dataset is not None:
+            self._datasets.move_to_end(key)
+            self.hits += 1
+        return dataset
+
+    def add_content(self, key: str, kind: str, content: Any) -> Dataset:
+        """Record downloaded content for a source"""
+        dataset = self._datasets.get(key)
+        if dataset is None or dataset.content is None:
+            dataset = Dataset(key=key, kind=kind, content=content)
+            self._datasets[key] = dataset
+        self._datasets.move_to_end(key)
+        # Earlier datasets have been parsed since they were added, so measure them now
+        self._evict()
+        return dataset
+
+    def close(self):
+        """Release every dataset (called when the chain or batch ends)"""
+        for dataset in self._datasets.values():
+            dataset.close()
+        if self._datasets:
+            logger.info(f"Releasing {len(self._datasets)} dataset(s) after {self.hits} reuse(s), "
+                        f"{self.evictions} eviction(s)")
+        self._datasets.clear()
+
+    def _evict(self):
+        """Drop least recently used datasets until under max_bytes, keeping the newest"""
+        size = self.nbytes
+        while size > self.max_bytes and len(self._datasets) > 1:
+            _, evicted = self._datasets.popitem(last=False)
+            size -= evicted.nbytes
+            evicted.close()
+            self.evictions += 1
+            logger.info(f"Evicted dataset {evicted.key[:80]} to stay under {self.max_bytes} bytes")
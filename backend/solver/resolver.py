@@ -0,0 +1,183 @@
+"""
+Submit URL resolver
+Scores every candidate submit URL on a page by weighted evidence in one pass and remembers
+the URL patterns each host has confirmed, so submissions can fall back through a ranking
+"""
+import re
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Evidence weights; a candidate's score is the sum of its evidence
+EVIDENCE_WEIGHTS = {
+    "data_attr": 4.0,        # data-submit attribute
+    "script_var": 3.5,       # submitUrl / SUBMIT_URL assignment
+    "form_post": 3.0,        # form with method POST
+    "keyword_path": 2.5,     # "submit" or "answer" in the URL path
+    "script_call": 2.0,      # fetch / axios / ajax call
+    "keyword_text": 1.5,     # link text mentions submitting
+    "form": 1.0,             # form action of any method
+    "same_origin": 1.0,      # same origin as the quiz page
+    "text_mention": 1.0,     # URL written in the page text
+    "learned": 0.5,          # path this host confirmed before, offered when the page names none
+    "fallback": 0.1,         # guessed /submit on the page origin
+}
+
+# Ranked URLs tried before giving up on a submission
+MAX_SUBMIT_URLS = 3
+
+SUBMIT_KEYWORDS = ("submit", "answer")
+
+SCRIPT_PATTERNS = [
+    ("script_call", re.compile(r'fetch\([\'"]([^\'"]+)[\'"]')),
+    ("script_call", re.compile(r'axios\.post\([\'"]([^\'"]+)[\'"]')),
+    ("script_call", re.compile(r'\.ajax\([\'"]([^\'"]+)[\'"]')),
+    ("script_var", re.compile(r'submitUrl[\'"]?\s*[:=]\s*[\'"]([^\'"]+)[\'"]')),
+    ("script_var", re.compile(r'SUBMIT_URL\s*=\s*[\'"]([^\'"]+)[\'"]')),
+]
+
+# Absolute URLs, or root-relative paths containing a submit keyword, in page text
+TEXT_URL_PATTERN = re.compile(r'https?://[^\s"\'<>]+|(?<![\w/.])/[\w\-./]*(?:submit|answer)[\w\-./]*', re.IGNORECASE)
+
+# Path segments holding ids or tokens, generalized in learned patterns
+VARIABLE_SEGMENT = re.compile(r"^(?:\d+|[0-9a-fA-F\-]{8,}|[\w\-]{20,})$")
+
+
+@dataclass(frozen=True)
+class SubmitCandidate:
+    """A possible submit URL, its score and the evidence behind it"""
+    url: str
+    score: float
+    evidence: Tuple[str, ...]
+
+
+def url_pattern(url: str) -> Tuple[str, str]:
+    """(host, path) with id-like path segments replaced by '*'"""
+    parts = urlsplit(url)
+    segments = ["*" if VARIABLE_SEGMENT.match(s) else s for s in parts.path.split("/")]
+    return parts.netloc.lower(), "/".join(segments) or "/"
+
+
+class SubmitURLMemory:
+    """Submit URL patterns confirmed per host, shared across quizzes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._patterns: Dict[str, Dict[str, int]] = {}
+
+    def confirm(self, url: str):
+        host, path = url_pattern(url)
+        with self._lock:
+            paths = self._patterns.setdefault(host, {})
+            paths[path] = paths.get(path, 0) + 1
+
+    def reject(self, url: str):
+        host, path = url_pattern(url)
+        with self._lock:
+            self._patterns.get(host, {}).pop(path, None)
+
+    def hits(self, url: str) -> int:
+        host, path = url_pattern(url)
+        with self._lock:
+            return self._patterns.get(host, {}).get(path, 0)
+
+    def known_paths(self, host: str) -> List[str]:
+        with self._lock:
+            paths = self._patterns.get(host.lower(), {})
+            return sorted(paths, key=paths.get, reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._patterns.clear()
+
+
+submit_url_memory = SubmitURLMemory()
+
+
+def rank_submit_urls(page_content: Dict[str, Any],
+                     memory: Optional[SubmitURLMemory] = submit_url_memory) -> List[SubmitCandidate]:
+    """
+    Candidate submit URLs from forms, data attributes, links, scripts and text, best first
+
+    Endpoints the page names always rank on page evidence; confirmed patterns
+    from earlier quizzes on the host only break ties between them, or stand in
+    (ahead of the /submit guess) when the page names no endpoint at all.
+    Remaining ties keep page order, so the old first-match choice wins among equals.
+    """
+    base_url = page_content.get("url", "")
+    evidence: Dict[str, List[str]] = {}
+
+    def add(raw: str, *kinds: str):
+        url = _absolute(raw, base_url)
+        if url:
+            evidence.setdefault(url, []).extend(kinds)
+
+    for form in page_content.get("forms", []):
+        action = form.get("action", "")
+        if action:
+            add(action, "form_post" if form.get("method", "").upper() == "POST" else "form")
+
+    for data_attr in page_content.get("data_attrs", []):
+        if data_attr.get("submit"):
+            add(data_attr["submit"], "data_attr")
+
+    for link in page_content.get("links", []):
+        href = link.get("href", "")
+        text = link.get("text", "").lower()
+        if href and any(k in text for k in SUBMIT_KEYWORDS):
+            add(href, "keyword_text")
+        elif href and "submit" in href.lower():
+            add(href)
+
+    for script in page_content.get("scripts", []):
+        for kind, pattern in SCRIPT_PATTERNS:
+            for match in pattern.findall(script):
+                if kind == "script_var" or "submit" in match.lower() or match.startswith("http"):
+                    add(match, kind)
+
+    for match in TEXT_URL_PATTERN.findall(page_content.get("text", "")):
+        match = match.rstrip(".,;:)")
+        if any(k in match.lower() for k in SUBMIT_KEYWORDS):
+            add(match, "text_mention")
+
+    page_named = bool(evidence)
+    base = urlsplit(base_url)
+    if base.scheme and base.netloc:
+        origin = f"{base.scheme}://{base.netloc}"
+        if memory is not None and not page_named:
+            for path in memory.known_paths(base.netloc):
+                if "*" not in path:
+                    add(origin + path, "learned")
+        add(origin + "/submit", "fallback")
+
+    candidates = []
+    for url, kinds in evidence.items():
+        path = urlsplit(url).path.lower()
+        kinds = list(dict.fromkeys(kinds))
+        if any(k in path for k in SUBMIT_KEYWORDS):
+            kinds.append("keyword_path")
+        if base.netloc and urlsplit(url).netloc == base.netloc:
+            kinds.append("same_origin")
+        score = sum(EVIDENCE_WEIGHTS[k] for k in kinds)
+        hits = memory.hits(url) if memory is not None else 0
+        candidates.append((SubmitCandidate(url, score, tuple(kinds)), hits))
+
+    # sorted() is stable: equal scores and hits keep page order
+    ranked = [c for c, _ in sorted(candidates, key=lambda item: (item[0].score, item[1]), reverse=True)]
+    logger.info(f"Submit URL candidates: {[(c.url, c.score) for c in ranked[:MAX_SUBMIT_URLS]]}")
+    return ranked
+
+
+def _absolute(url: str, base_url: str) -> Optional[str]:
+    url = url.strip()
+    if not url or url.startswith(("#", "javascript:", "mailto:", "data:")):
+        return None
+    if url.startswith(("http://", "https://")):
+        return url
+    if not base_url:
+        return None
+    return urljoin(base_url, url)
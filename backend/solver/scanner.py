@@ -0,0 +1,123 @@
+"""
+Numeric tokenizer
+Scans text for numbers with a compiled byte-level pattern and parses them straight into NumPy arrays
+"""
+import re
+import logging
+from typing import Iterable, Iterator, Union
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numbers with optional sign, thousands separators, decimals and exponent.
+# The lookbehind keeps digits glued to letters ("abc123") and version-like
+# tails ("1.2.3") from being split into spurious values. Commas only group
+# thousands when the whole digit-comma run is 3-digit groups: "5,10,100,200"
+# and "1,234,56" are lists of separate values.
+NUMBER_PATTERN = re.compile(
+    rb"(?<![\w.])-?(?:(?<!\d,)\d{1,3}(?:,\d{3})+(?!,?\d)|\d+)(?:\.\d+)?(?:[eE][-+]?\d+)?"
+    rb"|(?<![\w.])-?\.\d+(?:[eE][-+]?\d+)?"
+)
+
+# Lines holding nothing but comma-delimited numbers are delimited rows
+# ("1,234.56,7", "100, 200"), unless they read as one grouped number
+# ("1,234,567", "1,234.56"), which is how PDF dumps lay out totals
+DELIMITED_ROW_PATTERN = re.compile(rb"^[ \t]*-?[\d.]+(?:[ \t]*,[ \t]*-?[\d.]+)+[ \t]*\r?$", re.MULTILINE)
+GROUPED_NUMBER_PATTERN = re.compile(rb"[ \t]*-?\d{1,3}(?:,\d{3})+(?:\.\d+)?[ \t]*\r?")
+
+# Page furniture and footnote markers that are not data (each on one line)
+NOISE_PATTERN = re.compile(
+    rb"\bpage[ \t]+\d+(?:[ \t]*(?:of|/)[ \t]*\d+)?\b|\[\d{1,3}\]",
+    re.IGNORECASE,
+)
+
+# Texts larger than this are scanned in chunks to bound the joined buffer
+STREAM_THRESHOLD = 4 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+TextLike = Union[str, bytes, bytearray, memoryview]
+
+
+def _to_bytes(text: TextLike) -> bytes:
+    if isinstance(text, str):
+        return text.encode("utf-8", errors="ignore")
+    return bytes(text)
+
+
+def _parse_tokens(tokens: list) -> np.ndarray:
+    """Parse matched byte tokens in one C-level pass"""
+    if not tokens:
+        return np.empty(0, dtype=np.float64)
+    # Tokens are space-joined, so any remaining comma is a thousands separator
+    joined = b" ".join(tokens).replace(b",", b"")
+    return np.fromstring(joined, dtype=np.float64, sep=" ")
+
+
+def scan_numbers(text: TextLike, strip_noise: bool = True) -> np.ndarray:
+    """
+    Extract all numbers from text
+
+    Args:
+        text: str or bytes-like content
+        strip_noise: Drop "Page 3 of 10" markers and "[1]" footnote refs
+
+    Returns:
+        float64 array of the numbers in order of appearance
+    """
+    if text is None:
+        return np.empty(0, dtype=np.float64)
+    data = _to_bytes(text)
+    if len(data) > STREAM_THRESHOLD:
+        arrays = list(iter_numbers([data], strip_noise=strip_noise))
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.float64)
+
+    return _scan(data, strip_noise)
+
+
+def _split_row(row: re.Match) -> bytes:
+    if GROUPED_NUMBER_PATTERN.fullmatch(row.group(0)):
+        return row.group(0)
+    return row.group(0).replace(b",", b" ")
+
+
+def _scan(data: bytes, strip_noise: bool) -> np.ndarray:
+    """Scan whole lines held in memory"""
+    if strip_noise:
+        data = NOISE_PATTERN.sub(b" ", data)
+    data = DELIMITED_ROW_PATTERN.sub(_split_row, data)
+    return _parse_tokens(NUMBER_PATTERN.findall(data))
+
+
+def iter_numbers(chunks: Iterable[TextLike], strip_noise: bool = True,
+                 chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Streaming scan over text chunks
+
+    Each input chunk is re-split into chunk_size pieces; the partial line
+    after the last line break is carried into the next piece, so numbers,
+    noise markers and delimited rows are scanned exactly as scan_numbers
+    would. Only lines longer than STREAM_THRESHOLD are cut, at whitespace.
+
+    Yields:
+        float64 arrays, one per non-empty piece
+    """
+    carry = b""
+    for chunk in chunks:
+        data = _to_bytes(chunk)
+        for start in range(0, len(data), chunk_size):
+            piece = carry + data[start:start + chunk_size]
+            cut = piece.rfind(b"\n")
+            if cut < 0 and len(piece) > STREAM_THRESHOLD:
+                cut = max(piece.rfind(b" "), piece.rfind(b"\t"))
+            if cut < 0:
+                carry = piece
+                continue
+            carry = piece[cut:]
+            values = _scan(piece[:cut], strip_noise)
+            if values.size:
+                yield values
+
+    if carry:
+        values = _scan(carry, strip_noise)
+        if values.size:
+            yield values
@@ -0,0 +1,105 @@
+"""
+Column statistics sketches
+One pass over each numeric column at load time gives count, nulls, sum, min, max and a
+small quantile digest, so plain aggregates are answered without rescanning the data
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Quantile points kept per column; smaller columns keep every sorted value
+DIGEST_POINTS = 101
+
+
+@dataclass
+class ColumnSketch:
+    """Mergeable summary of one numeric column"""
+    count: int = 0
+    nulls: int = 0
+    sum: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+    # Sorted values at evenly spaced quantiles (exact when count <= DIGEST_POINTS)
+    digest: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64), repr=False)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (linear interpolation, like numpy's default)"""
+        if not self.digest.size:
+            return None
+        positions = np.linspace(0.0, 1.0, self.digest.size)
+        return float(np.interp(q, positions, self.digest))
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "ColumnSketch":
+        """Sketch a float64 array that may contain NaNs"""
+        present = values[~np.isnan(values)]
+        sketch = cls(count=int(present.size), nulls=int(values.size - present.size))
+        if present.size:
+            sketch.sum = float(present.sum())
+            if present.size <= DIGEST_POINTS:
+                sketch.digest = np.sort(present)
+            else:
+                sketch.digest = np.quantile(present, np.linspace(0.0, 1.0, DIGEST_POINTS))
+            sketch.min = float(sketch.digest[0])
+            sketch.max = float(sketch.digest[-1])
+        return sketch
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        """Combine two sketches (e.g. the same column across chunks or frames)"""
+        if not other.count:
+            return ColumnSketch(self.count, self.nulls + other.nulls, self.sum, self.min, self.max, self.digest)
+        if not self.count:
+            return ColumnSketch(other.count, self.nulls + other.nulls, other.sum, other.min, other.max, other.digest)
+        return ColumnSketch(
+            count=self.count + other.count,
+            nulls=self.nulls + other.nulls,
+            sum=self.sum + other.sum,
+            min=min(self.min, other.min),
+            max=max(self.max, other.max),
+            digest=_merge_digests(self, other),
+        )
+
+
+def _merge_digests(left: ColumnSketch, right: ColumnSketch) -> np.ndarray:
+    """Weighted union of two digests, resampled to at most DIGEST_POINTS"""
+    points = np.concatenate([left.digest, right.digest])
+    weights = np.concatenate([
+        np.full(left.digest.size, left.count / left.digest.size),
+        np.full(right.digest.size, right.count / right.digest.size),
+    ])
+    order = np.argsort(points, kind="stable")
+    points, weights = points[order], weights[order]
+    if points.size <= DIGEST_POINTS and left.count + right.count == points.size:
+        return points
+    # Midpoint cumulative weights place each point at its quantile
+    cumulative = (np.cumsum(weights) - weights / 2) / weights.sum()
+    return np.interp(np.linspace(0.0, 1.0, DIGEST_POINTS), cumulative, points)
+
+
+def merge_sketches(sketches: Iterable[ColumnSketch]) -> ColumnSketch:
+    merged = ColumnSketch()
+    for sketch in sketches:
+        merged = merged.merge(sketch)
+    return merged
+
+
+def sketch_frame(df: pd.DataFrame) -> Dict[Any, ColumnSketch]:
+    """Sketch every numeric (non-boolean) column of a DataFrame"""
+    sketches = {}
+    for position, (col, dtype) in enumerate(df.dtypes.items()):
+        if not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype) or col in sketches:
+            continue
+        try:
+            values = df.iloc[:, position].to_numpy(dtype=np.float64, na_value=np.nan)
+            sketches[col] = ColumnSketch.from_values(values)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Could not sketch column {col}: {e}")
+    return sketches
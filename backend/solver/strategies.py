@@ -0,0 +1,246 @@
+"""
+Answer strategies
+Computes ranked alternative answers from already-loaded data (other columns, operations and
+roundings) so an answer rejected as incorrect can be retried, and learns which strategies win
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+from solver.query import REDUCTION_PATTERNS, QueryPlan, compile_question
+from solver.filters import FilterResult
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "primary"
+
+# Prior confidence per strategy family, before any wins are recorded
+STRATEGY_PRIORS = {
+    PRIMARY: 1.0,
+    "round": 0.7,
+    "column": 0.6,
+    "operation": 0.5,
+    "unfiltered": 0.3,
+    "text_numbers": 0.25,
+}
+
+MAX_CANDIDATES = 6
+STRATEGY_WORKERS = 4
+
+# Alternative value columns tried beyond the primary one
+ALTERNATIVE_COLUMNS = 2
+
+REDUCERS = {
+    "sum": lambda v: v.sum().item(),
+    "average": lambda v: v.mean().item(),
+    "max": lambda v: v.max().item(),
+    "min": lambda v: v.min().item(),
+    "count": lambda v: int(v.size),
+}
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """One answer to try, the strategy that produced it and its rank score"""
+    answer: Any
+    strategy: str
+    score: float
+
+
+class StrategyStats:
+    """Wins and attempts per strategy family, shared by every quiz in the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wins: Dict[str, int] = {}
+        self._attempts: Dict[str, int] = {}
+
+    def record(self, strategy: str, correct: bool):
+        family = strategy.split(":", 1)[0]
+        with self._lock:
+            self._attempts[family] = self._attempts.get(family, 0) + 1
+            if correct:
+                self._wins[family] = self._wins.get(family, 0) + 1
+
+    def weight(self, family: str) -> float:
+        """Smoothed win rate relative to an even chance (1.0 with no history)"""
+        with self._lock:
+            wins = self._wins.get(family, 0)
+            attempts = self._attempts.get(family, 0)
+        return 2.0 * (wins + 1) / (attempts + 2)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {f: {"wins": self._wins.get(f, 0), "attempts": n} for f, n in self._attempts.items()}
+
+
+strategy_stats = StrategyStats()
+
+
+class StrategyEngine:
+    """Builds ranked candidate answers from the data an analyzer has loaded"""
+
+    def __init__(self, analyzer: Any, stats: StrategyStats = strategy_stats,
+                 workers: int = STRATEGY_WORKERS):
+        self.analyzer = analyzer
+        self.stats = stats
+        self.workers = workers
+
+    def candidates(self, quiz_data: Dict[str, Any], analysis_result: Dict[str, Any],
+                   limit: int = MAX_CANDIDATES) -> Iterator[Candidate]:
+        """
+        Ranked, de-duplicated answers; the analyzer's own answer is always first
+
+        Alternatives are only computed once the caller asks for a second
+        candidate (after a rejection), so accepted answers cost nothing extra.
+        They need the analyzer's loaded data, so streamed or failed analyses
+        only yield the primary answer.
+        """
+        answer_format = quiz_data.get("answer_format", "string")
+        question = quiz_data.get("question", "").lower()
+        # Captured now: the analyzer may be reused before the alternatives are asked for
+        data = getattr(self.analyzer, "data", None)
+        if analysis_result.get("error"):
+            data = None
+        return self._ranked(analysis_result.get("answer"), analysis_result.get("raw_result"),
+                            data, answer_format, question, limit)
+
+    def _ranked(self, primary: Any, raw: Any, data: Optional[Dict[str, Any]], answer_format: str,
+                question: str, limit: int) -> Iterator[Candidate]:
+        yield Candidate(primary, PRIMARY, self._score(PRIMARY))
+        if limit <= 1:
+            return
+
+        strategies: List[Tuple[str, Callable[[], Any]]] = []
+        if data is not None:
+            strategies = self._strategies(data, compile_question(question))
+        # Rounding of the primary result, since the checker's tolerance is unknown
+        computed = self._run(strategies) + self._roundings(raw)
+
+        ranked = []
+        seen = {_answer_key(primary)}
+        for name, value in computed:
+            answer = self.analyzer.format_answer(value, answer_format, question)
+            key = _answer_key(answer)
+            if key in seen:
+                continue
+            seen.add(key)
+            ranked.append(Candidate(answer, name, self._score(name)))
+
+        ranked.sort(key=lambda c: c.score, reverse=True)
+        logger.info(f"Alternative answers: {[(c.strategy, round(c.score, 3)) for c in ranked[:limit - 1]]}")
+        yield from ranked[:limit - 1]
+
+    def _score(self, strategy: str) -> float:
+        family = strategy.split(":", 1)[0]
+        return STRATEGY_PRIORS.get(family, 0.1) * self.stats.weight(family)
+
+    def _run(self, strategies: List[Tuple[str, Callable[[], Any]]]) -> List[Tuple[str, Any]]:
+        """Evaluate strategies concurrently (pandas/NumPy reductions release the GIL)"""
+        if not strategies:
+            return []
+
+        def evaluate(item):
+            name, compute = item
+            try:
+                return name, compute()
+            except Exception as e:
+                logger.debug(f"Strategy {name} failed: {e}")
+                return name, None
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(strategies))) as pool:
+            outcomes = list(pool.map(evaluate, strategies))
+        return [(name, value) for name, value in outcomes if value is not None]
+
+    def _strategies(self, data: Dict[str, Any], plan: QueryPlan) -> List[Tuple[str, Callable[[], Any]]]:
+        strategies = []
+        operation = plan.operation if plan.operation in REDUCERS else None
+
+        if operation:
+            for rank, column in enumerate(self._alternative_columns(data, plan), start=2):
+                strategies.append((f"column:{rank}", lambda c=column: self._reduce_column(data, plan, c, operation)))
+            if plan.filters:
+                strategies.append(("unfiltered", lambda: self._reduce_primary(data, plan, operation, filtered=False)))
+            if data.get("dataframes") and len(data.get("numeric_values", [])):
+                strategies.append(("text_numbers", lambda: _reduce(
+                    np.asarray(data["numeric_values"], dtype=np.float64), operation, plan)))
+
+        # Other reductions the question mentions ("total ... average")
+        for other, pattern in REDUCTION_PATTERNS.items():
+            if other != plan.operation and pattern.search(plan.question):
+                strategies.append((f"operation:{other}", lambda o=other: self._reduce_primary(data, plan, o)))
+        return strategies
+
+    def _alternative_columns(self, data: Dict[str, Any], plan: QueryPlan) -> List[Tuple[int, Any]]:
+        """Next-best numeric columns after the one the analyzer picked"""
+        index = self.analyzer.column_index(data)
+        primary = {(frame, col) for frame, col in self._primary_columns(data, plan)}
+        columns = []
+        for match in index.lookup(plan.target_terms, numeric=True):
+            if (match.frame, match.column) not in primary and (match.frame, match.column) not in columns:
+                columns.append((match.frame, match.column))
+            if len(columns) >= ALTERNATIVE_COLUMNS:
+                break
+        return columns
+
+    def _primary_columns(self, data: Dict[str, Any], plan: QueryPlan) -> List[Tuple[int, Any]]:
+        index = self.analyzer.column_index(data)
+        columns = []
+        for frame_no in range(len(data.get("dataframes", []))):
+            col = index.best(plan.target_terms, frame=frame_no, numeric=True)
+            if col is not None:
+                columns.append((frame_no, col))
+        return columns
+
+    def _reduce_column(self, data: Dict[str, Any], plan: QueryPlan, column: Tuple[int, Any], operation: str) -> Any:
+        frame_no, col = column
+        df = data["dataframes"][frame_no]
+        index = self.analyzer.column_index(data)
+        frame = self.analyzer.filter_frame(df, plan, col, index, frame_no, data.get("sketches", {}).get(id(df)))
+        return _reduce(frame[col].to_numpy(dtype=np.float64, na_value=np.nan), operation, plan)
+
+    def _reduce_primary(self, data: Dict[str, Any], plan: QueryPlan, operation: str, filtered: bool = True) -> Any:
+        """Another operation (or no filters) over the analyzer's own column choice"""
+        index = self.analyzer.column_index(data)
+        arrays = []
+        for frame_no, col in self._primary_columns(data, plan):
+            df = data["dataframes"][frame_no]
+            if filtered:
+                df = self.analyzer.filter_frame(df, plan, col, index, frame_no, data.get("sketches", {}).get(id(df)))
+            arrays.append(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        if not arrays:
+            return None
+        return _reduce(np.concatenate(arrays), operation, plan)
+
+    def _roundings(self, raw: Any) -> List[Tuple[str, Any]]:
+        if isinstance(raw, bool) or not isinstance(raw, (float, np.floating)) or not np.isfinite(raw):
+            return []
+        value = float(raw)
+        return [("round:2", round(value, 2)), ("round:0", int(round(value)))]
+
+
+def _reduce(values: np.ndarray, operation: str, plan: QueryPlan) -> Any:
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return None
+    if plan.top_k and operation in ("max", "min"):
+        ordered = -np.sort(-values) if operation == "max" else np.sort(values)
+        return ordered[:plan.top_k].tolist()
+    return REDUCERS[operation](values)
+
+
+def _answer_key(answer: Any) -> str:
+    """Identity of an answer for de-duplication (3 and 3.0 are the same answer)"""
+    if isinstance(answer, FilterResult):
+        # The same rows of the same frames, compared without materializing records
+        return repr([(id(df), None if mask is None else hash(mask.tobytes())) for df, mask in answer.parts])
+    if isinstance(answer, (int, float, np.number)) and not isinstance(answer, bool):
+        return repr(float(answer))
+    try:
+        return json.dumps(answer, sort_keys=True, default=str)
+    except (TypeError, ValueError):
+        return repr(answer)
@@ -0,0 +1,189 @@
+"""
+Out-of-core analysis
+Streams CSV / JSON-lines sources too large to load at once in row chunks and folds each
+chunk into mergeable partial aggregates, so peak memory follows the chunk size, not the file size
+"""
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+
+from solver.columns import ColumnIndex
+from solver.groupby import group_answer
+from solver.query import QueryPlan
+from solver.stats import ColumnSketch, sketch_frame
+
+logger = logging.getLogger(__name__)
+
+# Sources at least this large are analyzed chunk by chunk
+STREAM_THRESHOLD = 64 * 1024 * 1024
+
+STREAMABLE_TYPES = ("csv", "jsonl")
+STREAMABLE_OPERATIONS = ("sum", "average", "count", "max", "min", "aggregate")
+
+# Per-group partial state and how two partials combine
+GROUP_STATE = {"size": "sum", "count": "sum", "sum": "sum", "min": "min", "max": "max"}
+
+
+def should_stream(file_info: Dict[str, Any], plan: QueryPlan) -> bool:
+    """Whether a downloaded file is large enough, and the question simple enough, to stream"""
+    return (
+        file_info.get("type") in STREAMABLE_TYPES
+        and file_info.get("size", len(file_info.get("content") or b"")) >= STREAM_THRESHOLD
+        and plan.operation in STREAMABLE_OPERATIONS
+        # Distinct counts do not fold into bounded partial states
+        and "nunique" not in plan.aggregations
+    )
+
+
+def needs_statistics(plan: QueryPlan) -> bool:
+    """Whether a filter compares against a column statistic ("above the average")"""
+    return any(condition.kind == "stat" for condition in plan.filters)
+
+
+def source_sketches(chunks: Iterable[pd.DataFrame]) -> Dict[Any, ColumnSketch]:
+    """
+    Sketches of every numeric column over a whole source, merged chunk by chunk
+
+    A first pass for statistic filters, so thresholds come from the whole
+    source rather than from each chunk.
+    """
+    sketches: Dict[Any, ColumnSketch] = {}
+    for chunk in chunks:
+        for col, sketch in sketch_frame(chunk).items():
+            sketches[col] = sketches[col].merge(sketch) if col in sketches else sketch
+    return sketches
+
+
+class ChunkedAggregator:
+    """
+    Incremental sum/mean/count/min/max/group-by over DataFrame chunks
+
+    Columns are resolved against the first chunk's header. Values fold into a
+    ColumnSketch, top-k candidates into a bounded array and groups into a
+    small per-group frame, all of which merge across chunks and sources.
+    Statistic filters use the given whole-source sketches for their thresholds.
+    """
+
+    def __init__(self, plan: QueryPlan, filter_frame: Optional[Callable] = None,
+                 sketches: Optional[Dict[Any, ColumnSketch]] = None):
+        self.plan = plan
+        self.filter_frame = filter_frame
+        self.sketches = sketches
+        self.index: Optional[ColumnIndex] = None
+        self.value_col = None
+        self.group_cols: List[Any] = []
+        self.rows = 0
+        self.chunks = 0
+        self.sketch = ColumnSketch()
+        self.top = np.empty(0, dtype=np.float64)
+        self.groups: Optional[pd.DataFrame] = None
+
+    def consume(self, chunks: Iterable[pd.DataFrame]) -> "ChunkedAggregator":
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def update(self, chunk: pd.DataFrame):
+        """Fold one chunk into the running state"""
+        if self.index is None:
+            self._resolve(chunk)
+        self.chunks += 1
+
+        frame = chunk
+        if self.plan.filters and self.filter_frame is not None:
+            frame = self.filter_frame(chunk, self.plan, self.value_col, self.index, 0, self.sketches)
+        self.rows += len(frame)
+
+        values = None
+        if self.value_col is not None:
+            values = pd.to_numeric(frame[self.value_col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            self.sketch = self.sketch.merge(ColumnSketch.from_values(values))
+            if self.plan.top_k and self.plan.operation in ("max", "min"):
+                self._update_top(values[~np.isnan(values)])
+
+        if self.group_cols:
+            self._update_groups(frame, values)
+
+    def merge(self, other: "ChunkedAggregator") -> "ChunkedAggregator":
+        """Combine with an aggregator that consumed another source"""
+        self.rows += other.rows
+        self.chunks += other.chunks
+        self.sketch = self.sketch.merge(other.sketch)
+        if other.top.size:
+            self._update_top(other.top)
+        if other.groups is not None:
+            self.groups = other.groups if self.groups is None else _merge_groups(self.groups, other.groups)
+        return self
+
+    def result(self) -> Any:
+        """Answer in the same shape the in-memory analysis returns"""
+        operation = self.plan.operation
+        if operation == "count":
+            return self.rows
+        if operation == "aggregate":
+            return self._group_result()
+        if not self.sketch.count:
+            return 0
+        if operation in ("max", "min") and self.plan.top_k:
+            return self.top.tolist()
+        return {
+            "sum": self.sketch.sum,
+            "average": self.sketch.mean,
+            "max": self.sketch.max,
+            "min": self.sketch.min,
+        }[operation]
+
+    def _resolve(self, chunk: pd.DataFrame):
+        self.index = ColumnIndex([chunk])
+        self.value_col = self.index.best(self.plan.target_terms, frame=0, numeric=True)
+        if self.plan.operation == "aggregate":
+            keys = [self.index.best((term,), frame=0) for term in self.plan.group_keys]
+            self.group_cols = list(dict.fromkeys(k for k in keys if k is not None))
+            if not self.group_cols:
+                non_numeric = chunk.select_dtypes(exclude=[np.number]).columns
+                self.group_cols = list(non_numeric[:1])
+        if self.value_col is None or self.value_col in self.group_cols:
+            self.value_col = self.index.default_measure(0)
+            if self.value_col in self.group_cols:
+                self.value_col = None
+        logger.info(f"Streaming value column {self.value_col!r}, group columns {self.group_cols!r}")
+
+    def _update_top(self, values: np.ndarray):
+        k = self.plan.top_k
+        candidates = np.concatenate([self.top, values])
+        if self.plan.operation == "max":
+            candidates = -np.sort(-candidates)
+        else:
+            candidates = np.sort(candidates)
+        self.top = candidates[:k]
+
+    def _update_groups(self, frame: pd.DataFrame, values: Optional[np.ndarray]):
+        keys = [frame[col] for col in self.group_cols]
+        if values is None:
+            values = np.zeros(len(frame))
+        grouped = pd.Series(values, index=frame.index).groupby(keys, sort=False, observed=True)
+        partial = grouped.agg(list(GROUP_STATE))
+        self.groups = partial if self.groups is None else _merge_groups(self.groups, partial)
+
+    def _group_result(self) -> Any:
+        if self.groups is None or self.groups.empty:
+            return {}
+        columns = {}
+        for aggregation in self.plan.aggregations or ("sum",):
+            if aggregation == "count" or self.value_col is None:
+                columns["count"] = self.groups["size"]
+            elif aggregation == "average":
+                columns[aggregation] = self.groups["sum"] / self.groups["count"]
+            else:
+                columns[aggregation] = self.groups[aggregation if aggregation in ("min", "max") else "sum"]
+        result = pd.DataFrame(columns)
+        result.index.names = self.group_cols
+        if self.plan.top_k:
+            result = result.sort_values(result.columns[0], ascending=self.plan.ascending).head(self.plan.top_k)
+        return group_answer(result)
+
+
+def _merge_groups(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    levels = list(range(left.index.nlevels))
+    return pd.concat([left, right]).groupby(level=levels, sort=False).agg(GROUP_STATE)
@@ -2,18 +2,147 @@
 Answer submitter
 Handles submission of answers to quiz endpoints
 """
+import os
+import gzip
+import time
 import logging
-from typing import Dict, Any, Optional
+import reprlib
+import threading
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
 import aiohttp
 
+from solver.filters import materialize
+from solver.formatter import canonical_json, decode_json
+from solver.resolver import MAX_SUBMIT_URLS, SubmitURLMemory, submit_url_memory
+from solver.utils import client_session
+
 logger = logging.getLogger(__name__)
 
+JSON_HEADERS = {"Content-Type": "application/json"}
+GZIP_HEADERS = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+
+# Largest request body sent to a submit endpoint
+MAX_PAYLOAD_BYTES = int(os.getenv("SUBMIT_MAX_BYTES", str(1024 * 1024)))
+
+# Request compression: "auto" (origins that advertise gzip), "always" or "never"
+SUBMIT_GZIP = os.getenv("SUBMIT_GZIP", "auto")
+
+# Bodies smaller than this are never compressed
+GZIP_MIN_BYTES = 16 * 1024
+
+# origin -> whether it accepts gzip request bodies, learned from responses
+_gzip_support: Dict[str, bool] = {}
+
+# Payload shapes, in the order tried for an origin with no history:
+# {"email", "answer"} JSON, {"answer"} JSON, then form fields
+SUBMIT_FORMATS = ("json", "answer_json", "form")
+
+# Shapes that carry the email; only these are ever promoted ahead of the default order
+EMAIL_FORMATS = ("json", "form")
+
+# Seconds a format that worked for an origin is tried first
+FORMAT_TTL = float(os.getenv("SUBMIT_FORMAT_TTL", "600"))
+
+# Status codes that mean the payload shape was refused, not the answer
+FORMAT_REJECTED = (415,)
+
+# Status codes that mean a URL is not a submit endpoint at all; only these
+# (and transport errors) move a submission on to the next ranked URL
+ENDPOINT_MISSING = (404, 405)
+
+
+class FormatCache:
+    """
+    Payload format that last worked per submit origin
+    
+    Entries expire after a TTL and are dropped as soon as the format fails,
+    so a changed endpoint falls back to trying every format again. The
+    email-less {"answer"} shape is never cached: one transient failure of
+    the full payload must not make every later submit drop the email.
+    """
+    
+    def __init__(self, ttl: float = FORMAT_TTL, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, origin: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(origin)
+            if entry is None:
+                return None
+            if entry[1] <= self._clock():
+                del self._entries[origin]
+                return None
+            return entry[0]
+    
+    def order(self, origin: str) -> List[str]:
+        """Formats to try for an origin, the known-good one first"""
+        known = self.get(origin)
+        if known is None:
+            return list(SUBMIT_FORMATS)
+        return [known] + [fmt for fmt in SUBMIT_FORMATS if fmt != known]
+    
+    def confirm(self, origin: str, fmt: str):
+        if fmt not in EMAIL_FORMATS:
+            return
+        with self._lock:
+            self._entries[origin] = (fmt, self._clock() + self.ttl)
+    
+    def invalidate(self, origin: str, fmt: str):
+        with self._lock:
+            entry = self._entries.get(origin)
+            if entry is not None and entry[0] == fmt:
+                del self._entries[origin]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide, so every quiz and chain step reuses what earlier submits learned
+submit_formats = FormatCache()
+
 
 class AnswerSubmitter:
     """Submits answers to quiz endpoints"""
     
-    def __init__(self):
+    def __init__(self, max_payload_bytes: int = MAX_PAYLOAD_BYTES, compression: str = SUBMIT_GZIP,
+                 formats: FormatCache = submit_formats, urls: SubmitURLMemory = submit_url_memory,
+                 session: Optional[aiohttp.ClientSession] = None):
         self.timeout = aiohttp.ClientTimeout(total=30)
+        self.session = session
+        self.max_payload_bytes = max_payload_bytes
+        self.compression = compression
+        self.formats = formats
+        self.urls = urls
+    
+    async def submit_ranked(self, submit_urls: List[str], answer: Any, email: str) -> Dict[str, Any]:
+        """
+        Submit to the best-ranked URL, falling back through the ranking
+        
+        Any reply from an endpoint is final - the answer is never POSTed twice -
+        unless the URL is missing (404/405) or unreachable. A verdict, a 2xx or
+        a next quiz URL confirms the URL's pattern for the host; a missing URL
+        is forgotten so it stops outranking the alternatives.
+        """
+        response: Dict[str, Any] = {"error": "No submit URL", "correct": False}
+        for submit_url in submit_urls[:MAX_SUBMIT_URLS]:
+            response = await self.submit(submit_url, answer, email)
+            if "payload_bytes" in response:
+                # Over the size budget: no URL would receive it
+                return response
+            status = response.get("status_code")
+            if status is not None and status not in ENDPOINT_MISSING:
+                if "correct" in response or "next_url" in response or 200 <= status < 300:
+                    self.urls.confirm(submit_url)
+                return response
+            self.urls.reject(submit_url)
+            logger.info(f"{submit_url} is not a submit endpoint ({status or response.get('error')}), "
+                        f"trying the next submit URL")
+        return response
     
     async def submit(self, submit_url: str, answer: Any, email: str) -> Dict[str, Any]:
         """
@@ -28,47 +157,63 @@ class AnswerSubmitter:
             Response from submit endpoint
         """
         try:
+            # Filter results stay lazy until now
+            answer = materialize(answer)
+            
             logger.info(f"Submitting answer to {submit_url}")
-            logger.debug(f"Answer: {str(answer)[:200]}")
+            logger.debug(f"Answer: {reprlib.repr(answer)}")
             
-            # Prepare payload
+            # Prepare payload, serialized once (NumPy values handled by the encoder)
             payload = {
                 "email": email,
                 "answer": answer
             }
+            body = canonical_json(payload)
+            if len(body) > self.max_payload_bytes:
+                logger.error(f"Answer payload is {len(body)} bytes, over the {self.max_payload_bytes} byte budget")
+                return {
+                    "error": f"Payload of {len(body)} bytes exceeds the {self.max_payload_bytes} byte limit",
+                    "payload_bytes": len(body),
+                    "correct": False
+                }
             
-            # Try POST request
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                try:
-                    async with session.post(submit_url, json=payload) as response:
-                        response_text = await response.text()
-                        
-                        # Try to parse as JSON
-                        try:
-                            response_data = await response.json()
-                        except:
-                            response_data = {"text": response_text}
-                        
-                        logger.info(f"Submit response status: {response.status}")
-                        logger.debug(f"Submit response: {str(response_data)[:500]}")
-                        
-                        # Add status and URL info
-                        response_data["status_code"] = response.status
-                        response_data["submit_url"] = submit_url
-                        
-                        # Extract next quiz URL if present (for chaining)
-                        next_url = self._extract_next_url(response_data)
-                        if next_url:
-                            response_data["next_url"] = next_url
-                            logger.info(f"Next quiz URL detected: {next_url}")
-                        
-                        return response_data
-                
-                except aiohttp.ClientError as e:
-                    logger.error(f"HTTP error submitting answer: {e}")
+            origin = self._origin(submit_url)
+            async with client_session(self.session, self.timeout) as session:
+                # The format that last worked for this origin goes first
+                for fmt in self.formats.order(origin):
+                    try:
+                        response_data = await self._send(session, submit_url, fmt, body, answer, email)
+                    except aiohttp.ClientError as e:
+                        logger.error(f"HTTP error submitting answer as {fmt}: {e}")
+                        self.formats.invalidate(origin, fmt)
+                        continue
+                    
+                    if response_data["status_code"] in FORMAT_REJECTED:
+                        logger.info(f"{origin} refused the {fmt} payload (status {response_data['status_code']})")
+                        self.formats.invalidate(origin, fmt)
+                        continue
+                    
+                    status = response_data["status_code"]
+                    if "correct" in response_data or 200 <= status < 300:
+                        self.formats.confirm(origin, fmt)
+                    elif 400 <= status < 500:
+                        # Not retried in another shape: a 4xx may be the verdict on the answer
+                        self.formats.invalidate(origin, fmt)
+                    logger.info(f"Submit response status: {response_data['status_code']} ({fmt})")
+                    logger.debug(f"Submit response: {reprlib.repr(response_data)}")
+                    
+                    # Add URL info
+                    response_data["submit_url"] = submit_url
+                    
+                    # Extract next quiz URL if present (for chaining)
+                    next_url = self._extract_next_url(response_data)
+                    if next_url:
+                        response_data["next_url"] = next_url
+                        logger.info(f"Next quiz URL detected: {next_url}")
                     
-                    # Try with different payload formats
-                    return await self._try_alternative_formats(session, submit_url, answer, email)
+                    return response_data
+            
+            return {"error": "All submission methods failed", "correct": False}
         
         except Exception as e:
             logger.error(f"Error submitting answer: {e}")
@@ -77,36 +222,85 @@ class AnswerSubmitter:
                 "correct": False
             }
     
-    async def _try_alternative_formats(self, session: aiohttp.ClientSession, 
-                                      url: str, answer: Any, email: str) -> Dict[str, Any]:
-        """Try alternative payload formats"""
+    async def _send(self, session: aiohttp.ClientSession, url: str, fmt: str,
+                    body: bytes, answer: Any, email: str) -> Dict[str, Any]:
+        """POST the answer in one payload format"""
+        if fmt == "json":
+            return await self._post_json(session, url, body)
         
-        # Try with just answer field
-        try:
-            payload = {"answer": answer}
-            async with session.post(url, json=payload) as response:
-                try:
-                    return await response.json()
-                except:
-                    return {"text": await response.text(), "status_code": response.status}
-        except:
-            pass
+        if fmt == "answer_json":
+            return await self._post_json(session, url, canonical_json({"answer": answer}))
         
-        # Try form data
-        try:
-            form_data = aiohttp.FormData()
-            form_data.add_field('email', email)
-            form_data.add_field('answer', str(answer))
-            
-            async with session.post(url, data=form_data) as response:
-                try:
-                    return await response.json()
-                except:
-                    return {"text": await response.text(), "status_code": response.status}
-        except:
-            pass
+        form_data = aiohttp.FormData()
+        form_data.add_field('email', email)
+        form_data.add_field('answer', answer if isinstance(answer, str) else canonical_json(answer).decode("utf-8"))
+        
+        async with session.post(url, data=form_data) as response:
+            return self._response_data(response, await response.read())
+    
+    async def _post_json(self, session: aiohttp.ClientSession, url: str, body: bytes) -> Dict[str, Any]:
+        """
+        POST a serialized JSON body, gzip-compressed when the origin accepts it
+        
+        An origin that rejects the compressed body (415, or a 400 naming the
+        encoding) is remembered and the body is resent uncompressed.
+        """
+        origin = self._origin(url)
+        compress = self._should_compress(origin, len(body))
+        data = gzip.compress(body, compresslevel=6) if compress else body
+        
+        async with session.post(url, data=data, headers=GZIP_HEADERS if compress else JSON_HEADERS) as response:
+            raw = await response.read()
+            if compress and self._encoding_rejected(response.status, raw):
+                logger.info(f"{origin} rejected a gzip body (status {response.status}), resending uncompressed")
+                _gzip_support[origin] = False
+            else:
+                # RFC 7694: Accept-Encoding on a response lists codings accepted in requests
+                accepted = response.headers.get("Accept-Encoding", "") or ""
+                if "gzip" in accepted.lower():
+                    _gzip_support[origin] = True
+                return self._response_data(response, raw)
+        
+        return await self._post_json(session, url, body)
+    
+    @staticmethod
+    def _encoding_rejected(status: int, raw: bytes) -> bool:
+        """
+        Whether a reply refuses the gzip coding itself
         
-        return {"error": "All submission methods failed", "correct": False}
+        Only 415, or a 400 whose body names the encoding: quiz endpoints also
+        answer 400 to a wrong answer, which must not be submitted twice.
+        """
+        if status == 415:
+            return True
+        if status == 400:
+            text = raw[:2048].lower()
+            return b"encoding" in text or b"gzip" in text
+        return False
+    
+    def _should_compress(self, origin: str, size: int) -> bool:
+        if self.compression == "never" or size < GZIP_MIN_BYTES:
+            return False
+        if self.compression == "always":
+            return _gzip_support.get(origin, True)
+        return _gzip_support.get(origin, False)
+    
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+    
+    @staticmethod
+    def _response_data(response: Any, raw: bytes) -> Dict[str, Any]:
+        """Decode a response body once: JSON if it parses, text otherwise"""
+        try:
+            data = decode_json(raw) if raw else {}
+        except ValueError:
+            data = {"text": raw.decode(response.charset or "utf-8", errors="replace")}
+        if not isinstance(data, dict):
+            data = {"data": data}
+        data["status_code"] = response.status
+        return data
     
     def _extract_next_url(self, response_data: Dict[str, Any]) -> Optional[str]:
         """
@@ -0,0 +1,155 @@
+"""
+Table normalizer
+Turns raw HTML/PDF cell grids into typed DataFrames: cleans headers, handles merged
+cells and coerces currency, percent and date strings in bulk
+"""
+import re
+import logging
+from typing import Any, List, Optional
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Share of non-empty cells that must convert for a column to change type
+CONVERT_RATIO = 0.8
+
+CURRENCY_CHARS = r"[\$€£¥₹\s ]"
+THOUSANDS = r"(?<=\d)[,'](?=\d{3}\b)"
+DATE_HINT = re.compile(r"\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b", re.I)
+
+
+def _is_blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _clean_header(cells: List[Any]) -> List[str]:
+    """Collapse whitespace/newlines, name blanks and de-duplicate"""
+    names = []
+    seen = {}
+    for i, cell in enumerate(cells):
+        name = re.sub(r"\s+", " ", str(cell)).strip() if not _is_blank(cell) else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _looks_numeric(value: Any) -> bool:
+    if _is_blank(value):
+        return False
+    text = re.sub(CURRENCY_CHARS + r"|[,%()]", "", str(value))
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def _find_header(rows: List[List[Any]]) -> int:
+    """
+    Index of the header row
+
+    Skips leading title rows (a single filled cell spanning a merged range)
+    and blank rows; the header is the first row filled at least halfway with
+    mostly non-numeric cells.
+    """
+    for i, row in enumerate(rows[:5]):
+        filled = [c for c in row if not _is_blank(c)]
+        if len(row) > 1 and len(filled) <= 1:
+            continue
+        if len(filled) * 2 >= len(row) and sum(_looks_numeric(c) for c in filled) * 2 < len(filled):
+            return i
+    return 0
+
+
+def normalize_table(table: List[List[Any]]) -> Optional[pd.DataFrame]:
+    """
+    Convert a raw cell grid (first row header) into a typed DataFrame
+
+    Args:
+        table: Rows of cells as produced by BrowserManager or pdfplumber
+
+    Returns:
+        DataFrame, or None if the grid has no data rows
+    """
+    rows = [list(row) for row in table if row and not all(_is_blank(c) for c in row)]
+    if len(rows) < 2:
+        return None
+
+    header_at = _find_header(rows)
+    header = _clean_header(rows[header_at])
+    width = len(header)
+
+    body = []
+    for row in rows[header_at + 1:]:
+        row = (row + [None] * width)[:width]
+        filled = [c for c in row if not _is_blank(c)]
+        # A lone label across a merged row is a section heading, not data
+        if width > 2 and len(filled) == 1 and not _is_blank(row[0]) and not _looks_numeric(row[0]):
+            continue
+        body.append(row)
+
+    if not body:
+        return None
+
+    df = pd.DataFrame(body, columns=header, dtype=object)
+
+    # pdfplumber reports vertically merged cells as None below the first cell
+    for col in df.columns[:1]:
+        first = df[col].iloc[0]
+        if df[col].isna().any() and first is not None and not _looks_numeric(first):
+            df[col] = df[col].ffill()
+
+    return coerce_columns(df)
+
+
+def coerce_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert string columns to numeric or datetime dtypes where the values allow"""
+    for col in df.columns:
+        series = df[col]
+        if not (pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)):
+            continue
+
+        text = series.astype("string").str.strip()
+        present = text.notna() & (text != "")
+        count = int(present.sum())
+        if count == 0:
+            continue
+
+        numeric = to_numeric_strings(text)
+        if numeric.notna().sum() >= CONVERT_RATIO * count:
+            df[col] = numeric
+            continue
+
+        sample = text[present].head(20)
+        if sample.str.contains(DATE_HINT).mean() >= CONVERT_RATIO:
+            dates = pd.to_datetime(text.where(present), errors="coerce", format="mixed")
+            if dates.notna().sum() >= CONVERT_RATIO * count:
+                df[col] = dates
+
+    return df
+
+
+def to_numeric_strings(text: pd.Series) -> pd.Series:
+    """
+    Vectorized numeric parse of formatted strings
+
+    Handles currency symbols, thousands separators, percent signs,
+    accounting negatives "(1,234)" and unicode minus signs.
+    """
+    cleaned = (
+        text.str.replace(CURRENCY_CHARS, "", regex=True)
+        .str.replace(THOUSANDS, "", regex=True)
+        .str.replace("%", "", regex=False)
+        .str.replace("−", "-", regex=False)
+        .str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+    )
+    numeric = pd.to_numeric(cleaned, errors="coerce")
+
+    # Back to plain NumPy dtypes so downstream select_dtypes/to_numpy stay cheap
+    if pd.api.types.is_integer_dtype(numeric.dtype) and not numeric.isna().any():
+        return numeric.astype("int64")
+    return numeric.astype("float64")
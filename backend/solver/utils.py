@@ -5,7 +5,8 @@ Logging, timeout management, data cleaning
 import time
 import logging
 import sys
-from typing import Any, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
 
 
 def setup_logging() -> logging.Logger:
@@ -52,6 +53,17 @@ class TimeoutManager:
             raise TimeoutError(f"Approaching timeout limit ({self.max_seconds}s)")
 
 
+@asynccontextmanager
+async def client_session(shared: Any, timeout: Any) -> AsyncIterator[Any]:
+    """A shared aiohttp session (left open) or a new one closed on exit"""
+    if shared is not None:
+        yield shared
+        return
+    import aiohttp
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        yield session
+
+
 def sanitize_string(s: str) -> str:
     """Sanitize string for safe processing"""
     if not isinstance(s, str):
@@ -85,11 +97,9 @@ def safe_int(value: Any) -> Optional[int]:
 
 
 def extract_numbers(text: str) -> list:
-    """Extract all numbers from text"""
-    import re
-    pattern = r'-?\d+\.?\d*'
-    matches = re.findall(pattern, text)
-    return [float(m) for m in matches]
+    """Extract all numbers from text (see solver.scanner.scan_numbers for the array form)"""
+    from solver.scanner import scan_numbers
+    return scan_numbers(text).tolist()
 
 
 def clean_dataframe_columns(df):
@@ -117,6 +127,6 @@ def detect_encoding(content: bytes) -> str:
     
     try:
         result = chardet.detect(content)
-        return result.get('encoding', 'utf-8')
+        return result.get('encoding') or 'utf-8'
     except:
         return 'utf-8'
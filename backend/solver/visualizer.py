@@ -2,22 +2,31 @@
 Data visualizer
 Creates charts and converts them to base64 for submission
 """
-import io
-import base64
 import logging
 from typing import Dict, Any, Optional
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 
+from solver.charts import ChartRenderer, RenderCache, chart_renderer, render_cache
+from solver.downsample import downsample_line, to_series, top_bars, top_rows
+from solver.filters import FilterResult
+
 logger = logging.getLogger(__name__)
 
+# Line charts with more points than this are drawn without markers
+MARKER_POINTS = 100
+
 
 class DataVisualizer:
     """Creates visualizations from analyzed data"""
     
+    def __init__(self, renderer: ChartRenderer = chart_renderer, max_chars: Optional[int] = None,
+                 cache: Optional[RenderCache] = render_cache):
+        self.renderer = renderer
+        # Size budget for the data URI (submit payload limits); renderer default if None
+        self.max_chars = max_chars
+        self.cache = cache
+    
     def create_visualization(self, analysis_result: Dict[str, Any]) -> Optional[str]:
         """
         Create visualization and return as base64 string
@@ -33,14 +42,18 @@ class DataVisualizer:
             
             # Determine chart type based on data structure
             if isinstance(raw_result, dict):
-                return self._create_bar_chart(raw_result)
+                chart_type, create = "bar", self._create_bar_chart
+            elif isinstance(raw_result, FilterResult):
+                chart_type, create = "line", self._create_line_chart
             elif isinstance(raw_result, list):
-                return self._create_line_chart(raw_result)
+                chart_type, create = "line", self._create_line_chart
             elif isinstance(raw_result, (int, float)):
-                return self._create_single_value_chart(raw_result)
+                chart_type, create = "value", self._create_single_value_chart
             else:
                 logger.warning(f"Unknown data type for visualization: {type(raw_result)}")
                 return None
+            
+            return self._cached(chart_type, raw_result, create)
         
         except Exception as e:
             logger.error(f"Error creating visualization: {e}")
@@ -48,106 +61,95 @@ class DataVisualizer:
     
     def _create_bar_chart(self, data: Dict[str, Any]) -> str:
         """Create bar chart from dictionary"""
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        keys = list(data.keys())
-        values = list(data.values())
-        
-        # Convert values to numeric if possible
-        numeric_values = []
-        for v in values:
-            try:
-                numeric_values.append(float(v))
-            except:
-                numeric_values.append(0)
+        # Largest bars plus an "Other" bucket, so label count stays bounded
+        keys, numeric_values = top_bars(data.keys(), data.values())
         
-        ax.bar(keys, numeric_values)
-        ax.set_xlabel('Categories')
-        ax.set_ylabel('Values')
-        ax.set_title('Data Analysis Results')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
+        def draw(fig):
+            ax = fig.add_subplot()
+            ax.bar(keys, numeric_values)
+            ax.set_xlabel('Categories')
+            ax.set_ylabel('Values')
+            ax.set_title('Data Analysis Results')
+            ax.tick_params(axis='x', labelrotation=45)
+            for label in ax.get_xticklabels():
+                label.set_horizontalalignment('right')
         
-        return self._fig_to_base64(fig)
+        return self._render(draw)
     
-    def _create_line_chart(self, data: list) -> str:
-        """Create line chart from list"""
-        fig, ax = plt.subplots(figsize=(10, 6))
+    def _create_line_chart(self, data: Any) -> str:
+        """Create line chart from a list, records or a filter result"""
+        # Convert to numeric in one pass, then reduce to the plot's pixel width
+        x, y = downsample_line(to_series(data))
         
-        # Convert to numeric
-        numeric_data = []
-        for item in data:
-            try:
-                if isinstance(item, dict):
-                    # Use first numeric value
-                    for v in item.values():
-                        try:
-                            numeric_data.append(float(v))
-                            break
-                        except:
-                            continue
-                else:
-                    numeric_data.append(float(item))
-            except:
-                pass
-        
-        if numeric_data:
-            ax.plot(numeric_data, marker='o')
-            ax.set_xlabel('Index')
-            ax.set_ylabel('Value')
-            ax.set_title('Data Trend')
-            plt.tight_layout()
+        def draw(fig):
+            ax = fig.add_subplot()
+            if y.size:
+                ax.plot(x, y, marker='o' if y.size <= MARKER_POINTS else None)
+                ax.set_xlabel('Index')
+                ax.set_ylabel('Value')
+                ax.set_title('Data Trend')
         
-        return self._fig_to_base64(fig)
+        return self._render(draw)
     
     def _create_single_value_chart(self, value: float) -> str:
         """Create chart for single value (gauge-like)"""
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        ax.text(0.5, 0.5, f'{value:.2f}', 
-                horizontalalignment='center',
-                verticalalignment='center',
-                fontsize=48,
-                transform=ax.transAxes)
-        ax.set_xlim(0, 1)
-        ax.set_ylim(0, 1)
-        ax.axis('off')
-        ax.set_title('Result', fontsize=20)
+        def draw(fig):
+            ax = fig.add_subplot()
+            ax.text(0.5, 0.5, f'{value:.2f}', 
+                    horizontalalignment='center',
+                    verticalalignment='center',
+                    fontsize=48,
+                    transform=ax.transAxes)
+            ax.set_xlim(0, 1)
+            ax.set_ylim(0, 1)
+            ax.axis('off')
+            ax.set_title('Result', fontsize=20)
         
-        return self._fig_to_base64(fig)
+        return self._render(draw, figsize=(8, 6))
     
-    def _fig_to_base64(self, fig) -> str:
-        """Convert matplotlib figure to base64 string"""
-        buffer = io.BytesIO()
-        fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-        plt.close(fig)
-        buffer.seek(0)
-        
-        image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-        return f"data:image/png;base64,{image_base64}"
+    def _cached(self, chart_type: str, data: Any, create) -> str:
+        """Rendered chart from the cache, rendering on a miss"""
+        if self.cache is None:
+            return create(data)
+        key = self.cache.key_for(chart_type, data, style=(self.max_chars,))
+        uri = self.cache.get(key)
+        if uri is None:
+            uri = create(data)
+            self.cache.put(key, uri)
+        else:
+            logger.info(f"Reusing rendered {chart_type} chart")
+        return uri
+    
+    def _render(self, draw, figsize=(10, 6)) -> str:
+        """Render a drawing function to a PNG data URI within the size budget"""
+        if self.max_chars is None:
+            return self.renderer.render(draw, figsize=figsize)
+        return self.renderer.render(draw, figsize=figsize, max_chars=self.max_chars)
     
     def create_dataframe_visualization(self, df: pd.DataFrame) -> Optional[str]:
         """Create visualization from DataFrame"""
         try:
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
             # Find numeric columns
             numeric_cols = df.select_dtypes(include=[np.number]).columns
             
-            if len(numeric_cols) > 0:
-                # Plot first few numeric columns
-                df[numeric_cols[:3]].plot(ax=ax, kind='bar')
-                ax.set_title('Data Analysis')
-                ax.set_xlabel('Index')
-                ax.set_ylabel('Value')
-                plt.xticks(rotation=45)
-                plt.tight_layout()
-                
-                return self._fig_to_base64(fig)
-            else:
-                plt.close(fig)
+            if len(numeric_cols) == 0:
                 return None
+            
+            return self._cached("dataframe", df[numeric_cols[:3]],
+                                lambda frame: self._create_dataframe_chart(top_rows(frame)))
         
         except Exception as e:
             logger.error(f"Error creating DataFrame visualization: {e}")
             return None
+    
+    def _create_dataframe_chart(self, frame: pd.DataFrame) -> str:
+        """Bar chart of up to three numeric columns"""
+        def draw(fig):
+            ax = fig.add_subplot()
+            frame.plot(ax=ax, kind='bar')
+            ax.set_title('Data Analysis')
+            ax.set_xlabel('Index')
+            ax.set_ylabel('Value')
+            ax.tick_params(axis='x', labelrotation=45)
+        
+        return self._render(draw, figsize=(12, 6))
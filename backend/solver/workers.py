@@ -0,0 +1,30 @@
+"""
+Shared worker processes
+One process pool for CPU-bound work (PDF pages, group-by partitions), created on first use
+"""
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+
+
+def get_process_pool(workers: int = DEFAULT_WORKERS) -> ProcessPoolExecutor:
+    """Shared worker pool, created on first use so startup cost is paid once"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers < workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        # Never fork: the server process runs event-loop and browser threads
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        _pool_workers = workers
+        logger.debug(f"Started {workers}-worker process pool ({method})")
+    return _pool
@@ -69,6 +69,29 @@ class TestAPI:
         
         assert response.status_code == 403
     
+    def test_quiz_batch_streams_ndjson(self):
+        """Test batch endpoint streams one line per chain plus a summary"""
+        import json
+        client = TestClient(app)
+        response = client.post(
+            "/quiz/batch",
+            json={
+                "requests": [
+                    {"email": f"user{i}@example.com", "secret": "wrong-secret", "url": "https://example.com/quiz"}
+                    for i in range(3)
+                ],
+                "parallelism": 2
+            }
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(line["index"] for line in lines[:-1]) == [0, 1, 2]
+        assert all(line["status"] == "error" for line in lines[:-1])
+        assert lines[-1]["summary"]["chains"] == 3
+        assert lines[-1]["summary"]["failed"] == 3
+    
     def test_quiz_valid_request_structure(self):
         """Test quiz endpoint with valid structure"""
         client = TestClient(app)
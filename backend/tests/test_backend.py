@@ -251,6 +251,1175 @@ class TestDataAnalyzer:
         assert min_result == 3
 
 
+class TestQueryCompiler:
+    """Test question-to-query compiler"""
+    
+    def test_keywords_match_whole_words(self):
+        from solver.query import compile_question
+        
+        # "add" must not match "address", a bare "by" must not force a group-by
+        assert compile_question("What is the address of the store?").operation == "extract"
+        assert compile_question("Values sorted by date").group_by is None
+        # "at least N" is a threshold, not a request for the minimum
+        plan = compile_question("Count the orders grouped by region with amount at least 50")
+        assert plan.aggregations == ("count",)
+        assert compile_question("Which region has the least sales?").operation == "min"
+    
+    def test_plan_fields(self):
+        from solver.query import compile_question
+        
+        plan = compile_question("Total sales by region for orders with amount greater than 1,000")
+        
+        assert plan.operation == "aggregate"
+        assert plan.aggregation == "sum"
+        assert plan.group_by == "region"
+        assert plan.target_terms[0] == "sales"
+        assert plan.filters[0].column == "amount"
+        assert plan.filters[0].op == ">"
+        assert plan.filters[0].value == 1000.0
+    
+    def test_plan_cached_by_normalized_text(self):
+        from solver.query import compile_question
+        
+        assert compile_question("Sum the  SCORE column?") is compile_question("sum the score column")
+    
+    def test_filtered_execution_uses_referenced_column(self):
+        from solver.analyzer import DataAnalyzer
+        import pandas as pd
+        
+        analyzer = DataAnalyzer()
+        df = pd.DataFrame({"id": [1, 2, 3, 4], "score": [50, 80, 90, 70]})
+        data = {"dataframes": [df], "tables": [], "json_data": [], "text_data": [], "numeric_values": [999]}
+        
+        assert analyzer._compute_sum(data, "sum of score where score > 60") == 240
+        assert analyzer._compute_count(data, "how many rows have score at least 80") == 2
+        assert analyzer._aggregate_analysis(
+            {**data, "dataframes": [pd.DataFrame({"region": ["N", "S", "N"], "sales": [1, 2, 3]})]},
+            "total sales by region"
+        ) == {"N": 4, "S": 2}
+    
+    def test_relevant_numbers_follow_the_named_column(self):
+        from solver.analyzer import DataAnalyzer
+        import numpy as np
+        import pandas as pd
+        
+        analyzer = DataAnalyzer()
+        df = pd.DataFrame({"id": [1, 2, 3, 4], "price": [5.0, np.nan, 15.0, None], "qty": [7, 8, 9, 10]})
+        data = {"dataframes": [df], "numeric_values": [999.0]}
+        
+        prices = analyzer._extract_relevant_numbers(data, "What are the price values?")
+        quantities = analyzer._extract_relevant_numbers(data, "List the qty values where price > 6")
+        
+        # Only the named column, with missing values dropped rather than returned as NaN
+        assert prices.dtype == np.float64 and prices.tolist() == [5.0, 15.0]
+        assert quantities.tolist() == [9.0]
+        # Loose page numbers are used only when no table column is usable
+        assert analyzer._extract_relevant_numbers({"dataframes": [], "numeric_values": [999.0]}, "price").tolist() == [999.0]
+
+
+class TestColumnIndex:
+    """Test column relevance index"""
+    
+    def test_synonym_and_fuzzy_matching(self):
+        from solver.columns import ColumnIndex
+        import pandas as pd
+        
+        df = pd.DataFrame({"OrderID": [1, 2], "Region": ["N", "S"], "Total Revenue": [5.0, 7.0]})
+        index = ColumnIndex([df])
+        
+        assert index.best(["sales"], numeric=True) == "Total Revenue"
+        assert index.best(["regoin"]) == "Region"
+        assert index.best(["the", "of"]) is None
+    
+    def test_default_measure_skips_identifiers(self):
+        from solver.columns import ColumnIndex
+        import pandas as pd
+        
+        df = pd.DataFrame({"order_id": [1, 2, 3], "quantity": [4, 5, 6]})
+        
+        assert ColumnIndex([df]).default_measure(0) == "quantity"
+
+
+class TestCSVLoader:
+    """Test CSV ingestion engine"""
+    
+    def test_sniffs_encoding_and_delimiter(self):
+        from solver.loaders import CSVLoader
+        
+        content = "Name;Région;Sales\nA;Île;10\nB;Nord;20\n".encode("latin-1")
+        df = CSVLoader(use_pyarrow=False).load(content)
+        
+        assert list(df.columns) == ["Name", "Région", "Sales"]
+        assert df["Région"].iloc[0] == "Île"
+        assert df["Sales"].sum() == 30
+    
+    def test_reads_only_referenced_columns_and_shrinks_dtypes(self):
+        from solver.loaders import CSVLoader
+        from solver.query import compile_question
+        
+        rows = "\n".join(f"{i},{'North' if i % 2 else 'South'},{i * 1.5},{i}" for i in range(100))
+        content = ("id,region,sales,units\n" + rows).encode()
+        
+        df = CSVLoader().load(content, compile_question("total sales by region"))
+        assert list(df.columns) == ["region", "sales"]
+        assert str(df["region"].dtype) == "category"
+        
+        full = CSVLoader().load(content)
+        assert full["units"].dtype.itemsize == 1
+    
+    def test_keeps_every_column_the_question_names(self):
+        from solver.loaders import CSVLoader
+        from solver.query import compile_question
+        
+        content = b"name,score,city\nAnn,70,Oslo\nBob,90,Rome\nCid,80,Bern\n"
+        
+        # Both the label and the measure survive pruning; only the unnamed column is skipped
+        df = CSVLoader().load(content, compile_question("which name has the highest score?"))
+        assert list(df.columns) == ["name", "score"]
+        assert df.loc[df["score"].idxmax(), "name"] == "Bob"
+
+
+    def test_keeps_every_group_key(self):
+        from solver.loaders import CSVLoader
+        from solver.analyzer import DataAnalyzer
+        from solver.query import compile_question
+        
+        content = b"region,category,sales,extra\nN,a,10,1\nN,b,17,1\nS,a,20,1\nS,b,19,1\n"
+        question = "What is the total sales by region and category?"
+        plan = compile_question(question.lower())
+        
+        assert list(CSVLoader().load(content, plan).columns) == ["region", "category", "sales"]
+        assert all(list(chunk.columns) == ["region", "category", "sales"]
+                   for chunk in CSVLoader().iter_chunks(content, plan, chunk_rows=2))
+        
+        downloaded = {"files": [{"type": "csv", "url": "x.csv", "content": content}]}
+        result = DataAnalyzer().analyze({"question": question}, downloaded)
+        assert len(result["raw_result"]) == 4
+
+
+class TestLazyWorkbook:
+    """Test lazy Excel loading"""
+    
+    def test_loads_only_referenced_sheet(self):
+        import io
+        import openpyxl
+        from solver.loaders import LazyWorkbook
+        from solver.query import compile_question
+        
+        wb = openpyxl.Workbook()
+        orders = wb.active
+        orders.title = "Orders"
+        orders.append(["Region", "Sales"])
+        orders.append(["North", 100])
+        staff = wb.create_sheet("Staff")
+        staff.append(["Name", "Salary"])
+        staff.append(["Ann", 5000])
+        staff.append(["Bob", 7000])
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        
+        for use_calamine in (False, True):
+            workbook = LazyWorkbook(buffer.getvalue(), use_calamine=use_calamine)
+            
+            assert workbook.headers("Staff") == ["Name", "Salary"]
+            assert workbook.select_sheets(compile_question("What is the average salary?")) == ["Staff"]
+            assert workbook.load("Staff")["Salary"].sum() == 12000
+            assert "Orders" not in workbook._sheets
+            workbook.close()
+
+
+class TestPDFEngine:
+    """Test parallel PDF extraction"""
+    
+    @pytest.fixture
+    def multi_page_pdf(self):
+        import io
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
+        
+        buffer = io.BytesIO()
+        with PdfPages(buffer) as pdf:
+            for i in range(10):
+                fig = plt.figure(figsize=(4, 3))
+                fig.text(0.1, 0.5, f"Page {i + 1} value {100 + i}")
+                pdf.savefig(fig)
+                plt.close(fig)
+        return buffer.getvalue()
+    
+    def test_parallel_extraction_keeps_page_order(self, multi_page_pdf):
+        from solver.pdf_engine import PDFEngine
+        
+        parallel = PDFEngine(max_workers=2).extract(multi_page_pdf)
+        serial = PDFEngine(max_workers=1).extract(multi_page_pdf)
+        
+        assert parallel["text"] == serial["text"]
+        assert parallel["text"].splitlines()[0] == "Page 1 value 100"
+        assert parallel["text"].splitlines()[-1] == "Page 10 value 109"
+    
+    def test_question_page_range(self, multi_page_pdf):
+        from solver.analyzer import DataAnalyzer
+        from solver.query import compile_question
+        
+        plan = compile_question("What is the value on pages 3-4?")
+        result = DataAnalyzer()._extract_from_pdf(multi_page_pdf, plan)
+        
+        assert plan.pages == (2, 3)
+        assert result["text"] == "Page 3 value 102\nPage 4 value 103"
+    
+    def test_question_page_list(self, multi_page_pdf):
+        from solver.analyzer import DataAnalyzer
+        from solver.query import compile_question
+        
+        plan = compile_question("What is the value on pages 2 and 4?")
+        result = DataAnalyzer()._extract_from_pdf(multi_page_pdf, plan)
+        
+        assert plan.pages == (1, 3)
+        assert result["text"] == "Page 2 value 101\nPage 4 value 103"
+        assert compile_question("Sum pages 1, 3 and 5-6").pages == (0, 2, 4, 5)
+
+
+class TestTableNormalizer:
+    """Test HTML/PDF table coercion"""
+    
+    def test_messy_table_becomes_typed(self):
+        from solver.tables import normalize_table
+        
+        table = [
+            ["Quarterly report", None, None],
+            ["Region", "Total\nSales", "Growth"],
+            ["North", "$1,200.50", "5%"],
+            [None, "(300)", "-2%"],
+            ["South", "€2,000", "10 %"],
+        ]
+        df = normalize_table(table)
+        
+        assert list(df.columns) == ["Region", "Total Sales", "Growth"]
+        assert list(df["Region"]) == ["North", "North", "South"]
+        assert df["Total Sales"].sum() == 2900.5
+        assert df["Growth"].dtype.kind == "i"
+    
+    def test_html_table_is_numeric_for_analysis(self, mock_page_content):
+        from solver.analyzer import DataAnalyzer
+        
+        downloaded = {"tables": mock_page_content["tables"]}
+        result = DataAnalyzer().analyze({"question": "What is the sum of all values?"}, downloaded)
+        
+        assert result["raw_result"] == 30
+
+
+class TestPayloadStore:
+    """Test inline payload decoding and page stripping"""
+
+    def test_page_payload_is_stored_once(self):
+        import base64
+        from solver.payloads import PayloadStore, strip_inline_payloads
+
+        csv_text = "value\n" + "\n".join(str(i) for i in range(1, 501))
+        encoded = base64.b64encode(csv_text.encode()).decode()
+        url = f"data:text/csv;base64,{encoded}"
+        store = PayloadStore()
+        page = {
+            "html": f'<a href="{url}">data</a>',
+            "links": [{"href": url, "text": "data"}],
+            "scripts": [f'const raw = atob("{encoded}");'],
+        }
+
+        strip_inline_payloads(page, store)
+
+        assert len(store) == 1
+        assert encoded not in page["html"] and encoded not in page["scripts"][0]
+        header, content = store.decode_data_url(page["links"][0]["href"])
+        assert header == "data:text/csv"
+        assert isinstance(content, memoryview)
+        assert bytes(content) == csv_text.encode()
+        assert bytes(store.decode_base64(page["scripts"][0][len('const raw = atob("'):-3])) == csv_text.encode()
+
+    def test_chain_payloads_survive_eviction_until_unpinned(self):
+        import base64
+        from solver.payloads import PayloadStore, strip_inline_payloads
+
+        encoded = base64.b64encode(b"x" * 3000).decode()
+        store = PayloadStore(max_bytes=len(encoded) + 100)
+        page = strip_inline_payloads({"links": [{"href": f"data:text/csv;base64,{encoded}", "text": "data"}]}, store)
+        key = page["payload_keys"][0]
+
+        # Another chain's payloads fill the store, but the loaded page keeps its own
+        for i in range(3):
+            store.register(base64.b64encode(bytes([i]) * 3000).decode())
+        assert store.get(key) is not None
+
+        store.unpin(page["payload_keys"])
+        store.register(base64.b64encode(b"y" * 3000).decode())
+        assert store.get(key) is None
+
+    def test_memoryview_content_loads_without_copy(self):
+        from solver.loaders import CSVLoader
+        from solver.payloads import as_stream
+
+        content = memoryview(b"region,sales\nNorth,100\nSouth,200\n")
+        stream = as_stream(content)
+        stream.seek(7)
+        assert stream.read(5) == b"sales"
+
+        df = CSVLoader(use_pyarrow=False).load(content)
+        assert df["sales"].sum() == 300
+
+
+class TestDatasetRegistry:
+    """Test dataset reuse across chain steps"""
+
+    @pytest.mark.asyncio
+    async def test_second_step_skips_download_and_parse(self):
+        from solver.analyzer import DataAnalyzer
+        from solver.downloader import DataDownloader
+        from solver.registry import DatasetRegistry
+
+        registry = DatasetRegistry()
+        source = {"url": "https://example.com/data.csv", "type": "csv"}
+        content = b"region,sales,cost\nNorth,100,10\nSouth,200,20\n"
+
+        downloader = DataDownloader(registry)
+        with patch.object(downloader, "_fetch_source",
+                          AsyncMock(return_value={"type": "csv", "url": source["url"], "content": content})) as fetch:
+            first = await downloader.download_all({"data_sources": [source]})
+            second = await DataDownloader(registry).download_all({"data_sources": [source]})
+        assert fetch.await_count == 1
+        assert second["files"][0]["content"] is content
+
+        analyzer = DataAnalyzer(registry)
+        sales = analyzer.analyze({"question": "What is the sum of the sales column?"}, first)
+        with patch("solver.loaders.CSVLoader.load") as load:
+            cost = DataAnalyzer(registry).analyze({"question": "What is the sum of the cost column?"}, second)
+            load.assert_not_called()
+
+        assert sales["raw_result"] == 300
+        assert cost["raw_result"] == 30
+        dataset = registry.get("https://example.com/data.csv")
+        assert dataset.stats[0]["cost"].max == 20
+
+        registry.close()
+        assert len(registry) == 0
+
+    def test_least_recently_used_datasets_are_evicted_by_size(self):
+        from solver.registry import DatasetRegistry
+
+        registry = DatasetRegistry(max_bytes=250)
+        registry.add_content("a", "csv", b"a" * 100)
+        registry.add_content("b", "csv", b"b" * 100)
+        assert registry.get("a") is not None
+        registry.add_content("c", "csv", b"c" * 100)
+
+        assert "a" in registry and "c" in registry and "b" not in registry
+        assert registry.nbytes == 200 and registry.evictions == 1
+
+
+class TestColumnSketch:
+    """Test load-time column statistics"""
+
+    def test_merged_sketch_matches_exact_stats(self):
+        import numpy as np
+        from solver.stats import ColumnSketch
+
+        values = np.random.default_rng(7).normal(100, 15, 20000)
+        values[::50] = np.nan
+        sketch = ColumnSketch.from_values(values[:12000]).merge(ColumnSketch.from_values(values[12000:]))
+        present = values[~np.isnan(values)]
+
+        assert sketch.count == present.size and sketch.nulls == 400
+        assert sketch.sum == pytest.approx(present.sum())
+        assert sketch.min == present.min() and sketch.max == present.max()
+        assert sketch.quantile(0.5) == pytest.approx(np.median(present), abs=0.5)
+
+    def test_unfiltered_aggregates_skip_the_scan(self):
+        from solver.analyzer import DataAnalyzer
+
+        analyzer = DataAnalyzer()
+        downloaded = {"files": [{"type": "csv", "content": b"item,price\na,5\nb,15\nc,10\n"}]}
+        with patch.object(analyzer, "_extract_relevant_numbers") as scan:
+            total = analyzer.analyze({"question": "What is the sum of price?"}, downloaded)
+            highest = analyzer.analyze({"question": "What is the maximum price?"}, downloaded)
+            scan.assert_not_called()
+        filtered = analyzer.analyze({"question": "Sum of price where price > 6"}, downloaded)
+
+        assert total["raw_result"] == 30
+        assert highest["raw_result"] == 15
+        assert filtered["raw_result"] == 25
+
+
+class TestStreamingAnalysis:
+    """Test chunked analysis of large sources"""
+
+    @pytest.fixture
+    def sales_csv(self):
+        rows = [f"{['North', 'South', 'East'][i % 3]},{i},{i % 7}" for i in range(1, 101)]
+        return ("region,sales,units\n" + "\n".join(rows) + "\n").encode()
+
+    def test_chunked_matches_in_memory(self, sales_csv):
+        from solver.analyzer import DataAnalyzer
+        from solver.loaders import CSVLoader
+        from solver.query import compile_question
+        from solver.streaming import ChunkedAggregator
+
+        analyzer = DataAnalyzer()
+        downloaded = {"files": [{"type": "csv", "content": sales_csv}]}
+        for question in ["What is the total sales by region?",
+                         "What is the average sales where units > 3?",
+                         "What are the top 3 highest sales?"]:
+            plan = compile_question(question)
+            chunks = CSVLoader().iter_chunks(sales_csv, plan, chunk_rows=7)
+            aggregator = ChunkedAggregator(plan, filter_frame=analyzer.filter_frame).consume(chunks)
+            expected = analyzer.analyze({"question": question}, downloaded)["raw_result"]
+
+            assert aggregator.chunks == 15
+            assert aggregator.result() == pytest.approx(expected)
+
+    def test_large_json_lines_are_streamed(self):
+        from solver.analyzer import DataAnalyzer
+
+        content = "\n".join(json.dumps({"city": c, "temp": t}) for c, t in [("A", 10), ("B", 20), ("A", 30)]).encode()
+        downloaded = {"files": [{"type": "jsonl", "content": content, "size": len(content)}]}
+        with patch("solver.streaming.STREAM_THRESHOLD", 10):
+            result = DataAnalyzer().analyze({"question": "What is the maximum temp?"}, downloaded)
+
+        assert result["raw_result"] == 30
+        assert result["data_summary"]["streamed_rows"] == 3
+
+    def test_small_sources_are_folded_into_streamed_result(self):
+        from solver.analyzer import DataAnalyzer
+
+        large = "\n".join(json.dumps({"city": c, "temp": t}) for c, t in [("A", 10), ("B", 20)]).encode()
+        small = b"city,temp\nC,45\n"
+        downloaded = {
+            "files": [
+                {"type": "jsonl", "content": large, "size": len(large)},
+                {"type": "csv", "content": small, "size": 1},
+            ],
+            "tables": [[["Name", "Unrelated"], ["x", "99"]]],
+        }
+        with patch("solver.streaming.STREAM_THRESHOLD", 30):
+            result = DataAnalyzer().analyze({"question": "What is the maximum temp?"}, downloaded)
+
+        assert result["raw_result"] == 45
+        assert result["data_summary"]["in_memory_frames"] == 1
+
+    def test_statistic_thresholds_span_every_chunk(self):
+        from solver.analyzer import DataAnalyzer
+        from solver.loaders import CSVLoader
+
+        # The first chunks average far below the last ones, so per-chunk means would disagree
+        content = ("item,price\n" + "\n".join(f"i{n},{n if n <= 20 else n * 10}" for n in range(1, 31)) + "\n").encode()
+        question = "What is the total price where price is above the average?"
+        expected = DataAnalyzer().analyze({"question": question}, {"files": [{"type": "csv", "content": content}]})
+
+        streamed_file = {"type": "csv", "content": content, "size": len(content)}
+        with patch("solver.streaming.STREAM_THRESHOLD", 10), \
+                patch.object(CSVLoader.iter_chunks, "__defaults__", (None, 4)):
+            streamed = DataAnalyzer().analyze({"question": question}, {"files": [streamed_file]})
+
+        assert streamed["data_summary"]["streamed_sources"] == 1
+        assert streamed["raw_result"] == expected["raw_result"] == sum(n * 10 for n in range(21, 31))
+
+
+class TestGroupByEngine:
+    """Test multi-key, multi-aggregation grouping"""
+
+    @pytest.fixture
+    def orders(self):
+        import pandas as pd
+        return pd.DataFrame({
+            "region": ["North", "South", "North", "South", "North", "East"],
+            "category": ["A", "A", "B", "A", "A", "B"],
+            "customer": ["c1", "c2", "c1", "c3", "c4", "c5"],
+            "sales": [10.0, 20.0, 30.0, 44.0, 50.0, 60.0],
+        })
+
+    def test_question_with_several_keys_and_aggregations(self, orders):
+        from solver.analyzer import DataAnalyzer
+
+        data = {"dataframes": [orders]}
+        analyzer = DataAnalyzer()
+        records = analyzer._aggregate_analysis(data, "sum and average of sales by region and category")
+        distinct = analyzer._aggregate_analysis(data, "how many distinct customers per region")
+
+        north_a = next(r for r in records if r["region"] == "North" and r["category"] == "A")
+        assert north_a == {"region": "North", "category": "A", "sum": 60.0, "average": 30.0}
+        assert len(records) == 4
+        assert distinct == {"North": 2, "South": 2, "East": 1}
+
+    def test_partitioned_matches_single_process(self, orders):
+        import pandas as pd
+        from solver.groupby import GroupSpec, group_aggregate
+
+        spec = GroupSpec(keys=("region",), values=("sales",), aggregations=("average", "count"),
+                         top_k=2)
+        parallel = group_aggregate(orders, spec, workers=2, parallel_rows=1)
+        serial = group_aggregate(orders, spec, workers=1)
+
+        pd.testing.assert_frame_equal(parallel, serial)
+        assert list(serial.index) == ["East", "South"]
+
+
+class TestFilterEngine:
+    """Test question conditions as vectorized filters"""
+
+    @pytest.fixture
+    def products(self):
+        import pandas as pd
+        return pd.DataFrame({
+            "product": ["tv", "phone", "shirt", "laptop", "socks"],
+            "category": pd.Categorical(["Electronics", "Electronics", "Clothing", "Electronics", "Clothing"]),
+            "price": [500.0, 300.0, 25.0, 900.0, 5.0],
+            "sold": pd.to_datetime(["2024-01-05", "2024-02-10", "2024-02-20", "2024-03-15", "2024-04-01"]),
+        })
+
+    def test_text_numeric_and_date_conditions(self, products):
+        from solver.analyzer import DataAnalyzer
+
+        analyzer = DataAnalyzer()
+        data = {"dataframes": [products]}
+
+        electronics = analyzer._apply_filter(data, "show rows where category is electronics and price under 800")
+        in_range = analyzer._apply_filter(data, "items sold between 2024-02-01 and 2024-03-31")
+        above = analyzer._apply_filter(data, "products where price is above the average")
+
+        assert list(electronics.column("product")) == ["tv", "phone"]
+        assert list(in_range.column("product")) == ["phone", "shirt", "laptop"]
+        assert list(above.column("product")) == ["tv", "laptop"]
+        assert analyzer._compute_sum(data, "total price where category is clothing") == 30.0
+
+    def test_rows_materialize_only_at_submit(self, products):
+        from solver.analyzer import DataAnalyzer
+        from solver.filters import FilterResult, materialize
+
+        view = DataAnalyzer()._apply_filter({"dataframes": [products]}, "filter rows where price > 400")
+
+        assert isinstance(view, FilterResult) and len(view) == 2
+        assert materialize(view) == [
+            {"product": "tv", "category": "Electronics", "price": 500.0, "sold": "2024-01-05T00:00:00.000"},
+            {"product": "laptop", "category": "Electronics", "price": 900.0, "sold": "2024-03-15T00:00:00.000"},
+        ]
+
+    def test_ranking_phrases_and_unknown_columns_are_not_filters(self, products):
+        from solver.analyzer import DataAnalyzer
+        from solver.query import compile_question
+
+        plan = compile_question("Which product is cheapest?")
+        assert plan.filters == () and plan.operation != "filter"
+        assert compile_question("rows where price is highest").filters == ()
+
+        # A condition on a column no frame has is dropped, not answered with every row
+        result = DataAnalyzer()._apply_filter({"dataframes": [products]}, "the price where colour is red")
+        assert result == 500.0
+
+
+class TestJSONFrames:
+    """Test flattening JSON documents into DataFrames"""
+
+    DOCUMENT = {
+        "meta": {"page": 1, "currency": "USD"},
+        "data": {"orders": [
+            {"id": 1, "amount": "$1,200", "customer": {"name": "Ann", "city": "Oslo"}},
+            {"id": 2, "amount": "$300", "customer": {"name": "Bob", "city": "Rome"}},
+            {"id": 3, "amount": "$50", "customer": {"name": "Cy", "city": "Oslo"}},
+        ]},
+    }
+
+    def test_nested_records_become_typed_columns(self):
+        from solver.analyzer import DataAnalyzer
+        from solver.jsonframes import json_frames
+
+        frames = json_frames(self.DOCUMENT)
+
+        assert len(frames) == 1
+        assert frames[0].attrs["json_path"] == "data.orders"
+        assert list(frames[0].columns) == ["id", "amount", "customer.name", "customer.city"]
+        assert frames[0]["amount"].sum() == 1550
+
+        downloaded = {"api_responses": [{"type": "json", "data": self.DOCUMENT}]}
+        quiz = {"question": "What is the total amount where city is Oslo?", "answer_format": "number"}
+        assert DataAnalyzer().analyze(quiz, downloaded)["answer"] == 1250
+
+    def test_incremental_parse_matches_full_parse(self, monkeypatch):
+        import solver.jsonframes as jsonframes
+
+        content = json.dumps(self.DOCUMENT, indent=2).encode()
+        monkeypatch.setattr(jsonframes, "READ_BLOCK", 16)
+
+        frames, document = jsonframes.stream_json_frames(memoryview(content), chunk_rows=2)
+        expected = jsonframes.json_frames(self.DOCUMENT)[0]
+
+        assert len(frames) == 1
+        assert frames[0].to_dict("list") == expected.to_dict("list")
+        assert document["meta"] == {"page": 1, "currency": "USD"}
+
+    def test_document_with_trailing_newline_is_not_json_lines(self):
+        from solver.analyzer import DataAnalyzer
+        from solver.loaders import is_json_lines
+
+        content = b'{"items": [{"x": 1}, {"x": 2}]}\n'
+        assert not is_json_lines(content)
+        assert is_json_lines(b'{"x": 1}\n\n{"x": 2}\n')
+
+        parsed = DataAnalyzer()._load_file({"type": "json", "url": "d.json", "content": content})
+        assert list(parsed.dataframes[0].columns) == ["x"]
+        assert parsed.json_data == {"items": [{"x": 1}, {"x": 2}]}
+
+
+class TestStrategyEngine:
+    """Test ranked alternative answers"""
+
+    def _analyzed(self, question):
+        from solver.analyzer import DataAnalyzer
+
+        table = [["Item", "Price", "Cost", "Units"],
+                 ["a", "10.25", "4", "1"], ["b", "20.50", "6", "2"], ["c", "30", "8", "3"]]
+        analyzer = DataAnalyzer()
+        quiz = {"question": question, "answer_format": "number"}
+        return analyzer, quiz, analyzer.analyze(quiz, {"tables": [table]})
+
+    def test_candidates_are_ranked_and_distinct(self):
+        from solver.strategies import PRIMARY, StrategyEngine, StrategyStats
+
+        analyzer, quiz, result = self._analyzed("What is the total price? Give the average if asked.")
+        candidates = list(StrategyEngine(analyzer, stats=StrategyStats()).candidates(quiz, result))
+        by_strategy = {c.strategy: c.answer for c in candidates}
+
+        assert candidates[0].strategy == PRIMARY and candidates[0].answer == 60.75
+        assert by_strategy["round:0"] == 61
+        assert by_strategy["operation:average"] == 20.25
+        assert "column:2" in by_strategy
+        assert len({repr(float(c.answer)) for c in candidates}) == len(candidates)
+        assert [c.score for c in candidates[1:]] == sorted((c.score for c in candidates[1:]), reverse=True)
+
+    def test_recorded_wins_reorder_alternatives(self):
+        from solver.strategies import StrategyEngine, StrategyStats
+
+        analyzer, quiz, result = self._analyzed("What is the total price?")
+        stats = StrategyStats()
+        for _ in range(5):
+            stats.record("column:2", True)
+            stats.record("round:0", False)
+
+        candidates = list(StrategyEngine(analyzer, stats=stats).candidates(quiz, result))
+        assert candidates[1].strategy == "column:2"
+        assert stats.snapshot()["round"] == {"wins": 0, "attempts": 5}
+
+
+    def test_alternatives_wait_for_a_rejection(self):
+        from solver.filters import FilterResult
+        from solver.strategies import PRIMARY, StrategyEngine, StrategyStats, _answer_key
+
+        analyzer, quiz, result = self._analyzed("What is the total price?")
+        engine = StrategyEngine(analyzer, stats=StrategyStats())
+        with patch.object(engine, "_strategies", wraps=engine._strategies) as strategies:
+            candidates = engine.candidates(quiz, result)
+            assert next(candidates).strategy == PRIMARY
+            strategies.assert_not_called()
+            assert len(list(candidates)) > 0
+            strategies.assert_called_once()
+
+        # Filter results are compared by their rows, never materialized
+        view = FilterResult([(analyzer.data["dataframes"][0], None)])
+        with patch.object(FilterResult, "to_records") as records:
+            assert _answer_key(view) == _answer_key(FilterResult(list(view.parts)))
+            records.assert_not_called()
+
+
+class TestAnswerFormatter:
+    """Test answer precision, type negotiation and native conversion"""
+
+    def test_precision_from_question(self):
+        import numpy as np
+        from solver.formatter import answer_spec, format_answer
+
+        mean = np.mean([10.0, 20.5, 31.0])
+        assert format_answer(mean, answer_spec("Average, rounded to 2 decimal places?", "number")) == 20.5
+        assert format_answer(mean, answer_spec("Average to the nearest integer", "number")) == 20
+        assert format_answer(mean, answer_spec("Give the average to two decimals", "string")) == "20.50"
+        assert format_answer(np.float64(1234567.0), answer_spec("Revenue in thousands, one decimal place", "number")) == 1234.6
+        assert format_answer(np.float64(0.1) + np.float64(0.2), answer_spec("What is the sum?", "number")) == 0.3
+        assert format_answer("$1,250", answer_spec("How many dollars?", "number")) == 1250
+
+    def test_containers_rounded_and_ints_kept_exact(self):
+        import numpy as np
+        from solver.formatter import answer_spec, format_answer
+
+        one_decimal = "Top 2 values to 1 decimal place"
+        assert format_answer([1.04, 2.26], answer_spec(one_decimal, "array")) == [1.0, 2.3]
+        assert format_answer({"N": 1.234, "S": 2}, answer_spec("Totals to 2 decimal places", "json")) == {"N": 1.23, "S": 2}
+        assert format_answer(12345678901234567, answer_spec("What is the id?", "number")) == 12345678901234567
+        assert format_answer(np.int64(2 ** 60 + 1), answer_spec("What is the id?", "number")) == 2 ** 60 + 1
+        assert format_answer([1500, 2500], answer_spec("List sales in thousands", "array")) == [1.5, 2.5]
+
+    def test_native_values_and_canonical_json(self):
+        import numpy as np
+        import pandas as pd
+        from solver.formatter import answer_spec, canonical_json, detect_answer_format, format_answer
+
+        values = format_answer(np.array([1.0, 2.5, np.nan]), answer_spec("List the values", "array"))
+        assert values == [1, 2.5, None] and type(values[0]) is int
+
+        payload = {"answer": {"total": np.int64(7), "mean": np.float32(1.5), "day": pd.Timestamp("2024-05-01")}}
+        assert canonical_json(payload) == b'{"answer":{"total":7,"mean":1.5,"day":"2024-05-01T00:00:00"}}'
+
+        assert detect_answer_format("How many rows are there?") == "number"
+        assert detect_answer_format("Explain the objective of the exercise") == "string"
+
+
+class TestChartRenderer:
+    """Test the Agg chart renderer"""
+
+    def test_matplotlib_loads_on_first_chart(self):
+        import subprocess
+
+        code = ("import sys; import solver.visualizer as v; before = 'matplotlib' in sys.modules; "
+                "v.DataVisualizer().create_visualization({'raw_result': [1, 2]}); "
+                "print(before, 'matplotlib.pyplot' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=str(Path(__file__).parent.parent))
+        assert result.stdout.split() == ["False", "False"]
+
+    def test_figures_are_reused_and_budget_respected(self):
+        import base64
+        import io
+        from PIL import Image
+        from solver.charts import ChartRenderer
+        from solver.visualizer import DataVisualizer
+
+        renderer = ChartRenderer()
+        full = DataVisualizer(renderer).create_visualization({"raw_result": list(range(200))})
+        small = DataVisualizer(renderer, max_chars=len(full) // 2).create_visualization({"raw_result": list(range(200))})
+
+        assert len(renderer._figures) == 1
+        assert len(small) <= len(full) // 2
+        image = Image.open(io.BytesIO(base64.b64decode(full.split(",", 1)[1])))
+        assert image.size == (1000, 600)
+
+    def test_repeated_charts_come_from_cache(self):
+        import numpy as np
+        from solver.charts import RenderCache
+        from solver.visualizer import DataVisualizer
+
+        cache = RenderCache()
+        visualizer = DataVisualizer(cache=cache)
+        with patch.object(DataVisualizer, "_render", wraps=visualizer._render) as render:
+            first = visualizer.create_visualization({"raw_result": {"a": np.int64(1), "b": 2.5}})
+            again = visualizer.create_visualization({"raw_result": {"a": 1, "b": 2.5}})
+            other = visualizer.create_visualization({"raw_result": {"a": 1, "b": 3}})
+            restyled = DataVisualizer(cache=cache, max_chars=50_000).create_visualization({"raw_result": {"a": 1, "b": 2.5}})
+
+        assert first == again and first != other
+        assert render.call_count == 3
+        assert cache.hits == 1 and len(cache) == 3 and restyled
+
+    def test_cache_is_memory_bounded(self):
+        from solver.charts import RenderCache
+
+        cache = RenderCache(max_chars=10)
+        keys = [RenderCache.key_for("line", [i]) for i in range(3)]
+        for key in keys:
+            cache.put(key, "x" * 4)
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[2]) == "xxxx" and len(cache) == 2
+
+
+class TestDownsampling:
+    """Test chart data reduction"""
+
+    def test_line_keeps_extremes_at_pixel_width(self):
+        import numpy as np
+        from solver.downsample import LINE_POINTS, downsample_line, to_series
+
+        y = np.sin(np.linspace(0, 40, 500_000))
+        y[123_457] = 25.0
+        x, reduced = downsample_line(y)
+
+        assert len(reduced) == LINE_POINTS
+        assert reduced.max() == 25.0 and x[0] == 0 and x[-1] == len(y) - 1
+        assert np.all(np.diff(x) > 0)
+        assert to_series([1, "2", None, "n/a", {"a": 1}]).tolist() == [1.0, 2.0]
+        assert to_series([{"name": "a", "v": 3}, {"name": "b", "v": "4"}]).tolist() == [3.0, 4.0]
+
+    def test_bars_grouped_into_other(self):
+        from solver.downsample import OTHER_LABEL, top_bars
+        from solver.visualizer import DataVisualizer
+
+        data = {f"k{i}": i for i in range(50)}
+        labels, values = top_bars(data.keys(), data.values(), limit=5)
+
+        assert labels == ["k46", "k47", "k48", "k49", OTHER_LABEL]
+        assert values.tolist() == [46, 47, 48, 49, sum(range(46))]
+        assert DataVisualizer(cache=None).create_visualization({"raw_result": data}).startswith("data:image/png")
+
+
+class TestSubmitPayload:
+    """Test submit serialization, size budget and gzip negotiation"""
+    
+    @pytest.mark.asyncio
+    async def test_numpy_answer_and_gzip_fallback(self):
+        import gzip
+        import numpy as np
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        from solver import submitter as submitter_module
+        from solver.submitter import AnswerSubmitter, GZIP_MIN_BYTES
+        
+        received = []
+        
+        async def handler(request):
+            raw = await request.read()
+            if request.headers.get("Content-Encoding") == "gzip":
+                received.append("gzip")
+                return web.Response(status=415)
+            received.append("plain")
+            body = json.loads(raw)
+            return web.json_response({"correct": body["answer"][:3] == [0, 1, 2]})
+        
+        app = web.Application()
+        app.router.add_post("/submit", handler)
+        async with TestServer(app) as server:
+            url = str(server.make_url("/submit"))
+            submitter = AnswerSubmitter(compression="always")
+            answer = np.arange(GZIP_MIN_BYTES, dtype=np.int64)
+            
+            result = await submitter.submit(url, answer, "test@example.com")
+            assert result["correct"] is True
+            assert result["status_code"] == 200
+            assert received == ["gzip", "plain"]
+            
+            # The rejection is remembered for the origin
+            await submitter.submit(url, answer, "test@example.com")
+            assert received[-1] == "plain" and len(received) == 3
+            submitter_module._gzip_support.clear()
+    
+    @pytest.mark.asyncio
+    async def test_wrong_answer_400_is_not_resent(self):
+        import numpy as np
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        from solver import submitter as submitter_module
+        from solver.submitter import AnswerSubmitter, FormatCache, GZIP_MIN_BYTES
+        
+        received = []
+        
+        async def handler(request):
+            received.append(request.headers.get("Content-Encoding"))
+            return web.json_response({"correct": False, "reason": "Wrong answer"}, status=400)
+        
+        app = web.Application()
+        app.router.add_post("/submit", handler)
+        async with TestServer(app) as server:
+            submitter = AnswerSubmitter(compression="always", formats=FormatCache())
+            answer = np.arange(GZIP_MIN_BYTES, dtype=np.int64)
+            result = await submitter.submit(str(server.make_url("/submit")), answer, "test@example.com")
+        
+        assert result["correct"] is False and result["status_code"] == 400
+        assert received == ["gzip"]
+        submitter_module._gzip_support.clear()
+    
+    def test_orjson_matches_stdlib(self):
+        pytest.importorskip("orjson")
+        import numpy as np
+        import pandas as pd
+        from solver.formatter import canonical_json, decode_json
+        
+        value = {
+            "answer": np.array([1.5, np.nan, 3.0]),
+            "count": np.int64(7),
+            "frame": pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}),
+            "nested": [np.float32(0.5), {"ok": np.bool_(True)}],
+        }
+        fast = canonical_json(value, use_orjson=True)
+        assert decode_json(fast) == json.loads(canonical_json(value, use_orjson=False))
+    
+    @pytest.mark.asyncio
+    async def test_payload_budget(self):
+        from solver.submitter import AnswerSubmitter
+        
+        submitter = AnswerSubmitter(max_payload_bytes=100)
+        with patch('aiohttp.ClientSession.post') as mock_post:
+            result = await submitter.submit("https://example.com/submit", "x" * 200, "test@example.com")
+        
+        assert result["correct"] is False
+        assert "limit" in result["error"]
+        mock_post.assert_not_called()
+
+
+class TestSubmitFormatCache:
+    """Test per-origin submission format negotiation"""
+    
+    @pytest.mark.asyncio
+    async def test_known_format_tried_first(self):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        from solver.submitter import AnswerSubmitter, FormatCache
+        
+        received = []
+        
+        async def handler(request):
+            received.append(request.content_type)
+            if request.content_type == "application/json":
+                return web.Response(status=415)
+            form = await request.post()
+            return web.json_response({"correct": form["answer"] == "42"})
+        
+        app = web.Application()
+        app.router.add_post("/submit", handler)
+        async with TestServer(app) as server:
+            url = str(server.make_url("/submit"))
+            submitter = AnswerSubmitter(formats=FormatCache())
+            
+            result = await submitter.submit(url, 42, "test@example.com")
+            assert result["correct"] is True
+            assert len(received) == 3
+            
+            # The second submit goes straight to form data
+            result = await submitter.submit(url, 42, "test@example.com")
+            assert result["correct"] is True
+            assert len(received) == 4
+    
+    def test_ttl_and_invalidation(self):
+        from solver.submitter import FormatCache, SUBMIT_FORMATS
+        
+        now = [0.0]
+        cache = FormatCache(ttl=10, clock=lambda: now[0])
+        origin = "https://example.com"
+        assert cache.order(origin) == list(SUBMIT_FORMATS)
+        
+        cache.confirm(origin, "form")
+        assert cache.order(origin)[0] == "form"
+        
+        cache.invalidate(origin, "json")
+        assert cache.get(origin) == "form"
+        cache.invalidate(origin, "form")
+        assert cache.get(origin) is None
+        
+        # The email-less shape is never promoted
+        cache.confirm(origin, "answer_json")
+        assert cache.get(origin) is None
+        
+        cache.confirm(origin, "json")
+        assert cache.get(origin) == "json"
+        now[0] = 11
+        assert cache.get(origin) is None
+    
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_confirmed(self):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        from solver.submitter import AnswerSubmitter, FormatCache
+        
+        received = []
+        status = [400]
+        
+        async def handler(request):
+            received.append(await request.json())
+            if status[0] == 400:
+                return web.json_response({"error": "bad request"}, status=400)
+            return web.json_response({"correct": True})
+        
+        app = web.Application()
+        app.router.add_post("/submit", handler)
+        async with TestServer(app) as server:
+            url = str(server.make_url("/submit"))
+            origin = url.rsplit("/", 1)[0]
+            formats = FormatCache()
+            formats.confirm(origin, "json")
+            submitter = AnswerSubmitter(formats=formats)
+            
+            # A 4xx without a verdict drops the shape and is not resent in another one
+            result = await submitter.submit(url, 42, "test@example.com")
+            assert result["status_code"] == 400
+            assert formats.get(origin) is None
+            assert len(received) == 1
+            
+            status[0] = 200
+            result = await submitter.submit(url, 42, "test@example.com")
+            assert result["correct"] is True
+            assert formats.get(origin) == "json"
+            assert all("email" in body for body in received)
+
+
+class TestSubmitURLResolver:
+    """Test ranked submit URL resolution"""
+    
+    def test_ranking_and_memory(self):
+        from solver.resolver import SubmitURLMemory, rank_submit_urls
+        
+        page = {
+            "url": "https://quiz.example.com/quiz/17",
+            "forms": [{"action": "/search", "method": "GET"}],
+            "data_attrs": [],
+            "links": [{"href": "https://quiz.example.com/help", "text": "Help"}],
+            "scripts": ['const SUBMIT_URL = "/quiz/17/answer";'],
+            "text": "Post your answer to https://other.example.com/submit."
+        }
+        memory = SubmitURLMemory()
+        urls = [c.url for c in rank_submit_urls(page, memory)]
+        assert urls[0] == "https://quiz.example.com/quiz/17/answer"
+        assert "https://other.example.com/submit" in urls
+        assert "https://quiz.example.com/submit" in urls
+        
+        # A remembered path never outranks the endpoint the page names
+        memory.confirm("https://quiz.example.com/submit-demo")
+        page["url"] = "https://quiz.example.com/level2"
+        page["scripts"] = []
+        page["text"] = ""
+        page["forms"] = [{"action": "/submit-level2", "method": "POST"}]
+        urls = [c.url for c in rank_submit_urls(page, memory)]
+        assert urls[0] == "https://quiz.example.com/submit-level2"
+        assert "https://quiz.example.com/submit-demo" not in urls
+        
+        # ...but stands in ahead of the /submit guess when the page names none
+        page["forms"] = []
+        urls = [c.url for c in rank_submit_urls(page, memory)]
+        assert urls[:2] == ["https://quiz.example.com/submit-demo", "https://quiz.example.com/submit"]
+        
+        # Equally supported page endpoints are ordered by what the host confirmed
+        page["forms"] = [{"action": "/a/submit", "method": "POST"}, {"action": "/b/submit", "method": "POST"}]
+        memory.confirm("https://quiz.example.com/b/submit")
+        assert rank_submit_urls(page, memory)[0].url == "https://quiz.example.com/b/submit"
+        
+        memory.confirm("https://quiz.example.com/quiz/18/answer")
+        memory.confirm("https://quiz.example.com/quiz/19/answer")
+        assert memory.hits("https://quiz.example.com/quiz/20/answer") == 2
+    
+    @pytest.mark.asyncio
+    async def test_submit_falls_back_through_ranking(self):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        from solver.resolver import SubmitURLMemory
+        from solver.submitter import AnswerSubmitter, FormatCache
+        
+        async def answer(request):
+            return web.json_response({"correct": True})
+        
+        app = web.Application()
+        app.router.add_post("/answer", answer)
+        async with TestServer(app) as server:
+            memory = SubmitURLMemory()
+            submitter = AnswerSubmitter(formats=FormatCache(), urls=memory)
+            wrong, right = str(server.make_url("/submit")), str(server.make_url("/answer"))
+            
+            result = await submitter.submit_ranked([wrong, right], 42, "test@example.com")
+            assert result["correct"] is True
+            assert result["submit_url"] == right
+            assert memory.hits(right) == 1 and memory.hits(wrong) == 0
+    
+    @pytest.mark.asyncio
+    async def test_reply_without_verdict_is_final(self):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        from solver.resolver import SubmitURLMemory
+        from solver.submitter import AnswerSubmitter, FormatCache
+        
+        posts = []
+        
+        async def answer(request):
+            posts.append(request.path)
+            return web.json_response({"url": "https://quiz.example.com/next"})
+        
+        async def fallback(request):
+            posts.append(request.path)
+            return web.json_response({"correct": False})
+        
+        app = web.Application()
+        app.router.add_post("/api/answer", answer)
+        app.router.add_post("/submit", fallback)
+        async with TestServer(app) as server:
+            memory = SubmitURLMemory()
+            submitter = AnswerSubmitter(formats=FormatCache(), urls=memory)
+            first, guessed = str(server.make_url("/api/answer")), str(server.make_url("/submit"))
+            
+            result = await submitter.submit_ranked([first, guessed], 42, "test@example.com")
+            assert result["next_url"] == "https://quiz.example.com/next"
+            assert posts == ["/api/answer"]
+            assert memory.hits(first) == 1
+
+
+class TestChainPipeline:
+    """Test next-quiz prefetching"""
+    
+    @staticmethod
+    def _browser(delay=0.0):
+        import asyncio
+        
+        class FakeBrowser:
+            def __init__(self):
+                self.loaded = []
+            
+            async def load_page(self, url):
+                self.loaded.append(url)
+                await asyncio.sleep(delay)
+                return {"url": url, "html": "<h1>What is 1 + 1?</h1>", "text": "What is 1 + 1?"}
+        
+        return FakeBrowser()
+    
+    @pytest.mark.asyncio
+    async def test_prefetch_is_reused(self):
+        from solver.chain import ChainPipeline
+        from solver.registry import DatasetRegistry
+        
+        browser = self._browser()
+        pipeline = ChainPipeline(browser, DatasetRegistry())
+        pipeline.prefetch("https://example.com/q2")
+        pipeline.prefetch("https://example.com/q2")
+        
+        prepared = await pipeline.prepare("https://example.com/q2")
+        assert prepared.prefetched
+        assert "1 + 1" in prepared.quiz_data["question"]
+        assert set(prepared.finished) == {"load", "parse", "download"}
+        assert browser.loaded == ["https://example.com/q2"]
+        await pipeline.close()
+    
+    @pytest.mark.asyncio
+    async def test_unused_prefetch_is_cancelled(self):
+        from solver.chain import ChainPipeline
+        from solver.registry import DatasetRegistry
+        
+        deferred = []
+        pipeline = ChainPipeline(self._browser(delay=5), DatasetRegistry())
+        pipeline.prefetch("https://example.com/q2")
+        pipeline.defer(deferred.append, "history")
+        await pipeline.close()
+        
+        assert deferred == ["history"]
+        assert pipeline._prefetch is None
+
+
+class TestBatchRunner:
+    """Test concurrent batch execution"""
+    
+    @pytest.mark.asyncio
+    async def test_parallelism_limit_and_summary(self):
+        import asyncio
+        from solver.batch import run_batch
+        
+        running = [0]
+        peak = [0]
+        
+        async def run(delay):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(delay)
+            running[0] -= 1
+            if delay < 0.01:
+                raise ValueError("boom")
+            return {"status": "ok"}
+        
+        lines = [line async for line in run_batch([0.05, 0.04, 0.001, 0.03, 0.02], run, parallelism=2)]
+        
+        assert peak[0] == 2
+        results, summary = lines[:-1], lines[-1]["summary"]
+        assert sorted(r["index"] for r in results) == [0, 1, 2, 3, 4]
+        assert next(r for r in results if r["index"] == 2)["message"] == "boom"
+        assert summary["chains"] == 5 and summary["failed"] == 1
+        assert summary["chains_per_second"] > 0
+        assert summary["latency_seconds"]["p50"] <= summary["latency_seconds"]["max"]
+
+
 class TestDataVisualizer:
     """Test data visualizer"""
     
@@ -297,8 +1466,9 @@ class TestAnswerSubmitter:
         with patch('aiohttp.ClientSession.post') as mock_post:
             mock_resp = AsyncMock()
             mock_resp.status = 200
-            mock_resp.json = AsyncMock(return_value=mock_response)
-            mock_resp.text = AsyncMock(return_value=json.dumps(mock_response))
+            mock_resp.headers = {}
+            mock_resp.charset = "utf-8"
+            mock_resp.read = AsyncMock(return_value=json.dumps(mock_response).encode())
             mock_post.return_value.__aenter__.return_value = mock_resp
             
             result = await submitter.submit(
@@ -321,8 +1491,9 @@ class TestAnswerSubmitter:
         with patch('aiohttp.ClientSession.post') as mock_post:
             mock_resp = AsyncMock()
             mock_resp.status = 200
-            mock_resp.json = AsyncMock(return_value=mock_response)
-            mock_resp.text = AsyncMock(return_value=json.dumps(mock_response))
+            mock_resp.headers = {}
+            mock_resp.charset = "utf-8"
+            mock_resp.read = AsyncMock(return_value=json.dumps(mock_response).encode())
             mock_post.return_value.__aenter__.return_value = mock_resp
             
             result = await submitter.submit(
@@ -370,6 +1541,46 @@ class TestUtils:
         assert 10.0 in numbers
         assert 20.5 in numbers
         assert -5.3 in numbers
+    
+    def test_scan_numbers_formats_and_noise(self):
+        from solver.scanner import scan_numbers, iter_numbers
+        from solver.utils import extract_numbers
+        import numpy as np
+        
+        values = scan_numbers("Total 1,234,567.89 and 1.5e3 (see [2]) Page 3 of 10 -7")
+        assert values.dtype == np.float64
+        assert values.tolist() == [1234567.89, 1500.0, -7.0]
+        
+        # Commas separate values unless the run can only be 3-digit thousands groups
+        assert scan_numbers("ids 5,10,100,200 and 1,234,56").tolist() == [5, 10, 100, 200, 1, 234, 56]
+        assert scan_numbers("a,b\n1,5\n2,1000\nsales were 12,500 units").tolist() == [1, 5, 2, 1000, 12500]
+        assert scan_numbers("1,234.56,7\n100, 200").tolist() == [1, 234.56, 7, 100, 200]
+        # A grouped number alone on its line (the usual PDF dump layout) stays whole
+        assert scan_numbers("Revenue\n1,234.56\n").tolist() == [1234.56]
+        assert scan_numbers("1,234,567\n").tolist() == [1234567]
+        assert extract_numbers("1,234") == [1234.0]
+        
+        text = " ".join(str(i) for i in range(5000))
+        streamed = np.concatenate(list(iter_numbers([text], chunk_size=997)))
+        assert streamed.size == 5000
+        assert streamed.sum() == sum(range(5000))
+    
+    def test_streamed_scan_matches_whole_scan(self):
+        import random
+        import numpy as np
+        from solver.scanner import scan_numbers, iter_numbers
+        
+        rng = random.Random(7)
+        tokens = ["1,234", "12", "-3.5", "Page 4 of 9", "[2]", "abc12", "1.2.3", "100,200", "1,5", "7e3", ",", "\n", "\n"]
+        texts = ["Page 3 of 10 " * 10] + [
+            " ".join(rng.choice(tokens) for _ in range(rng.randint(0, 300))) for _ in range(50)
+        ]
+        for text in texts:
+            expected = scan_numbers(text)
+            for chunk_size in (1, 7, 20, 64, 997):
+                pieces = list(iter_numbers([text], chunk_size=chunk_size))
+                streamed = np.concatenate(pieces) if pieces else np.empty(0)
+                assert streamed.tolist() == expected.tolist(), (chunk_size, text)
 
 
 class TestIntegration: